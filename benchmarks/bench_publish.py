@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end publish benchmark against the local mock Substack editor.
+Generates posts of increasing size and image count, runs the real
+create_or_update_draft path against benchmarks/mock_substack for each tier,
+then one publish_batch over every tier. Reports wall time, throughput and the
+per-phase breakdown from tools.substack.profiling; needs Playwright Chromium
+unless --engine api is used.
+Usage:
+  python benchmarks/bench_publish.py --runs 3 --json bench_publish.json
+  python benchmarks/bench_publish.py --upload-ms 300 --save-ms 150 --paste-ms 50
+  python benchmarks/bench_publish.py --engine api --upload-ms 300 --save-ms 150
+  python benchmarks/bench_publish.py --baseline bench_publish.json --max-regression 0.25
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+from benchmarks.mock_substack.server import PIXEL, Latency, MockSubstack  # noqa: E402
+from tools.substack.profiling import profile  # noqa: E402
+from tools.substack.publish_to_substack import create_or_update_draft, publish_batch  # noqa: E402
+
+SPACE = "bench"
+# name -> (paragraphs, images)
+TIERS: dict[str, tuple[int, int]] = {
+    "tiny": (5, 0),
+    "small": (40, 1),
+    "medium": (200, 4),
+    "large": (800, 12),
+}
+PARAGRAPH = (
+    "The Spirit pressed high for most of the second half, and the xG chart shows "
+    "it: {i} shots from inside the box, most of them after turnovers in midfield."
+)
+
+
+def make_post(out_dir: Path, name: str, paragraphs: int, images: int) -> Path:
+    """Write a post with ``paragraphs`` paragraphs, a few headings and ``images`` local PNGs."""
+    img_dir = out_dir / "images"
+    img_dir.mkdir(parents=True, exist_ok=True)
+    lines = ["---", f'title: "Benchmark {name}"', "tags: [benchmark]", "---", ""]
+    every = max(1, paragraphs // (images + 1))
+    n_img = 0
+    for i in range(paragraphs):
+        if i % 25 == 0:
+            lines += [f"## Section {i // 25 + 1}", ""]
+        lines += [PARAGRAPH.format(i=i), ""]
+        if n_img < images and i % every == every - 1:
+            img = img_dir / f"{name}-{n_img}.png"
+            img.write_bytes(PIXEL)
+            lines += [f"![chart {n_img}](images/{img.name})", ""]
+            n_img += 1
+    md = out_dir / f"{name}.md"
+    md.write_text("\n".join(lines))
+    return md
+
+
+def phase_means(prof, runs: int) -> dict[str, float]:
+    """Mean milliseconds per run for each phase."""
+    return {name: round(total_ms / runs, 1) for name, _, total_ms, _ in prof.breakdown()}
+
+
+def bench_tier(mock: MockSubstack, md: Path, runs: int) -> dict:
+    walls = []
+    with profile() as prof:
+        for _ in range(runs):
+            saved = len(mock.stats.drafts)
+            started = time.perf_counter()
+            asyncio.run(create_or_update_draft(SPACE, md, publish=False, login=False, force=True))
+            walls.append(time.perf_counter() - started)
+            if len(mock.stats.drafts) == saved:
+                raise RuntimeError(f"{md.name}: the mock editor never received a draft save")
+    chars = len(md.read_text())
+    median = statistics.median(walls)
+    return {
+        "median_ms": round(median * 1000, 1),
+        "min_ms": round(min(walls) * 1000, 1),
+        "chars_per_s": round(chars / median),
+        "phases_ms": phase_means(prof, runs),
+    }
+
+
+def bench_batch(posts: list[Path], concurrency: int) -> dict:
+    with profile() as prof:
+        started = time.perf_counter()
+        results = asyncio.run(publish_batch(SPACE, posts, publish=False, concurrency=concurrency, force=True))
+        wall = time.perf_counter() - started
+    failed = [str(r.path.name) for r in results if not r.ok]
+    return {
+        "posts": len(posts),
+        "concurrency": concurrency,
+        "wall_ms": round(wall * 1000, 1),
+        "posts_per_min": round(len(posts) / wall * 60, 1),
+        "failed": failed,
+        "phases_ms": phase_means(prof, 1),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Offline publish benchmark against the mock editor")
+    ap.add_argument("--runs", type=int, default=3, help="Runs per tier (median is reported)")
+    ap.add_argument("--tiers", nargs="+", choices=list(TIERS), default=list(TIERS), help="Post sizes to run")
+    ap.add_argument("--concurrency", type=int, default=3, help="Editor pages open at once for the batch run")
+    for name in Latency.__dataclass_fields__:
+        ap.add_argument(f"--{name.replace('_', '-')}", type=int, default=0, dest=name,
+                        help=f"Artificial latency: {name}")
+    ap.add_argument("--engine", choices=["browser", "api"], default="browser",
+                    help="Publish through the mock editor or straight to its draft API")
+    ap.add_argument("--json", dest="out", help="Write results to this JSON file")
+    ap.add_argument("--baseline", help="Fail if slower than this earlier --json result")
+    ap.add_argument("--max-regression", type=float, default=0.25,
+                    help="Allowed fractional slowdown against the baseline (default 0.25)")
+    args = ap.parse_args()
+
+    latency = Latency(**{name: getattr(args, name) for name in Latency.__dataclass_fields__})
+    results: dict[str, dict] = {}
+    # Run in a scratch directory so the manifest, caches and session stay out of the repo.
+    cwd = Path.cwd()
+    with tempfile.TemporaryDirectory() as tmp, MockSubstack(latency=latency) as mock:
+        os.chdir(tmp)
+        try:
+            os.environ["SUBSTACK_BASE_URL"] = mock.base_url
+            os.environ["SUBSTACK_ENGINE"] = args.engine
+            mock.write_storage_state(Path(tmp) / ".playwright" / "storage_state.json")
+            posts = [make_post(Path(tmp) / "posts", name, *TIERS[name]) for name in args.tiers]
+            for name, md in zip(args.tiers, posts, strict=True):
+                results[name] = r = bench_tier(mock, md, args.runs)
+                top = sorted(r["phases_ms"].items(), key=lambda kv: kv[1], reverse=True)[:4]
+                print(f"{name:8} median {r['median_ms']:8.1f} ms  {r['chars_per_s']:8} chars/s   "
+                      f"top: {', '.join(f'{k} {v}ms' for k, v in top)}")
+            results["batch"] = b = bench_batch(posts, args.concurrency)
+            print(f"{'batch':8} {b['posts']} posts in {b['wall_ms']:.0f} ms  "
+                  f"({b['posts_per_min']} posts/min, concurrency {b['concurrency']})"
+                  + (f"  FAILED: {', '.join(b['failed'])}" if b["failed"] else ""))
+            results["latency"] = vars(latency)
+            results["engine"] = args.engine
+        finally:
+            os.chdir(cwd)
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2))
+        print("Wrote", args.out)
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressed = [
+            f"{name}: {r['median_ms']} ms vs {baseline[name]['median_ms']} ms"
+            for name, r in results.items()
+            if "median_ms" in r and name in baseline
+            and r["median_ms"] > baseline[name]["median_ms"] * (1 + args.max_regression)
+        ]
+        if regressed:
+            print("Publish regressions:\n  " + "\n  ".join(regressed))
+            sys.exit(1)
+        print("No publish regressions against", args.baseline)
+    if results["batch"]["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
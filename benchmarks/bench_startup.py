@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Measure cold-start cost of the CLI per command.
+Each command is run in a fresh interpreter under `python -X importtime`; we
+record wall time and the cumulative import time of the heaviest top-level
+modules. Compare against a saved baseline to catch startup regressions.
+Usage:
+  python benchmarks/bench_startup.py --runs 5 --json bench_startup.json
+  python benchmarks/bench_startup.py --baseline bench_startup.json --max-regression 0.25
+"""
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+
+# argv after `python -m tools.substack.cli`; each should exit without touching the network.
+COMMANDS: dict[str, list[str]] = {
+    "help": ["--help"],
+    "publish --help": ["publish", "--help"],
+    "publish bad-space": ["publish", "README.md", "--space", "bad_space"],
+    "publish-batch --help": ["publish-batch", "--help"],
+    "status --help": ["status", "--help"],
+    "build --help": ["build", "--help"],
+}
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def parse_importtime(stderr: str) -> dict[str, int]:
+    """Return cumulative import time (us) of each top-level import."""
+    top: dict[str, int] = {}
+    for line in stderr.splitlines():
+        m = IMPORT_LINE.match(line)
+        if m and len(m.group(3)) == 1:
+            top[m.group(4)] = top.get(m.group(4), 0) + int(m.group(2))
+    return top
+
+
+def run_once(argv: list[str]) -> tuple[float, dict[str, int]]:
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "tools.substack.cli", *argv],
+        cwd=REPO, capture_output=True, text=True, check=False,
+    )
+    return time.perf_counter() - started, parse_importtime(proc.stderr)
+
+
+def bench(runs: int) -> dict[str, dict]:
+    results: dict[str, dict] = {}
+    for name, argv in COMMANDS.items():
+        walls, imports = [], {}
+        for _ in range(runs):
+            wall, imports = run_once(argv)
+            walls.append(wall)
+        heaviest = sorted(imports.items(), key=lambda kv: kv[1], reverse=True)[:5]
+        results[name] = {
+            "median_ms": round(statistics.median(walls) * 1000, 1),
+            "min_ms": round(min(walls) * 1000, 1),
+            "import_ms": round(sum(imports.values()) / 1000, 1),
+            "heaviest": {mod: round(us / 1000, 1) for mod, us in heaviest},
+        }
+        print(f"{name:24} median {results[name]['median_ms']:7.1f} ms   "
+              f"imports {results[name]['import_ms']:7.1f} ms   "
+              f"top: {', '.join(f'{m} {t}ms' for m, t in results[name]['heaviest'].items())}")
+    return results
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="CLI cold-start benchmark")
+    ap.add_argument("--runs", type=int, default=5, help="Runs per command (median is reported)")
+    ap.add_argument("--json", dest="out", help="Write results to this JSON file")
+    ap.add_argument("--baseline", help="Fail if slower than this earlier --json result")
+    ap.add_argument("--max-regression", type=float, default=0.25,
+                    help="Allowed fractional slowdown against the baseline (default 0.25)")
+    args = ap.parse_args()
+
+    results = bench(args.runs)
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2))
+        print("Wrote", args.out)
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressed = [
+            f"{name}: {r['median_ms']} ms vs {baseline[name]['median_ms']} ms"
+            for name, r in results.items()
+            if name in baseline and r["median_ms"] > baseline[name]["median_ms"] * (1 + args.max_regression)
+        ]
+        if regressed:
+            print("Startup regressions:\n  " + "\n  ".join(regressed))
+            sys.exit(1)
+        print("No startup regressions against", args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+// Minimal stand-in for the Substack post editor. Behaviour mirrors what the
+// publisher automates: title/body contenteditables, HTML paste, the "/image"
+// slash menu with a file input, tag settings, Save draft and Publish. Saved
+// drafts live at /publish/post/<id> and are loaded back when reopened.
+(function () {
+  "use strict";
+  const cfg = Object.assign({ mount_ms: 0, paste_ms: 0 }, window.MOCK || {});
+  const $ = (sel) => document.querySelector(sel);
+  const draft = { id: null, tags: [] };
+  let title, body, slashNode = null;
+
+  function status(text) { $("#status").textContent = text; }
+
+  function mount() {
+    title = document.createElement("div");
+    title.setAttribute("contenteditable", "true");
+    title.dataset.testid = "post-title";
+    title.setAttribute("placeholder", "Title");
+    body = document.createElement("div");
+    body.setAttribute("contenteditable", "true");
+    body.setAttribute("role", "textbox");
+    body.dataset.testid = "post-body";
+    body.addEventListener("paste", onPaste);
+    body.addEventListener("input", onInput);
+    // a reopened draft mounts only once its content is in place
+    const saved = location.pathname.match(/^\/publish\/post\/(\d+)/);
+    (saved ? load(Number(saved[1])) : Promise.resolve()).then(() => $("#app").append(title, body));
+  }
+
+  async function load(id) {
+    const resp = await fetch(`/api/v1/drafts/${id}`);
+    if (!resp.ok) return;
+    const info = await resp.json();
+    draft.id = id;
+    draft.tags = info.tags || [];
+    title.textContent = info.draft_title || "";
+    body.innerHTML = info.draft_body || "";
+  }
+
+  function onPaste(ev) {
+    const html = ev.clipboardData.getData("text/html");
+    const text = ev.clipboardData.getData("text/plain");
+    ev.preventDefault();
+    setTimeout(() => {
+      const doc = new DOMParser().parseFromString(html || "<p></p>", "text/html");
+      if (!html) doc.body.firstChild.textContent = text;
+      body.append(...doc.body.childNodes);
+    }, cfg.paste_ms);
+  }
+
+  function onInput() {
+    const node = getSelection().anchorNode;
+    if (node && (node.textContent || "").endsWith("/image")) {
+      slashNode = node;
+      $("#image-menu").hidden = false;
+    }
+  }
+
+  $("#image-menu [role=menuitem]").addEventListener("click", () => {
+    $("#image-menu").hidden = true;
+    if (slashNode) slashNode.textContent = slashNode.textContent.replace(/\/image$/, "");
+    $("#file").hidden = false;
+  });
+
+  $("#file").addEventListener("change", async (ev) => {
+    for (const file of ev.target.files) {
+      const form = new FormData();
+      form.append("file", file, file.name);
+      const resp = await fetch("/api/v1/image", { method: "POST", body: form });
+      if (!resp.ok) { status("Upload failed"); continue; }
+      const info = await resp.json();
+      const img = document.createElement("img");
+      img.src = info.url;
+      img.alt = file.name;
+      body.append(img);
+    }
+    ev.target.value = "";
+    ev.target.hidden = true;
+  });
+
+  async function saveDraft() {
+    const payload = { draft_title: title.textContent, draft_body: body.innerHTML, tags: draft.tags };
+    const url = draft.id ? `/api/v1/drafts/${draft.id}` : "/api/v1/drafts";
+    const resp = await fetch(url, {
+      method: draft.id ? "PUT" : "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(payload),
+    });
+    const info = await resp.json();
+    draft.id = info.id;
+    history.replaceState(null, "", `/publish/post/${draft.id}`);
+    status("Saved");
+  }
+
+  $("#save-draft").addEventListener("click", () => { status("Saving…"); saveDraft(); });
+
+  $("[data-testid=post-settings]").addEventListener("click", () => { $("#settings").hidden = false; });
+  $("#settings input").addEventListener("keydown", (ev) => {
+    if (ev.key === "Enter" && ev.target.value) {
+      draft.tags.push(ev.target.value);
+      const li = document.createElement("li");
+      li.textContent = ev.target.value;
+      $("#tags").append(li);
+      ev.target.value = "";
+    }
+  });
+  $("#close-settings").addEventListener("click", () => { $("#settings").hidden = true; });
+  document.addEventListener("keydown", (ev) => {
+    if (ev.key === "Escape") $("#settings").hidden = true;
+  });
+
+  $("[data-testid=publish-button]").addEventListener("click", () => { $("#confirm").hidden = false; });
+  $("#publish-now").addEventListener("click", async () => {
+    await saveDraft();
+    await fetch(`/api/v1/drafts/${draft.id}/publish`, { method: "POST" });
+    $("#confirm").hidden = true;
+    status("Published");
+  });
+
+  setTimeout(mount, cfg.mount_ms);
+})();
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Substack post editor, for offline benchmarks and tests.
+Serves a static editor page (title/body contenteditables, "/image" slash menu,
+file input, settings modal, Save draft / Publish) plus the few API endpoints it
+calls (which the draft API engine also uses), each with configurable
+artificial latency. Point the publisher at it with
+SUBSTACK_BASE_URL=http://127.0.0.1:<port>; the drafts API only accepts the
+session cookie that MockSubstack.write_storage_state saves.
+Usage:
+  python benchmarks/mock_substack/server.py --port 8765 --upload-ms 300 --save-ms 150
+"""
+import argparse
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+EDITOR_PATHS = {"/p/new", "/publish/post/new"}
+# 1x1 transparent PNG served for every uploaded image.
+PIXEL = (
+    b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01'
+    b'\x08\x06\x00\x00\x00\x1f\x15\xc4\x89\x00\x00\x00\nIDATx\x9cc\x00\x01'
+    b'\x00\x00\x05\x00\x01\r\n-\xb4\x00\x00\x00\x00IEND\xaeB`\x82'
+)
+
+
+@dataclass(frozen=True)
+class Latency:
+    """Artificial delays in milliseconds.
+
+    ``mount_ms`` and ``paste_ms`` are applied in the page (editor mount after
+    load, paste handling); the rest are server-side response delays.
+    """
+
+    page_ms: int = 0
+    mount_ms: int = 0
+    paste_ms: int = 0
+    upload_ms: int = 0
+    save_ms: int = 0
+
+
+@dataclass
+class MockStats:
+    """What the editor sent us, for assertions and benchmark reports."""
+
+    requests: list[tuple[str, str, int]] = field(default_factory=list)
+    drafts: dict[int, dict] = field(default_factory=dict)
+    published: set[int] = field(default_factory=set)
+    uploads: int = 0
+    upload_bytes: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+class MockSubstack:
+    """Threaded HTTP server for the mock editor; usable as a context manager."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: Latency | None = None) -> None:
+        self.latency = latency or Latency()
+        self.stats = MockStats()
+        # Uploads still to answer with HTTP 500, for exercising retries.
+        self.fail_uploads = 0
+        # Publish calls still to answer with HTTP 500.
+        self.fail_publishes = 0
+        # The only substack.sid the drafts API accepts; see write_storage_state.
+        self.session_cookie = "mock-session"
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def write_storage_state(self, path: Path, valid: bool = True) -> Path:
+        """Write a Playwright storage state holding a session cookie for this server."""
+        host = self._server.server_address[0]
+        cookie = {
+            "name": "substack.sid", "value": self.session_cookie if valid else "logged-out",
+            "domain": host, "path": "/", "expires": -1, "httpOnly": True, "secure": False, "sameSite": "Lax",
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"cookies": [cookie], "origins": []}))
+        return path
+
+    def __enter__(self) -> "MockSubstack":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def _make_handler(mock: MockSubstack) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, body: bytes, ctype: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _json(self, payload: dict, status: int = 200) -> None:
+            self._send(status, json.dumps(payload).encode(), "application/json")
+
+        def _body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        def _record(self, size: int = 0) -> None:
+            with mock.stats.lock:
+                mock.stats.requests.append((self.command, self.path, size))
+
+        def do_GET(self) -> None:  # noqa: N802
+            self._record()
+            path = self.path.split("?", 1)[0]
+            if path in EDITOR_PATHS or path.startswith("/publish/post/"):
+                time.sleep(mock.latency.page_ms / 1000)
+                config = json.dumps({"mount_ms": mock.latency.mount_ms, "paste_ms": mock.latency.paste_ms})
+                html = (HERE / "editor.html").read_text().replace("__MOCK_CONFIG__", config)
+                self._send(200, html.encode(), "text/html; charset=utf-8")
+            elif path == "/editor.js":
+                self._send(200, (HERE / "editor.js").read_bytes(), "application/javascript")
+            elif path.startswith("/images/"):
+                self._send(200, PIXEL, "image/png")
+            elif path == "/api/v1/drafts":
+                cookies = SimpleCookie(self.headers.get("Cookie", ""))
+                sid = cookies["substack.sid"].value if "substack.sid" in cookies else None
+                if sid is None or sid != mock.session_cookie:
+                    self._json({"error": "Not authorized"}, 401)
+                else:
+                    with mock.stats.lock:
+                        self._json({"posts": [{"id": k, **v} for k, v in mock.stats.drafts.items()][:1]})
+            elif path.startswith("/api/v1/drafts/"):
+                with mock.stats.lock:
+                    draft = mock.stats.drafts.get(int(path.rsplit("/", 1)[1]))
+                if draft is None:
+                    self._json({"error": "not found"}, 404)
+                else:
+                    self._json(draft)
+            else:
+                self._send(404, b"not found", "text/plain")
+
+        def do_POST(self) -> None:  # noqa: N802
+            body = self._body()
+            self._record(len(body))
+            path = self.path.split("?", 1)[0]
+            if path == "/api/v1/image":
+                time.sleep(mock.latency.upload_ms / 1000)
+                with mock.stats.lock:
+                    fail = mock.fail_uploads > 0
+                    mock.fail_uploads -= fail
+                if fail:
+                    self._json({"error": "upload failed"}, 500)
+                    return
+                with mock.stats.lock:
+                    mock.stats.uploads += 1
+                    mock.stats.upload_bytes += len(body)
+                    n = mock.stats.uploads
+                self._json({"url": f"/images/{n}.png", "bytes": len(body)})
+            elif path == "/api/v1/drafts":
+                time.sleep(mock.latency.save_ms / 1000)
+                with mock.stats.lock:
+                    draft_id = len(mock.stats.drafts) + 1
+                    mock.stats.drafts[draft_id] = json.loads(body or b"{}")
+                self._json({"id": draft_id})
+            elif path.startswith("/api/v1/drafts/") and path.endswith("/publish"):
+                time.sleep(mock.latency.save_ms / 1000)
+                draft_id = int(path.split("/")[4])
+                with mock.stats.lock:
+                    fail = mock.fail_publishes > 0
+                    mock.fail_publishes -= fail
+                    if not fail:
+                        mock.stats.published.add(draft_id)
+                if fail:
+                    self._json({"error": "publish failed"}, 500)
+                    return
+                self._json({"id": draft_id, "published": True})
+            else:
+                self._json({"error": "not found"}, 404)
+
+        def do_PUT(self) -> None:  # noqa: N802
+            body = self._body()
+            self._record(len(body))
+            path = self.path.split("?", 1)[0]
+            if path.startswith("/api/v1/drafts/"):
+                time.sleep(mock.latency.save_ms / 1000)
+                draft_id = int(path.rsplit("/", 1)[1])
+                with mock.stats.lock:
+                    mock.stats.drafts[draft_id] = json.loads(body or b"{}")
+                self._json({"id": draft_id})
+            else:
+                self._json({"error": "not found"}, 404)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    return Handler
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Serve the mock Substack editor")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    for name in Latency.__dataclass_fields__:
+        ap.add_argument(f"--{name.replace('_', '-')}", type=int, default=0, dest=name,
+                        help=f"Artificial latency: {name}")
+    args = ap.parse_args()
+    latency = Latency(**{name: getattr(args, name) for name in Latency.__dataclass_fields__})
+    mock = MockSubstack(args.host, args.port, latency)
+    print(f"Mock editor at {mock.base_url}/p/new  (SUBSTACK_BASE_URL={mock.base_url})")
+    try:
+        mock._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,483 @@
 """
-Export a Jupyter notebook to Markdown with YAML front-matter.
+Export Jupyter notebooks to Markdown with YAML front-matter.
+Plot and image outputs are written to an images/ folder next to the Markdown
+and linked from it, so the publisher uploads them with the post. Directory
+mode exports every notebook under a folder in parallel (one exporter per
+worker process) and skips notebooks whose content and options are unchanged
+since the last run (recorded in <out-dir>/.notebooks.json, which also maps
+each post back to its notebook for `cli changed`).
+Giant text and HTML outputs are truncated (--max-text-kb, --max-html-kb).
+Notebooks over 32 MB are streamed when ijson is installed (--stream always
+forces it): cells are parsed one at a time and each image output is decoded
+to disk in chunks as soon as it is read. ijson still holds each JSON string
+whole, so memory stays near the size of the largest single output's base64
+text instead of the whole document. Peak RSS is reported.
 Usage:
   python scripts/export_notebook.py --in nb.ipynb --out docs/nb.md --title "My Post" --tags eval,model-card
+  python scripts/export_notebook.py --in-dir notebooks/ --out-dir docs/ --tags analysis -j 4
+  python scripts/export_notebook.py --in big.ipynb --out docs/big.md --stream always --max-html-kb 50
 """
 import argparse
+import base64
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
-import nbformat
-from nbconvert import MarkdownExporter
+if TYPE_CHECKING:
+    from nbconvert import MarkdownExporter
 
 FRONT = """---
 title: "{title}"
 tags: [{tags}]
 ---
 """
+IMAGES_DIR = "images"
+INDEX_NAME = ".notebooks.json"
+BINARY_MIMES = {"image/png": ".png", "image/jpeg": ".jpg", "image/gif": ".gif"}
+# Notebooks larger than this are streamed when ijson is installed.
+STREAM_ABOVE_BYTES = 32 * 1024 * 1024
+_DATA_PREFIX = "cells.item.outputs.item.data."
+# Stands in for a base64 payload that was already written to disk.
+_ON_DISK = "\0file:"
+# Base64 characters decoded at a time, so a payload is never decoded in one piece.
+B64_CHUNK_CHARS = 1 << 20
+# Below this many notebooks a process pool costs more than it saves.
+MIN_PARALLEL = 2
+
+# One exporter per worker process, built by _init_worker.
+_exporter: "MarkdownExporter | None" = None
+
+
+@dataclass(frozen=True)
+class OutputLimits:
+    """Caps on what a single cell output may contribute to the post.
+
+    Args:
+        max_text_chars: Stream and text/plain outputs are cut to this length
+        max_html_chars: Larger text/html outputs are replaced by their text/plain form
+    """
+
+    max_text_chars: int = 20_000
+    max_html_chars: int = 200_000
+
+
+@dataclass
+class ExportReport:
+    """What a directory export did."""
+
+    exported: list[Path] = field(default_factory=list)
+    skipped: list[Path] = field(default_factory=list)
+    failed: dict[Path, str] = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+def _init_worker() -> "MarkdownExporter":
+    global _exporter
+    from nbconvert import MarkdownExporter
+
+    _exporter = MarkdownExporter()
+    return _exporter
+
+
+def _slug(name: str) -> str:
+    """File-name-safe key for a notebook's extracted outputs."""
+    return re.sub(r"[^A-Za-z0-9_-]+", "-", name).strip("-") or "notebook"
+
+
+def _parse_tags(tags: str) -> list[str]:
+    return [t.strip() for t in tags.split(",") if t.strip()]
+
+
+def _default_title(in_nb: Path) -> str:
+    return in_nb.stem.replace("-", " ").replace("_", " ").title()
+
+
+def _join(text: Any) -> str:
+    return "".join(text) if isinstance(text, list) else (text or "")
+
+
+def _truncate(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    return text[:limit] + f"\n... [{len(text) - limit:,} more characters truncated]\n"
+
+
+def limit_output(output: dict[str, Any], limits: OutputLimits) -> dict[str, Any]:
+    """Apply ``limits`` to one nbformat output in place and return it."""
+    if output.get("output_type") == "stream":
+        output["text"] = _truncate(_join(output.get("text")), limits.max_text_chars)
+    data = output.get("data")
+    if data:
+        if "text/html" in data and len(_join(data["text/html"])) > limits.max_html_chars:
+            del data["text/html"]
+            data.setdefault("text/plain", "[HTML output too large to include]")
+        if "text/plain" in data:
+            data["text/plain"] = _truncate(_join(data["text/plain"]), limits.max_text_chars)
+    return output
+
+
+def peak_rss_mb() -> tuple[float, float]:
+    """Peak resident set size of this process and of its finished child processes, in MB."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0, 0.0
+    scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB elsewhere
+    return tuple(  # type: ignore[return-value]
+        resource.getrusage(who).ru_maxrss * scale / 1e6 for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)
+    )
+
+
+def _has_ijson() -> bool:
+    try:
+        import ijson  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _indent(text: str) -> str:
+    return "\n".join("    " + line for line in text.splitlines()) + "\n"
+
+
+class _ImageWriter:
+    """Decodes base64 outputs into ``images/`` next to the post."""
+
+    def __init__(self, out_md: Path) -> None:
+        self.dir = out_md.parent / IMAGES_DIR
+        self.key = _slug(out_md.stem)
+        self.written: list[Path] = []
+
+    def write(self, name: str, payload: str) -> str:
+        """Decode one payload to disk in chunks and return its link relative to the post."""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        path = self.dir / name
+        with path.open("wb") as f:
+            carry = ""
+            for start in range(0, len(payload), B64_CHUNK_CHARS):
+                # notebooks may wrap base64 lines; decode whole 4-character groups only
+                text = carry + "".join(payload[start:start + B64_CHUNK_CHARS].split())
+                cut = len(text) - len(text) % 4
+                f.write(base64.b64decode(text[:cut]))
+                carry = text[cut:]
+            f.write(base64.b64decode(carry))
+        self.written.append(path)
+        return f"{IMAGES_DIR}/{name}"
+
+    def link(self, payload: str, name: str) -> str:
+        """Link to a payload, writing it first unless the stream already did."""
+        return payload[len(_ON_DISK):] if payload.startswith(_ON_DISK) else self.write(name, payload)
+
+
+def _cell_markdown(cell: dict[str, Any], index: int, lang: str, limits: OutputLimits, images: _ImageWriter) -> str:
+    """Render one cell the way nbconvert's Markdown template does."""
+    source = _join(cell.get("source"))
+    kind = cell.get("cell_type")
+    if kind == "markdown":
+        for name, bundle in (cell.get("attachments") or {}).items():
+            mime = next((m for m in BINARY_MIMES if m in bundle), None)
+            if mime:
+                link = images.write(f"{images.key}_{index}_{_slug(Path(name).stem)}{BINARY_MIMES[mime]}", bundle[mime])
+                source = source.replace(f"attachment:{name}", link)
+        return source + "\n\n"
+    if kind != "code":
+        return source + "\n\n"
+    parts = [f"```{lang}\n{source}\n```\n"]
+    for n, output in enumerate(cell.get("outputs") or []):
+        limit_output(output, limits)
+        otype = output.get("output_type")
+        if otype == "stream":
+            parts.append(_indent(output["text"]))
+        elif otype == "error":
+            parts.append(_indent(f"{output.get('ename', '')}: {output.get('evalue', '')}"))
+        else:
+            data = output.get("data") or {}
+            mime = next((m for m in BINARY_MIMES if m in data), None)
+            if mime:
+                link = images.link(_join(data[mime]), f"{images.key}_{index}_{n}{BINARY_MIMES[mime]}")
+                parts.append(f"![{mime.split('/')[1]}]({link})\n")
+            elif "image/svg+xml" in data:
+                path = images.dir / f"{images.key}_{index}_{n}.svg"
+                images.dir.mkdir(parents=True, exist_ok=True)
+                path.write_text(_join(data["image/svg+xml"]))
+                images.written.append(path)
+                parts.append(f"![svg]({IMAGES_DIR}/{path.name})\n")
+            elif "text/markdown" in data:
+                parts.append(_join(data["text/markdown"]) + "\n")
+            elif "text/html" in data:
+                parts.append(_join(data["text/html"]) + "\n")
+            elif "text/plain" in data:
+                parts.append(_indent(data["text/plain"]))
+    return "\n".join(parts) + "\n"
+
+
+def stream_notebook(
+    in_nb: Path,
+    out_md: Path,
+    title: str | None = None,
+    tags: list[str] | None = None,
+    limits: OutputLimits = OutputLimits(),
+) -> list[Path]:
+    """Export a notebook without loading it whole (needs ijson).
+
+    A first pass reads only the notebook metadata (title, language). The
+    second pass builds one cell at a time; image payloads are decoded to disk
+    in chunks as soon as their JSON string is read and the cell keeps just
+    the link. ijson hands over each string whole, so peak memory is about the
+    largest single output's base64 text plus one decode chunk. The post is
+    written to a ``.part`` file and renamed when complete.
+
+    Args:
+        in_nb: Notebook to export
+        out_md: Markdown file to write; images go to ``images/`` beside it
+        title: Post title (default: notebook metadata title, else the file name)
+        tags: Front-matter tags
+        limits: Truncation limits for text and HTML outputs
+
+    Returns:
+        Paths of the image files written
+    """
+    import ijson
+
+    with in_nb.open("rb") as f:
+        meta = next(ijson.items(f, "metadata"), None) or {}
+    lang = (meta.get("language_info") or {}).get("name") or (meta.get("kernelspec") or {}).get("language") or ""
+    title = title or meta.get("title") or _default_title(in_nb)
+
+    out_md.parent.mkdir(parents=True, exist_ok=True)
+    images = _ImageWriter(out_md)
+    part = out_md.with_name(out_md.name + ".part")
+    cell_index = output_index = -1
+    builder: ijson.ObjectBuilder | None = None
+    try:
+        with in_nb.open("rb") as f, part.open("w", encoding="utf-8") as out:
+            out.write(FRONT.format(title=title.replace('"', '\\"'), tags=", ".join(tags or [])) + "\n")
+            for prefix, event, value in ijson.parse(f):
+                if prefix == "cells.item" and event == "start_map":
+                    cell_index += 1
+                    output_index = -1
+                    builder = ijson.ObjectBuilder()
+                if builder is None:
+                    continue
+                if prefix == "cells.item.outputs.item" and event == "start_map":
+                    output_index += 1
+                elif event == "string" and prefix.startswith(_DATA_PREFIX):
+                    ext = BINARY_MIMES.get(prefix[len(_DATA_PREFIX):])
+                    if ext:
+                        value = _ON_DISK + images.write(f"{images.key}_{cell_index}_{output_index}{ext}", value)
+                builder.event(event, value)
+                if prefix == "cells.item" and event == "end_map":
+                    out.write(_cell_markdown(builder.value, cell_index, lang, limits, images))
+                    builder = None
+        part.replace(out_md)
+    finally:
+        part.unlink(missing_ok=True)
+    return images.written
+
+
+def export_notebook(
+    in_nb: Path,
+    out_md: Path,
+    title: str | None = None,
+    tags: list[str] | None = None,
+    exporter: "MarkdownExporter | None" = None,
+    limits: OutputLimits = OutputLimits(),
+    stream: bool | None = None,
+) -> list[Path]:
+    """Convert one notebook to Markdown and write its output images.
+
+    Args:
+        in_nb: Notebook to export
+        out_md: Markdown file to write; images go to ``images/`` beside it
+        title: Post title (default: notebook metadata title, else the file name)
+        tags: Front-matter tags
+        exporter: Reused MarkdownExporter (default: the worker's, or a new one)
+        limits: Truncation limits for text and HTML outputs
+        stream: Use stream_notebook; None streams notebooks over
+            STREAM_ABOVE_BYTES when ijson is installed
+
+    Returns:
+        Paths of the image files written
+
+    Raises:
+        FileNotFoundError: If the notebook does not exist
+        ImportError: If ``stream`` is True and ijson is not installed
+    """
+    if stream is None:
+        stream = in_nb.stat().st_size > STREAM_ABOVE_BYTES and _has_ijson()
+    if stream:
+        return stream_notebook(in_nb, out_md, title, tags, limits)
+
+    import nbformat
+
+    if exporter is None:
+        exporter = _exporter if _exporter is not None else _init_worker()
+    nb = nbformat.read(str(in_nb), as_version=4)
+    for cell in nb.cells:
+        for output in cell.get("outputs", []):
+            limit_output(output, limits)
+    body, resources = exporter.from_notebook_node(
+        nb, resources={"output_files_dir": IMAGES_DIR, "unique_key": _slug(out_md.stem)}
+    )
+    title = title or nb.metadata.get("title") or _default_title(in_nb)
+
+    out_md.parent.mkdir(parents=True, exist_ok=True)
+    images: list[Path] = []
+    for name, data in resources.get("outputs", {}).items():
+        path = out_md.parent / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        images.append(path)
+    fm = FRONT.format(title=title.replace('"', '\\"'), tags=", ".join(tags or []))
+    out_md.write_text(fm + "\n" + body)
+    return images
+
+
+def _export_one(in_nb: str, out_md: str, tags: list[str], limits: OutputLimits, stream: bool | None) -> dict[str, Any]:
+    """Export one notebook (runs in a worker process)."""
+    try:
+        images = export_notebook(Path(in_nb), Path(out_md), tags=tags, limits=limits, stream=stream)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+    return {"images": [Path(p).relative_to(Path(out_md).parent).as_posix() for p in images]}
+
+
+def _fingerprint(in_nb: Path, tags: list[str], limits: OutputLimits) -> str:
+    h = hashlib.sha256()
+    with in_nb.open("rb") as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    h.update(json.dumps({"tags": tags, "limits": vars(limits)}).encode("utf-8"))
+    return h.hexdigest()
+
+
+def export_dir(
+    in_dir: Path,
+    out_dir: Path,
+    tags: list[str] | None = None,
+    workers: int | None = None,
+    force: bool = False,
+    limits: OutputLimits = OutputLimits(),
+    stream: bool | None = None,
+) -> ExportReport:
+    """Export every ``*.ipynb`` under ``in_dir`` whose content changed since the last run.
+
+    ``in_dir/sub/nb.ipynb`` becomes ``out_dir/sub/nb.md``. Checkpoint folders are ignored.
+
+    Args:
+        in_dir: Folder to scan for notebooks
+        out_dir: Where Markdown, images and ``.notebooks.json`` are written
+        tags: Front-matter tags for every post
+        workers: Process pool size (default: CPU count)
+        force: Re-export everything
+        limits: Truncation limits for text and HTML outputs
+        stream: Passed to export_notebook for every notebook
+
+    Returns:
+        An ExportReport listing exported, skipped and failed notebooks
+    """
+    started = time.perf_counter()
+    report = ExportReport()
+    tags = tags or []
+    out_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        index: dict[str, dict[str, Any]] = json.loads((out_dir / INDEX_NAME).read_text())
+    except (OSError, ValueError):
+        index = {}
+
+    todo: list[tuple[Path, Path, str, str]] = []
+    for nb in sorted(in_dir.rglob("*.ipynb")):
+        if ".ipynb_checkpoints" in nb.parts:
+            continue
+        key = nb.relative_to(in_dir).as_posix()
+        out_md = out_dir / nb.relative_to(in_dir).with_suffix(".md")
+        digest = _fingerprint(nb, tags, limits)
+        entry = index.get(key)
+        if not force and entry and entry["sha256"] == digest and out_md.exists():
+            report.skipped.append(nb)
+        else:
+            todo.append((nb, out_md, key, digest))
+
+    args = [(str(nb), str(out_md), tags, limits, stream) for nb, out_md, _, _ in todo]
+    if len(todo) >= MIN_PARALLEL and workers != 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            results = list(pool.map(_export_one, *zip(*args, strict=True)))
+    else:
+        results = [_export_one(*a) for a in args]
+
+    for (nb, out_md, key, digest), result in zip(todo, results, strict=True):
+        if "error" in result:
+            report.failed[nb] = result["error"]
+            index.pop(key, None)
+            print(f"✗ Failed: {nb}: {result['error']}")
+            continue
+        # images from an earlier export that this one no longer produces
+        for old in set((index.get(key) or {}).get("images", [])) - set(result["images"]):
+            (out_md.parent / old).unlink(missing_ok=True)
+        index[key] = {
+            "sha256": digest,
+            "md": out_md.relative_to(out_dir).as_posix(),
+            "source": Path(os.path.relpath(nb.resolve(), out_dir.resolve())).as_posix(),
+            "images": result["images"],
+        }
+        report.exported.append(nb)
+        print(f"Wrote {out_md} ({len(result['images'])} images)")
+
+    tmp = out_dir / (INDEX_NAME + ".tmp")
+    tmp.write_text(json.dumps(index, indent=2, sort_keys=True))
+    tmp.replace(out_dir / INDEX_NAME)
+    report.seconds = time.perf_counter() - started
+    return report
+
 
 def main() -> None:
-    """Export a Jupyter notebook to markdown with front-matter."""
+    """Export a Jupyter notebook (or a folder of them) to markdown with front-matter."""
     ap = argparse.ArgumentParser()
-    ap.add_argument("--in", dest="in_nb", required=True)
-    ap.add_argument("--out", dest="out_md", required=True)
-    ap.add_argument("--title", required=True)
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--in", dest="in_nb", help="Notebook to export")
+    src.add_argument("--in-dir", type=Path, help="Export every notebook under this folder")
+    ap.add_argument("--out", dest="out_md", help="Markdown file (with --in)")
+    ap.add_argument("--out-dir", type=Path, help="Output folder (with --in-dir)")
+    ap.add_argument("--title", help="Post title (default: notebook metadata or file name)")
     ap.add_argument("--tags", default="")
+    ap.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    ap.add_argument("--force", action="store_true", help="Re-export unchanged notebooks")
+    ap.add_argument("--stream", choices=("auto", "always", "never"), default="auto",
+                    help="Parse incrementally with ijson (auto: notebooks over 32 MB, if installed)")
+    ap.add_argument("--max-text-kb", type=int, default=OutputLimits.max_text_chars // 1000,
+                    help="Truncate stream/text outputs to this many KB")
+    ap.add_argument("--max-html-kb", type=int, default=OutputLimits.max_html_chars // 1000,
+                    help="Replace larger HTML outputs with their plain-text form")
     args = ap.parse_args()
 
-    nb = nbformat.read(args.in_nb, as_version=4)
-    exporter = MarkdownExporter()
-    body, resources = exporter.from_notebook_node(nb)
+    tags = _parse_tags(args.tags)
+    limits = OutputLimits(args.max_text_kb * 1000, args.max_html_kb * 1000)
+    stream = {"auto": None, "always": True, "never": False}[args.stream]
+    if stream and not _has_ijson():
+        ap.error("--stream always needs ijson: pip install ijson")
+    if args.in_dir:
+        if not args.out_dir:
+            ap.error("--out-dir is required with --in-dir")
+        report = export_dir(args.in_dir, args.out_dir, tags, args.workers, args.force, limits, stream)
+        rss, workers_rss = peak_rss_mb()
+        print(f"{len(report.exported)} exported, {len(report.skipped)} unchanged, "
+              f"{len(report.failed)} failed in {report.seconds:.1f}s "
+              f"(peak RSS {rss:.0f} MB, workers {workers_rss:.0f} MB)")
+        raise SystemExit(1 if report.failed else 0)
 
+    if not args.out_md:
+        ap.error("--out is required with --in")
     out = Path(args.out_md)
-    out.parent.mkdir(parents=True, exist_ok=True)
-    fm = FRONT.format(title=args.title.replace('"','\\"'),
-                      tags=", ".join(t.strip() for t in args.tags.split(",") if t.strip()))
-    out.write_text(fm + "\n" + body)
-    print("Wrote", out)
+    images = export_notebook(Path(args.in_nb), out, args.title, tags, limits=limits, stream=stream)
+    print("Wrote", out, f"({len(images)} images)" if images else "", f"peak RSS {peak_rss_mb()[0]:.0f} MB")
 
 if __name__ == "__main__":
     main()
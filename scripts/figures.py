@@ -0,0 +1,317 @@
+"""
+Figure registry with a parallel, incremental runner for article images.
+Figure functions are registered with @figure("name.png", **params) and return
+a matplotlib Figure; the runner exports each one into the output directory,
+rendering in a process pool with the Agg backend. Every figure is encoded in
+each candidate format (WebP and PNG at the lowest DPI that still reaches the
+target display width) and the smallest one within the figure's byte budget
+is written. SVG is not offered because Substack does not accept it as an
+image upload. <out>/.figures.json records, per declared name, the file that
+was chosen and why; the publisher reads it to upload images/chart.webp when
+the post references images/chart.png. A figure is skipped when the hash
+of its function source and export settings matches the last build and its
+file still exists. Module-level style changes and edits to shared helpers
+are not part of the hash; pass --force after changing them.
+Usage (from a chart script that registers figures):
+  python scripts/generate_article_images.py                 # changed figures only
+  python scripts/generate_article_images.py --force -j 4
+  python scripts/generate_article_images.py --out /tmp/imgs mcp-architecture.png
+"""
+import argparse
+import hashlib
+import inspect
+import io
+import json
+import math
+import os
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+DEFAULT_OUT_DIR = Path(__file__).resolve().parent.parent / "docs" / "images"
+INDEX_NAME = ".figures.json"
+FORMATS = ("webp", "png")
+# Substack's widest image slot at 2x, and the default per-upload budget of
+# tools/substack/images.py.
+DISPLAY_WIDTH_PX = 1456
+BYTE_BUDGET = 400_000
+WEBP_QUALITY = 90
+# One figure is not worth starting a process pool for.
+MIN_PARALLEL = 2
+
+
+@dataclass(frozen=True)
+class FigureSpec:
+    """A registered figure: the function that draws it and how it is exported.
+
+    Args:
+        output: Declared file name, as referenced from markdown
+        func: Returns the matplotlib Figure
+        params: Keyword arguments for ``func``
+        dpi: Highest DPI tried for raster formats
+        width_px: Raster outputs must be at least this wide
+        budget: Preferred maximum size of the written file in bytes
+        formats: Candidate formats (webp, png)
+
+    Raises:
+        ValueError: If ``formats`` is empty or names a format Substack cannot take
+    """
+
+    output: str
+    func: Callable[..., Any]
+    params: dict[str, Any] = field(default_factory=dict)
+    dpi: int = 300
+    width_px: int = DISPLAY_WIDTH_PX
+    budget: int = BYTE_BUDGET
+    formats: tuple[str, ...] = FORMATS
+
+    def __post_init__(self) -> None:
+        unsupported = [f for f in self.formats if f not in FORMATS]
+        if unsupported or not self.formats:
+            raise ValueError(f"{self.output}: formats must be some of {', '.join(FORMATS)}, got {self.formats}")
+
+    def fingerprint(self) -> str:
+        """Hash of everything that determines the exported file."""
+        payload = json.dumps(
+            {
+                "source": inspect.getsource(self.func),
+                "params": self.params,
+                "dpi": self.dpi,
+                "width_px": self.width_px,
+                "budget": self.budget,
+                "formats": self.formats,
+                "output": self.output,
+            },
+            sort_keys=True,
+            default=repr,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+REGISTRY: dict[str, FigureSpec] = {}
+
+
+def figure(
+    output: str,
+    *,
+    dpi: int = 300,
+    width_px: int = DISPLAY_WIDTH_PX,
+    budget: int = BYTE_BUDGET,
+    formats: tuple[str, ...] = FORMATS,
+    **params: Any,
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Register a function that returns a matplotlib Figure for ``output``.
+
+    Args:
+        output: Declared file name inside the output directory, e.g. "mcp-architecture.png"
+        dpi: Highest resolution tried for raster formats
+        width_px: Minimum pixel width of raster outputs
+        budget: Preferred maximum file size in bytes
+        formats: Candidate formats, any of webp, png
+        **params: Keyword arguments passed to the function (part of the hash)
+
+    Raises:
+        ValueError: If another figure already writes ``output``, or a format is unsupported
+    """
+
+    def register(func: Callable[..., Any]) -> Callable[..., Any]:
+        existing = REGISTRY.get(output)
+        if existing is not None and existing.func.__qualname__ != func.__qualname__:
+            raise ValueError(f"{output} is already produced by {existing.func.__qualname__}")
+        REGISTRY[output] = FigureSpec(output, func, dict(params), dpi, width_px, budget, tuple(formats))
+        return func
+
+    return register
+
+
+@dataclass
+class FigureReport:
+    """What a figure run did."""
+
+    rendered: list[str] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)
+    failed: dict[str, str] = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+def _use_agg() -> None:
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+def _encode(fig: Any, fmt: str, dpi: int) -> bytes:
+    buf = io.BytesIO()
+    extra = {"pil_kwargs": {"quality": WEBP_QUALITY, "method": 6}} if fmt == "webp" else {}
+    fig.savefig(buf, format=fmt, dpi=dpi, bbox_inches="tight", facecolor="white", **extra)
+    return buf.getvalue()
+
+
+def _pixel_width(data: bytes) -> int:
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as img:
+        return img.width
+
+
+def _raster_dpi(fig: Any, spec: FigureSpec) -> int:
+    """Lowest DPI at which the tightly cropped figure is ``width_px`` wide, capped at ``spec.dpi``."""
+    from matplotlib import rcParams
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    canvas = fig.canvas if hasattr(fig.canvas, "get_renderer") else FigureCanvasAgg(fig)
+    pad = rcParams["savefig.pad_inches"]
+    width_in = float(fig.get_tightbbox(canvas.get_renderer()).width) + 2 * (pad if isinstance(pad, float) else 0.1)
+    return max(1, min(spec.dpi, math.ceil(spec.width_px / width_in)))
+
+
+def export_figure(fig: Any, spec: FigureSpec) -> tuple[dict[str, Any], bytes]:
+    """Encode ``fig`` in every candidate format and pick the smallest that fits.
+
+    Candidates are rendered at the lowest DPI reaching ``spec.width_px``. The
+    smallest candidate within the byte budget wins, or the smallest overall
+    when none fits.
+
+    Returns:
+        (manifest entry without the hash, bytes of the chosen file)
+    """
+    stem = Path(spec.output).stem
+    dpi = _raster_dpi(fig, spec)
+    candidates: list[dict[str, Any]] = []
+    encoded: dict[str, bytes] = {}
+    for fmt in spec.formats:
+        fmt_dpi = dpi
+        data = _encode(fig, fmt, fmt_dpi)
+        width = _pixel_width(data)
+        if width < spec.width_px and fmt_dpi < spec.dpi:
+            # the tight-bbox estimate came out a pixel short
+            fmt_dpi += 1
+            data = _encode(fig, fmt, fmt_dpi)
+            width = _pixel_width(data)
+        info: dict[str, Any] = {"format": fmt, "dpi": fmt_dpi, "width_px": width, "width_ok": width >= spec.width_px}
+        info.update(file=f"{stem}.{fmt}", bytes=len(data))
+        candidates.append(info)
+        encoded[info["file"]] = data
+
+    wide = [c for c in candidates if c["width_ok"]] or candidates
+    fits = [c for c in wide if c["bytes"] <= spec.budget]
+    best = min(fits or wide, key=lambda c: c["bytes"])
+    entry = {k: best[k] for k in ("file", "format", "dpi", "width_px", "bytes")}
+    entry["within_budget"] = bool(fits)
+    entry["candidates"] = {f"{c['format']}@{c['dpi']}": c["bytes"] for c in candidates}
+    return entry, encoded[best["file"]]
+
+
+def _render(spec: FigureSpec, out_dir: str) -> dict[str, Any]:
+    """Draw, export and write one figure (runs in a worker process)."""
+    _use_agg()
+    import matplotlib.pyplot as plt
+
+    try:
+        fig = spec.func(**spec.params)
+        entry, data = export_figure(fig, spec)
+        plt.close(fig)
+    except Exception as e:
+        plt.close("all")
+        return {"error": f"{type(e).__name__}: {e}"}
+    (Path(out_dir) / entry["file"]).write_bytes(data)
+    return entry
+
+
+def _load_index(out_dir: Path) -> dict[str, dict[str, Any]]:
+    try:
+        index = json.loads((out_dir / INDEX_NAME).read_text())
+    except (OSError, ValueError):
+        return {}
+    return index if isinstance(index, dict) else {}
+
+
+def render_figures(
+    specs: list[FigureSpec] | None = None,
+    out_dir: Path = DEFAULT_OUT_DIR,
+    workers: int | None = None,
+    force: bool = False,
+) -> FigureReport:
+    """Render every figure whose fingerprint changed since the last run.
+
+    Args:
+        specs: Figures to consider (default: everything registered)
+        out_dir: Where images and the ``.figures.json`` index are written
+        workers: Process pool size (default: CPU count)
+        force: Re-render everything
+
+    Returns:
+        A FigureReport listing rendered, skipped and failed figures
+    """
+    started = time.perf_counter()
+    report = FigureReport()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    index = _load_index(out_dir)
+
+    todo: list[tuple[FigureSpec, str]] = []
+    for spec in REGISTRY.values() if specs is None else specs:
+        digest = spec.fingerprint()
+        entry = index.get(spec.output)
+        if (
+            not force
+            and isinstance(entry, dict)
+            and entry.get("hash") == digest
+            and (out_dir / entry["file"]).exists()
+        ):
+            report.skipped.append(spec.output)
+        else:
+            todo.append((spec, digest))
+
+    def record(spec: FigureSpec, digest: str, result: dict[str, Any]) -> None:
+        if "error" in result:
+            report.failed[spec.output] = result["error"]
+            index.pop(spec.output, None)
+            print(f"✗ Failed: {spec.output}: {result['error']}")
+            return
+        previous = index.get(spec.output)
+        if isinstance(previous, dict) and previous.get("file") not in (result["file"], spec.output):
+            (out_dir / previous["file"]).unlink(missing_ok=True)
+        index[spec.output] = {"hash": digest, **result}
+        report.rendered.append(spec.output)
+        others = ", ".join(f"{k} {v / 1000:.0f} KB" for k, v in result["candidates"].items())
+        note = "" if result["within_budget"] else f", over the {spec.budget / 1000:.0f} KB budget"
+        print(f"✓ Created: {spec.output} -> {result['file']} ({result['bytes'] / 1000:.0f} KB{note}; {others})")
+
+    if len(todo) >= MIN_PARALLEL and workers != 1:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_use_agg) as pool:
+            futures = {pool.submit(_render, spec, str(out_dir)): (spec, digest) for spec, digest in todo}
+            for fut in as_completed(futures):
+                record(*futures[fut], fut.result())
+    else:
+        for spec, digest in todo:
+            record(spec, digest, _render(spec, str(out_dir)))
+
+    tmp = out_dir / (INDEX_NAME + ".tmp")
+    tmp.write_text(json.dumps(index, indent=2, sort_keys=True))
+    tmp.replace(out_dir / INDEX_NAME)
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command-line entry point for scripts that register figures; returns an exit code."""
+    ap = argparse.ArgumentParser(description="Render registered figures (only those that changed)")
+    ap.add_argument("names", nargs="*", help="Output names to render (default: all)")
+    ap.add_argument("--out", type=Path, default=Path(os.getenv("FIGURES_OUT_DIR", DEFAULT_OUT_DIR)),
+                    help="Output directory (env: FIGURES_OUT_DIR)")
+    ap.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    ap.add_argument("--force", action="store_true", help="Re-render even unchanged figures")
+    args = ap.parse_args(argv)
+
+    unknown = [n for n in args.names if n not in REGISTRY]
+    if unknown:
+        ap.error(f"unknown figure(s): {', '.join(unknown)}; known: {', '.join(REGISTRY)}")
+    specs = [REGISTRY[n] for n in args.names] if args.names else None
+    report = render_figures(specs, args.out, args.workers, args.force)
+    print(f"\n{len(report.rendered)} rendered, {len(report.skipped)} unchanged, "
+          f"{len(report.failed)} failed in {report.seconds:.1f}s -> {args.out}")
+    return 1 if report.failed else 0
@@ -2,19 +2,28 @@
 """
 Generate images for Article 1: The Linguistic Exposure Layer
 Creates professional diagrams and visualizations for the Substack article.
+Figures are rendered in parallel and only when their code changed; see
+scripts/figures.py for the options (--out, -j, --force, figure names).
 """
 
 import json
+import sys
 
-import matplotlib.pyplot as plt
-from matplotlib.patches import FancyArrowPatch, FancyBboxPatch
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+from figures import figure, main  # noqa: E402
+from matplotlib.figure import Figure  # noqa: E402
+from matplotlib.patches import FancyArrowPatch, FancyBboxPatch  # noqa: E402
 
 plt.style.use('seaborn-v0_8-darkgrid')
 plt.rcParams['font.family'] = 'sans-serif'
 plt.rcParams['font.sans-serif'] = ['Arial', 'Helvetica', 'DejaVu Sans']
 plt.rcParams['font.size'] = 10
 
-def create_mcp_architecture_diagram() -> None:
+@figure("mcp-architecture.png")
+def create_mcp_architecture_diagram() -> Figure:
     """Create MCP architecture diagram showing layers."""
     fig, ax = plt.subplots(figsize=(12, 10))
     ax.set_xlim(0, 10)
@@ -103,12 +112,10 @@ def create_mcp_architecture_diagram() -> None:
             ha='center', va='center', fontsize=16, fontweight='bold')
 
     plt.tight_layout()
-    plt.savefig('/home/ubuntu/repos/nwsl-notes/docs/images/mcp-architecture.png',
-                dpi=300, bbox_inches='tight', facecolor='white')
-    print("✓ Created: mcp-architecture.png")
-    plt.close()
+    return fig
 
-def create_tool_categories_visualization() -> None:
+@figure("tool-categories.png")
+def create_tool_categories_visualization() -> Figure:
     """Create visualization of 38 tools organized by category."""
     fig, ax = plt.subplots(figsize=(14, 10))
     ax.set_xlim(0, 14)
@@ -181,12 +188,10 @@ def create_tool_categories_visualization() -> None:
                 ha='center', fontsize=8, style='italic')
 
     plt.tight_layout()
-    plt.savefig('/home/ubuntu/repos/nwsl-notes/docs/images/tool-categories.png',
-                dpi=300, bbox_inches='tight', facecolor='white')
-    print("✓ Created: tool-categories.png")
-    plt.close()
+    return fig
 
-def create_envelope_structure_diagram() -> None:
+@figure("envelope-structure.png")
+def create_envelope_structure_diagram() -> Figure:
     """Create annotated diagram of the envelope response structure."""
     fig, ax = plt.subplots(figsize=(12, 10))
     ax.set_xlim(0, 12)
@@ -258,12 +263,10 @@ def create_envelope_structure_diagram() -> None:
             ha='center', fontsize=9, style='italic', wrap=True)
 
     plt.tight_layout()
-    plt.savefig('/home/ubuntu/repos/nwsl-notes/docs/images/envelope-structure.png',
-                dpi=300, bbox_inches='tight', facecolor='white')
-    print("✓ Created: envelope-structure.png")
-    plt.close()
+    return fig
 
-def create_code_generation_example() -> None:
+@figure("code-generation.png")
+def create_code_generation_example() -> Figure:
     """Create visualization of natural language to code generation."""
     fig, ax = plt.subplots(figsize=(12, 8))
     ax.set_xlim(0, 12)
@@ -341,16 +344,8 @@ LIMIT 10'''
             color='#E74C3C', ha='center')
 
     plt.tight_layout()
-    plt.savefig('/home/ubuntu/repos/nwsl-notes/docs/images/code-generation.png',
-                dpi=300, bbox_inches='tight', facecolor='white')
-    print("✓ Created: code-generation.png")
-    plt.close()
+    return fig
 
 if __name__ == '__main__':
     print("Generating images for Article 1...")
-    create_mcp_architecture_diagram()
-    create_tool_categories_visualization()
-    create_envelope_structure_diagram()
-    create_code_generation_example()
-    print("\n✓ All images generated successfully!")
-    print("Images saved to: /home/ubuntu/repos/nwsl-notes/docs/images/")
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""Tests for figures module."""
+
+import json
+
+import pytest
+
+pytest.importorskip("matplotlib")
+
+from scripts import figures  # noqa: E402
+from scripts.figures import FigureSpec, render_figures  # noqa: E402
+
+
+def bar_chart(values=(1, 2, 3)):
+    """Draw a tiny bar chart."""
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(1, 1))
+    fig.add_subplot().bar(range(len(values)), values)
+    return fig
+
+
+def broken_chart():
+    """Fail while drawing."""
+    raise RuntimeError("no data")
+
+
+class TestRenderFigures:
+    """Tests for render_figures function."""
+
+    def test_renders_then_skips(self, tmp_path):
+        """Test that an unchanged figure is skipped on the second run."""
+        spec = FigureSpec("bars.png", bar_chart, dpi=20, formats=("png",))
+        first = render_figures([spec], tmp_path, workers=1)
+        assert first.rendered == ["bars.png"]
+        assert (tmp_path / "bars.png").exists()
+        assert json.loads((tmp_path / ".figures.json").read_text())["bars.png"]["hash"] == spec.fingerprint()
+        second = render_figures([spec], tmp_path, workers=1)
+        assert second.skipped == ["bars.png"]
+        assert second.rendered == []
+
+    def test_params_and_missing_file_rerender(self, tmp_path):
+        """Test that new parameters or a deleted output trigger a re-render."""
+        render_figures([FigureSpec("bars.png", bar_chart, dpi=20, formats=("png",))], tmp_path, workers=1)
+        changed = FigureSpec("bars.png", bar_chart, {"values": (3, 2, 1)}, dpi=20, formats=("png",))
+        assert render_figures([changed], tmp_path, workers=1).rendered == ["bars.png"]
+        (tmp_path / "bars.png").unlink()
+        assert render_figures([changed], tmp_path, workers=1).rendered == ["bars.png"]
+
+    def test_parallel_with_failure(self, tmp_path):
+        """Test that the pool renders figures and a failure is reported, not indexed."""
+        specs = [
+            FigureSpec("a.png", bar_chart, dpi=20),
+            FigureSpec("b.png", bar_chart, {"values": (4,)}, dpi=20),
+            FigureSpec("bad.png", broken_chart, dpi=20),
+        ]
+        report = render_figures(specs, tmp_path, workers=2)
+        assert sorted(report.rendered) == ["a.png", "b.png"]
+        assert "no data" in report.failed["bad.png"]
+        assert "bad.png" not in json.loads((tmp_path / ".figures.json").read_text())
+
+
+class TestExport:
+    """Tests for the size-budgeted format choice."""
+
+    def test_picks_smallest_that_meets_width(self, tmp_path):
+        """Test that rasters reach the display width at the lowest DPI and the smallest file wins."""
+        spec = FigureSpec("bars.png", bar_chart, width_px=400, dpi=600)
+        report = render_figures([spec], tmp_path, workers=1)
+        entry = json.loads((tmp_path / ".figures.json").read_text())["bars.png"]
+        assert report.rendered == ["bars.png"]
+        assert {k.split("@")[0] for k in entry["candidates"]} == {"webp", "png"}
+        assert all(int(k.split("@")[1]) < 600 for k in entry["candidates"])
+        assert entry["bytes"] == min(entry["candidates"].values())
+        assert (tmp_path / entry["file"]).stat().st_size == entry["bytes"]
+        assert 400 <= entry["width_px"] < 420
+        assert entry["within_budget"]
+
+    def test_over_budget_still_written(self, tmp_path):
+        """Test that the smallest candidate is kept and flagged when none fits the budget."""
+        spec = FigureSpec("bars.png", bar_chart, width_px=300, budget=10, formats=("png", "webp"))
+        render_figures([spec], tmp_path, workers=1)
+        entry = json.loads((tmp_path / ".figures.json").read_text())["bars.png"]
+        assert not entry["within_budget"]
+        assert entry["bytes"] == min(entry["candidates"].values())
+
+    def test_format_change_removes_old_file(self, tmp_path):
+        """Test that switching the chosen format deletes the previous export."""
+        render_figures([FigureSpec("bars.png", bar_chart, dpi=20, formats=("webp",))], tmp_path, workers=1)
+        assert (tmp_path / "bars.webp").exists()
+        render_figures([FigureSpec("bars.png", bar_chart, dpi=20, formats=("png",))], tmp_path, workers=1)
+        assert not (tmp_path / "bars.webp").exists()
+        assert (tmp_path / "bars.png").exists()
+
+    def test_svg_rejected(self):
+        """Test that SVG, which Substack will not take as an upload, is not a candidate."""
+        with pytest.raises(ValueError, match="formats must be"):
+            FigureSpec("bars.png", bar_chart, formats=("svg", "png"))
+
+
+class TestFigureDecorator:
+    """Tests for the figure registration decorator."""
+
+    def test_register_and_conflict(self, monkeypatch):
+        """Test that figures register by output name and names cannot be reused."""
+        monkeypatch.setattr(figures, "REGISTRY", {})
+        figures.figure("bars.png", dpi=50, values=(1,))(bar_chart)
+        assert figures.REGISTRY["bars.png"] == FigureSpec("bars.png", bar_chart, {"values": (1,)}, 50)
+        figures.figure("small.png", budget=50_000, formats=("webp",))(bar_chart)
+        assert figures.REGISTRY["small.png"].formats == ("webp",)
+        with pytest.raises(ValueError, match="already produced"):
+            figures.figure("bars.png")(broken_chart)
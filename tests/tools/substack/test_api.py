@@ -0,0 +1,192 @@
+"""Tests for api module."""
+
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+from benchmarks.mock_substack.server import PIXEL, MockSubstack
+from tools.substack.api import DraftApi, DraftApiError, local_image_sources, publish_engine
+from tools.substack.checkpoint import PublishJournal
+from tools.substack.publish_to_substack import (
+    _publish_via_api,
+    create_or_update_draft,
+    post_digest,
+    publish_batch,
+)
+
+
+@pytest.fixture
+def mock(tmp_path: Path, monkeypatch):
+    """Serve the mock API with a valid saved session, from a scratch directory."""
+    monkeypatch.chdir(tmp_path)
+    with MockSubstack() as server:
+        monkeypatch.setenv("SUBSTACK_BASE_URL", server.base_url)
+        monkeypatch.setenv("SUBSTACK_OPTIMIZE_IMAGES", "0")
+        server.write_storage_state(Path(".playwright/storage_state.json"))
+        yield server
+
+
+def write_post(name: str, images: int = 2) -> Path:
+    """Write a post referencing ``images`` local PNGs, one of them twice."""
+    Path("images").mkdir(exist_ok=True)
+    refs = []
+    for i in range(images):
+        (Path("images") / f"{name}-{i}.png").write_bytes(PIXEL)
+        refs.append(f"![chart {i}](images/{name}-{i}.png)")
+    md = Path(f"{name}.md")
+    md.write_text(f"---\ntitle: {name.title()}\ntags: [nwsl]\n---\n\nIntro.\n\n" + "\n\n".join(refs + refs[:1]) + "\n")
+    return md
+
+
+def calls(mock: MockSubstack) -> list[tuple[str, str]]:
+    """Return the method and path of every API request the mock received."""
+    return [(method, path) for method, path, _ in mock.stats.requests if path.startswith("/api/")]
+
+
+class TestPublishEngine:
+    """Tests for publish_engine function."""
+
+    def test_default_and_env(self, monkeypatch):
+        """Test that the browser is the default and SUBSTACK_ENGINE or the argument selects."""
+        monkeypatch.delenv("SUBSTACK_ENGINE", raising=False)
+        assert publish_engine() == "browser"
+        monkeypatch.setenv("SUBSTACK_ENGINE", "API")
+        assert publish_engine() == "api"
+        assert publish_engine("browser") == "browser"
+        with pytest.raises(ValueError, match="Unknown publish engine"):
+            publish_engine("curl")
+
+
+class TestLocalImageSources:
+    """Tests for local_image_sources function."""
+
+    def test_resolves_local_files_only(self, tmp_path):
+        """Test that remote and missing images are left out."""
+        (tmp_path / "a b.png").write_bytes(PIXEL)
+        html = '<img src="a%20b.png" alt="" /><img src="https://x/y.png" alt="" /><img src="gone.png" alt="" />'
+        assert local_image_sources(html, tmp_path) == {"a%20b.png": (tmp_path / "a b.png").resolve()}
+
+
+class TestUploadImages:
+    """Tests for DraftApi.upload_images."""
+
+    def test_failure_cancels_siblings(self, tmp_path: Path):
+        """Test that one failed upload cancels the others instead of waiting for them."""
+        import httpx
+
+        (tmp_path / "slow.png").write_bytes(PIXEL)
+        (tmp_path / "bad.png").write_bytes(b"bad")
+        cancelled: list[str] = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if json.loads(request.content)["image"].endswith(",YmFk"):
+                return httpx.Response(500)
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append("slow")
+                raise
+            return httpx.Response(200, json={"url": "https://cdn/slow.png"})
+
+        async def run() -> list[str]:
+            async with DraftApi("https://nwsl.test", {}, transport=httpx.MockTransport(handler)) as api:
+                with pytest.raises(DraftApiError, match="upload bad.png"):
+                    await api.upload_images([tmp_path / "slow.png", tmp_path / "bad.png"])
+                return list(cancelled)
+
+        assert asyncio.run(asyncio.wait_for(run(), 2)) == ["slow"]
+
+    def test_unreadable_file(self, tmp_path: Path):
+        """Test that an image that cannot be read raises DraftApiError."""
+
+        async def run() -> None:
+            async with DraftApi("https://nwsl.test", {}) as api:
+                await api.upload_images([tmp_path / "missing.png"])
+
+        with pytest.raises(DraftApiError, match="cannot read image"):
+            asyncio.run(run())
+
+
+class TestCreateOrUpdateDraft:
+    """Tests for the API engine through create_or_update_draft, which needs no browser."""
+
+    def test_draft_via_api(self, mock):
+        """Test that images are uploaded once each, before a single draft save carrying their URLs."""
+        md = write_post("xg")
+        asyncio.run(create_or_update_draft("nwsl", md, publish=False, login=False, engine="api"))
+        posts = calls(mock)
+        assert posts[0][1].startswith("/api/v1/drafts?")  # the session preflight
+        assert sorted(posts[1:3]) == [("POST", "/api/v1/image")] * 2
+        assert posts[3:] == [("POST", "/api/v1/drafts")]
+        (draft,) = mock.stats.drafts.values()
+        assert draft["draft_title"] == "Xg" and draft["tags"] == ["nwsl"]
+        blocks = json.loads(draft["draft_body"])["content"]
+        srcs = [b["content"][0]["attrs"]["src"] for b in blocks if b["type"] == "captionedImage"]
+        assert len(srcs) == 3 and srcs[0] == srcs[2] and srcs[0] != srcs[1]
+        assert all(src.startswith("/images/") for src in srcs)
+
+    def test_publish_then_skip(self, mock):
+        """Test that publishing calls the publish endpoint and records the manifest."""
+        md = write_post("vaep", images=0)
+        asyncio.run(create_or_update_draft("nwsl", md, publish=True, login=False, engine="api"))
+        asyncio.run(create_or_update_draft("nwsl", md, publish=True, login=False, engine="api"))
+        assert mock.stats.published == {1}
+        assert len(mock.stats.drafts) == 1
+
+
+class TestPublishViaApi:
+    """Tests for the fallback decision."""
+
+    def test_failed_upload_falls_back(self, mock):
+        """Test that an API error hands the post to the editor without saving a draft."""
+        md = write_post("xg", images=1)
+        mock.fail_uploads = 1
+        journal = PublishJournal(md, "nwsl", post_digest(md))
+
+        async def run() -> tuple[bool, str | None]:
+            async with DraftApi.for_space("nwsl", Path(".playwright/storage_state.json")) as api:
+                return await _publish_via_api(api, md, False, journal)
+
+        assert asyncio.run(run()) == (False, None)
+        assert mock.stats.drafts == {} and journal.draft_url is None
+
+    def test_failed_publish_keeps_draft(self, mock):
+        """Test that a draft saved before a failed publish is journaled and then reused."""
+        md = write_post("xg", images=0)
+        mock.fail_publishes = 1
+        journal = PublishJournal(md, "nwsl", post_digest(md))
+
+        async def run() -> tuple[bool, str | None]:
+            async with DraftApi.for_space("nwsl", Path(".playwright/storage_state.json")) as api:
+                return await _publish_via_api(api, md, True, journal)
+
+        assert asyncio.run(run()) == (False, f"{mock.base_url}/publish/post/1")
+        assert journal.draft_url == f"{mock.base_url}/publish/post/1"
+        assert asyncio.run(run()) == (True, None)
+        assert ("PUT", "/api/v1/drafts/1") in calls(mock)
+        assert len(mock.stats.drafts) == 1 and mock.stats.published == {1}
+
+
+    def test_failed_publish_without_journal(self, mock):
+        """Test that the saved draft's URL is returned even when checkpoints are off."""
+        md = write_post("xg", images=0)
+        mock.fail_publishes = 1
+
+        async def run() -> tuple[bool, str | None]:
+            async with DraftApi.for_space("nwsl", Path(".playwright/storage_state.json")) as api:
+                return await _publish_via_api(api, md, True, None)
+
+        assert asyncio.run(run()) == (False, f"{mock.base_url}/publish/post/1")
+
+
+class TestPublishBatch:
+    """Tests for publish_batch with the API engine."""
+
+    def test_batch_without_browser(self, mock):
+        """Test that every post goes through the API and none is left for the editor."""
+        files = [write_post(name, images=1) for name in ("a", "b", "c")]
+        results = asyncio.run(publish_batch("nwsl", files, publish=False, concurrency=2, engine="api"))
+        assert [r.ok for r in results] == [True, True, True]
+        assert len(mock.stats.drafts) == 3 and mock.stats.uploads == 3
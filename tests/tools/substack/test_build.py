@@ -0,0 +1,89 @@
+"""Tests for build module."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from tools.substack.build import build, discover, load_built
+
+
+@pytest.fixture
+def docs(tmp_path: Path, monkeypatch) -> Path:
+    """Create a docs/ tree with five posts and chdir into its parent."""
+    monkeypatch.chdir(tmp_path)
+    root = tmp_path / "docs"
+    (root / "nested").mkdir(parents=True)
+    for i in range(4):
+        (root / f"post-{i}.md").write_text(f"---\ntitle: Post {i}\ntags: [t{i}]\n---\n\nBody {i}\n")
+    (root / "nested" / "deep.md").write_text("# Deep\n\n```python\nx = 1\n```\n")
+    return root
+
+
+class TestBuild:
+    """Tests for build and load_built functions."""
+
+    def test_discover(self, docs):
+        """Test that posts are found recursively."""
+        assert len(discover([docs])) == 5
+
+    def test_incremental(self, docs, tmp_path):
+        """Test that only edited posts are re-rendered."""
+        out = tmp_path / "build"
+        first = build([docs], out, workers=2)
+        assert len(first.rendered) == 5 and not first.failed
+
+        second = build([docs], out, workers=2)
+        assert not second.rendered and len(second.reused) == 5
+
+        post = docs / "post-1.md"
+        post.write_text(post.read_text() + "\nMore.\n")
+        third = build([docs], out)
+        assert third.rendered == [post]
+
+    def test_touch_without_edit(self, docs, tmp_path):
+        """Test that an mtime change with identical content is not re-rendered."""
+        out = tmp_path / "build"
+        build([docs], out, workers=1)
+        post = docs / "post-0.md"
+        st = post.stat()
+        os.utime(post, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        assert not build([docs], out, workers=1).rendered
+
+    def test_removed(self, docs, tmp_path):
+        """Test that deleted posts drop out of the index."""
+        out = tmp_path / "build"
+        build([docs], out, workers=1)
+        (docs / "post-3.md").unlink()
+        assert build([docs], out, workers=1).removed == ["docs/post-3.md"]
+
+    def test_load_built(self, docs, tmp_path):
+        """Test that fresh artifacts match read_post and stale ones are ignored."""
+        out = tmp_path / "build"
+        build([docs], out, workers=1)
+        title, tags, html, assets = load_built(Path("docs/nested/deep.md"), out)
+        assert title == "Deep"
+        assert '<code data-language="python">' in html
+        post = docs / "post-2.md"
+        post.write_text("changed")
+        assert load_built(post, out) is None
+
+    def test_image_dependencies(self, docs, tmp_path):
+        """Test that an image appearing or a figure re-export makes the artifact stale."""
+        out = tmp_path / "build"
+        post = docs / "fig.md"
+        post.write_text("![chart](fig/chart.png)\n")
+        build([post], out, workers=1)
+        assert load_built(post, out)[3] == []
+
+        (docs / "fig").mkdir()
+        (docs / "fig" / "chart.png").write_bytes(b"png")
+        assert load_built(post, out) is None
+        assert build([post], out, workers=1).rendered == [post]
+        assert load_built(post, out)[3] == [(docs / "fig" / "chart.png").resolve()]
+
+        (docs / "fig" / "chart.svg").write_text("<svg/>")
+        (docs / "fig" / ".figures.json").write_text('{"chart.png": {"file": "chart.svg"}}')
+        assert load_built(post, out) is None
+        build([post], out, workers=1)
+        assert 'src="fig/chart.svg"' in load_built(post, out)[2]
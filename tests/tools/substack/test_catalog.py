@@ -0,0 +1,85 @@
+"""Tests for catalog module."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from tools.substack.catalog import HIGHLIGHT, Catalog, parse_post
+
+
+@pytest.fixture
+def corpus(tmp_path: Path, monkeypatch) -> Path:
+    """Create docs/ and archive/ posts and chdir into their parent."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "archive").mkdir()
+    (tmp_path / "docs" / "2025-05-01-vaep.md").write_text(
+        "---\ntitle: Valuing actions\ntags: [nwsl, VAEP]\n---\n\nPlayers ranked by VAEP.\n\n"
+        "![chart](images/vaep-chart.png)\n"
+    )
+    (tmp_path / "docs" / "xg.md").write_text(
+        "---\ntitle: Expected goals\ntags: [nwsl]\ndate: 2025-06-01\n---\n\nShot quality and finishing.\n"
+    )
+    (tmp_path / "archive" / "notes.md").write_text("# Old notes\n\n**Date**: 2024-01-02\n\nRunning passes.\n")
+    return tmp_path
+
+
+@pytest.fixture
+def catalog(corpus: Path):
+    """Open a catalog in the fixture tree and index it."""
+    with Catalog(corpus / "catalog.sqlite") as cat:
+        cat.refresh([Path("docs"), Path("archive")])
+        yield cat
+
+
+class TestParsePost:
+    """Tests for parse_post function."""
+
+    def test_without_front_matter(self):
+        """Test that the heading and a Date line stand in for front-matter."""
+        fields = parse_post(Path("notes.md"), "# Old notes\n\n**Date**: 2024-01-02\n")
+        assert fields["title"] == "Old notes"
+        assert fields["date"] == "2024-01-02"
+        assert fields["tags"] == []
+
+
+class TestCatalog:
+    """Tests for Catalog refresh and queries."""
+
+    def test_list_filters(self, catalog):
+        """Test tag, image and date filters, newest first."""
+        assert [e.path for e in catalog.list_posts()] == ["docs/xg.md", "docs/2025-05-01-vaep.md", "archive/notes.md"]
+        assert [e.title for e in catalog.list_posts(tags=["NWSL", "vaep"])] == ["Valuing actions"]
+        assert [e.path for e in catalog.list_posts(image="vaep")] == ["docs/2025-05-01-vaep.md"]
+        assert [e.date for e in catalog.list_posts(since="2025-01-01", until="2025-05-31")] == ["2025-05-01"]
+
+    def test_search(self, catalog):
+        """Test stemmed full-text search with filters and highlighted snippets."""
+        (hit,) = catalog.search("ranked player")
+        assert hit.path == "docs/2025-05-01-vaep.md"
+        assert f"{HIGHLIGHT[0]}Players{HIGHLIGHT[1]}" in hit.snippet
+        assert [e.path for e in catalog.search("pass*")] == ["archive/notes.md"]
+        assert catalog.search("shot", tags=["vaep"]) == []
+        assert catalog.search('"unbalanced') == []
+
+    def test_incremental_refresh(self, catalog, corpus):
+        """Test that only edited files are re-indexed and deleted ones are dropped."""
+        roots = [Path("docs"), Path("archive")]
+        assert catalog.refresh(roots).indexed == []
+        post = corpus / "docs" / "xg.md"
+        st = post.stat()
+        os.utime(post, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        assert catalog.refresh(roots).indexed == []
+        post.write_text("---\ntitle: Expected goals\ntags: [nwsl]\n---\n\nPenalties excluded.\n")
+        (corpus / "archive" / "notes.md").unlink()
+        report = catalog.refresh(roots)
+        assert report.indexed == ["docs/xg.md"]
+        assert report.removed == ["archive/notes.md"]
+        assert [e.path for e in catalog.search("penalty")] == ["docs/xg.md"]
+        assert catalog.search("passes") == []
+
+    def test_refresh_keeps_other_roots(self, catalog):
+        """Test that refreshing one root does not drop posts from another."""
+        assert catalog.refresh([Path("docs")]).removed == []
+        assert len(catalog.list_posts()) == 3
@@ -0,0 +1,116 @@
+"""Tests for changes module."""
+
+import json
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from tools.substack.changes import DependencyGraph, changed_files, figure_scripts, plan_changes
+
+CHART_SCRIPT = '''from figures import figure
+
+
+@figure("chart.png", dpi=100)
+def chart():
+    return None
+'''
+
+
+def git(repo: Path, *args: str) -> None:
+    """Run a git command in ``repo``."""
+    subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+        cwd=repo, check=True, capture_output=True,
+    )
+
+
+@pytest.fixture
+def repo(tmp_path: Path, monkeypatch) -> Path:
+    """Create a committed repo with a figure post, a plain post and a notebook post."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "scripts").mkdir()
+    (tmp_path / "scripts" / "charts.py").write_text(CHART_SCRIPT)
+    (tmp_path / "scripts" / "figures.py").write_text("def figure(*a, **k): ...\n")
+    images = tmp_path / "docs" / "images"
+    images.mkdir(parents=True)
+    (images / "chart.png").write_bytes(b"png")
+    (images / "photo.jpg").write_bytes(b"jpg")
+    (tmp_path / "docs" / "figures.md").write_text("# Figures\n\n![c](images/chart.png)\n")
+    (tmp_path / "docs" / "photo.md").write_text("# Photo\n\n![p](images/photo.jpg)\n")
+    (tmp_path / "docs" / "nb.md").write_text("# From a notebook\n")
+    (tmp_path / "notebooks").mkdir()
+    (tmp_path / "notebooks" / "nb.ipynb").write_text("{}")
+    (tmp_path / "docs" / ".notebooks.json").write_text(
+        json.dumps({"nb.ipynb": {"md": "nb.md", "source": "../notebooks/nb.ipynb", "images": []}})
+    )
+    git(tmp_path, "init", "-q")
+    git(tmp_path, "add", ".")
+    git(tmp_path, "commit", "-qm", "initial")
+    return tmp_path
+
+
+class TestFigureScripts:
+    """Tests for figure_scripts function."""
+
+    def test_finds_literal_names(self, repo):
+        """Test that decorated figures are found without importing the script."""
+        assert figure_scripts(Path("scripts")) == {"chart.png": Path("scripts/charts.py")}
+
+
+class TestDependencyGraph:
+    """Tests for DependencyGraph plans."""
+
+    @pytest.fixture
+    def graph(self, repo) -> DependencyGraph:
+        """Scan the fixture repo."""
+        return DependencyGraph.scan([Path("docs")])
+
+    def test_script_change_rebuilds_its_posts(self, graph):
+        """Test that editing a chart script re-runs it and republishes only its posts."""
+        plan = graph.plan(["scripts/charts.py"])
+        assert plan.posts == ["docs/figures.md"]
+        assert plan.figure_scripts == ["scripts/charts.py"]
+        assert graph.plan(["scripts/figures.py"]).figure_scripts == ["scripts/charts.py"]
+
+    def test_image_change(self, graph):
+        """Test that a changed image pulls in the posts using it but no script."""
+        plan = graph.plan(["docs/images/photo.jpg"])
+        assert plan.posts == ["docs/photo.md"]
+        assert plan.figure_scripts == []
+        assert plan.reasons == {"docs/photo.md": ["docs/images/photo.jpg"]}
+
+    def test_notebook_change(self, graph):
+        """Test that a notebook maps to its exported post."""
+        plan = graph.plan(["notebooks/nb.ipynb"])
+        assert plan.posts == ["docs/nb.md"]
+        assert plan.notebooks == {"notebooks/nb.ipynb": "docs/nb.md"}
+
+    def test_missing_figure(self, repo):
+        """Test that a figure not generated yet still links its script to the post."""
+        (repo / "scripts" / "charts.py").write_text(CHART_SCRIPT.replace("chart.png", "new.png"))
+        (repo / "docs" / "new.md").write_text("# New\n\n![n](images/new.png)\n")
+        plan = DependencyGraph.scan([Path("docs")]).plan(["scripts/charts.py"])
+        assert plan.posts == ["docs/new.md"]
+        assert plan.figure_scripts == ["scripts/charts.py"]
+
+    def test_unrelated_change(self, graph):
+        """Test that files no post depends on select nothing."""
+        assert graph.plan(["README.md", "docs/images/unused.png"]).posts == []
+
+
+class TestPlanChanges:
+    """Tests for changed_files and plan_changes."""
+
+    def test_commit_range(self, repo):
+        """Test that only posts affected by the range are planned."""
+        (repo / "docs" / "images" / "chart.png").write_bytes(b"png v2")
+        (repo / "docs" / "photo.md").write_text("# Photo, edited\n\n![p](images/photo.jpg)\n")
+        git(repo, "commit", "-qam", "edit")
+        assert sorted(changed_files("HEAD^..HEAD")) == ["docs/images/chart.png", "docs/photo.md"]
+        assert plan_changes("HEAD^..HEAD", [Path("docs")]).posts == ["docs/figures.md", "docs/photo.md"]
+
+    def test_bad_range(self, repo):
+        """Test that an unknown revision raises."""
+        with pytest.raises(RuntimeError, match="git diff"):
+            changed_files("nope..HEAD")
@@ -0,0 +1,67 @@
+"""Tests for checkpoint module."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from tools.substack.checkpoint import PublishJournal, checkpoints_enabled
+
+
+@pytest.fixture
+def post(tmp_path: Path, monkeypatch) -> Path:
+    """Create a post and chdir next to it."""
+    monkeypatch.chdir(tmp_path)
+    md = tmp_path / "post.md"
+    md.write_text("# Post\n")
+    return md
+
+
+class TestPublishJournal:
+    """Tests for PublishJournal."""
+
+    def test_resume_from_disk(self, post, tmp_path):
+        """Test that steps and the saved draft URL survive a restart."""
+        journal = PublishJournal(post, "nwsl", "abc", tmp_path)
+        journal.complete("title", "https://nwsl.substack.com/publish/post/new")
+        assert journal.draft_url is None
+        journal.complete("body", "https://nwsl.substack.com/publish/post/42")
+        journal.complete("image:images/a.png", "https://nwsl.substack.com/publish/post/42")
+
+        again = PublishJournal(post, "nwsl", "abc", tmp_path)
+        assert again.resuming
+        assert again.draft_url == "https://nwsl.substack.com/publish/post/42"
+        assert again.done("image:images/a.png") and not again.done("tags")
+        assert json.loads(again.path.read_text())["post"] == "post.md"
+
+    def test_edited_post_keeps_draft_only(self, post, tmp_path):
+        """Test that a changed post redoes every step in the same draft."""
+        PublishJournal(post, "nwsl", "abc", tmp_path).complete("body", "/publish/post/7")
+        edited = PublishJournal(post, "nwsl", "def", tmp_path)
+        assert edited.draft_url == "/publish/post/7"
+        assert edited.steps == []
+
+    def test_other_space_and_clear(self, post, tmp_path):
+        """Test that another space starts fresh and clear() removes the journal."""
+        journal = PublishJournal(post, "nwsl", "abc", tmp_path)
+        journal.complete("body", "/publish/post/7")
+        assert not PublishJournal(post, "other", "abc", tmp_path).resuming
+        journal.clear()
+        assert not journal.path.exists()
+        assert not PublishJournal(post, "nwsl", "abc", tmp_path).resuming
+
+    def test_reset_keeps_listed_steps(self, post, tmp_path):
+        """Test that reset() forgets steps but not the draft."""
+        journal = PublishJournal(post, "nwsl", "abc", tmp_path)
+        for step in ("title", "body", "tags"):
+            journal.complete(step, "/publish/post/3")
+        journal.reset(keep=("title",))
+        assert journal.steps == ["title"]
+        assert journal.draft_url == "/publish/post/3"
+
+
+def test_checkpoints_can_be_disabled(monkeypatch):
+    """Test the SUBSTACK_CHECKPOINTS switch."""
+    assert checkpoints_enabled()
+    monkeypatch.setenv("SUBSTACK_CHECKPOINTS", "0")
+    assert not checkpoints_enabled()
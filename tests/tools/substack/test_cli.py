@@ -0,0 +1,69 @@
+"""Tests for cli module."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+import typer
+
+from tools.substack.cli import app, expand_paths
+
+
+class TestExpandPaths:
+    """Tests for expand_paths function."""
+
+    def test_glob_and_plain_paths(self, tmp_path, monkeypatch):
+        """Test that globs expand and duplicates are dropped."""
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "docs").mkdir()
+        for name in ("b.md", "a.md", "notes.txt"):
+            (tmp_path / "docs" / name).write_text("x")
+        files = expand_paths(["docs/b.md", "docs/*.md"])
+        assert files == [Path("docs/b.md"), Path("docs/a.md")]
+
+    def test_missing_file(self, tmp_path, monkeypatch):
+        """Test that a missing plain path is rejected."""
+        monkeypatch.chdir(tmp_path)
+        with pytest.raises(typer.BadParameter):
+            expand_paths(["nope.md"])
+
+    def test_empty_glob(self, tmp_path, monkeypatch):
+        """Test that a glob matching nothing is rejected."""
+        monkeypatch.chdir(tmp_path)
+        with pytest.raises(typer.BadParameter):
+            expand_paths(["docs/*.md"])
+
+
+class TestStatus:
+    """Tests for the status command."""
+
+    def test_unreadable_post(self, tmp_path, monkeypatch):
+        """Test that a post that cannot be parsed is listed as an error instead of crashing."""
+        from typer.testing import CliRunner
+
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "docs").mkdir()
+        (tmp_path / "docs" / "good.md").write_text("---\ntitle: Good\n---\n\nBody\n")
+        (tmp_path / "docs" / "bad.md").write_text("---\ntitle: [unclosed\n---\n\nBody\n")
+        result = CliRunner().invoke(app, ["status", "docs/*.md"])
+        assert result.exit_code == 0, result.output
+        assert "error" in result.output
+        assert "1 dirty, 0 clean, 1 unreadable" in result.output
+
+
+class TestStartup:
+    """Tests for lazy imports on the CLI's fast paths."""
+
+    def test_bad_space_skips_heavy_imports(self):
+        """Test that argument errors are reported before Playwright is imported."""
+        repo = Path(__file__).resolve().parents[3]
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", "tools.substack.cli",
+             "publish", "README.md", "--space", "bad_space"],
+            cwd=repo, capture_output=True, text=True, check=False,
+        )
+        assert proc.returncode != 0
+        assert "Invalid Substack subdomain" in proc.stdout + proc.stderr
+        for heavy in ("playwright", "frontmatter", "tools.substack.publish_to_substack"):
+            assert f" {heavy}\n" not in proc.stderr
@@ -0,0 +1,73 @@
+"""Tests for daemon module."""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from tools.substack import daemon
+
+
+@pytest.fixture
+def fake_devtools():
+    """Serve a minimal /json/version endpoint like Chromium's remote-debugging port."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):  # noqa: N802
+            body = json.dumps({"Browser": "HeadlessChrome/130"}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address[1]
+    server.shutdown()
+
+
+class TestDaemonState:
+    """Tests for daemon discovery and health checks."""
+
+    def test_no_state(self, tmp_path):
+        """Test that a missing state file means no daemon."""
+        assert daemon.read_state(tmp_path / "daemon.json") is None
+        assert daemon.endpoint(tmp_path / "daemon.json") is None
+
+    def test_healthy(self, tmp_path, fake_devtools):
+        """Test that a responding port yields an endpoint."""
+        path = tmp_path / "daemon.json"
+        path.write_text(json.dumps({"pid": 1, "port": fake_devtools}))
+        assert daemon.endpoint(path) == f"http://127.0.0.1:{fake_devtools}"
+
+    def test_stale(self, tmp_path):
+        """Test that a dead port is reported as not running."""
+        path = tmp_path / "daemon.json"
+        path.write_text(json.dumps({"pid": 1, "port": 1}))
+        assert daemon.endpoint(path) is None
+
+    def test_stop_without_daemon(self, tmp_path):
+        """Test that stopping with no state reports nothing to stop."""
+        assert daemon.stop_daemon(tmp_path / "daemon.json") is False
+
+    def test_stop_stale_state(self, tmp_path, monkeypatch):
+        """Test that a recorded pid is not signalled when the daemon is not answering."""
+        path = tmp_path / "daemon.json"
+        path.write_text(json.dumps({"pid": 12345, "port": 1}))
+        killed = []
+        monkeypatch.setattr(daemon.os, "kill", lambda *args: killed.append(args))
+        assert daemon.stop_daemon(path) is False
+        assert killed == [] and not path.exists()
+
+    def test_stop_healthy(self, tmp_path, fake_devtools, monkeypatch):
+        """Test that a daemon answering on its port is sent SIGTERM."""
+        path = tmp_path / "daemon.json"
+        path.write_text(json.dumps({"pid": 12345, "port": fake_devtools}))
+        killed = []
+        monkeypatch.setattr(daemon.os, "kill", lambda *args: killed.append(args))
+        assert daemon.stop_daemon(path) is True
+        assert killed == [(12345, daemon.signal.SIGTERM)]
@@ -0,0 +1,62 @@
+"""Tests for editor_selectors and space_cache modules."""
+
+from tools.substack.editor_selectors import FIELD_CANDIDATES, split_selector
+from tools.substack.publish_to_substack import _editor_candidates
+from tools.substack.space_cache import SpaceCache
+
+
+class TestSplitSelector:
+    """Tests for split_selector function."""
+
+    def test_plain_css(self):
+        """Test that plain CSS has no index."""
+        assert split_selector('[data-testid="post-title"]') == ('[data-testid="post-title"]', None)
+
+    def test_nth_suffix(self):
+        """Test that Playwright nth suffixes are parsed, including negatives."""
+        assert split_selector('div[contenteditable="true"] >> nth=1') == ('div[contenteditable="true"]', 1)
+        assert split_selector('div[contenteditable="true"] >> nth=-1') == ('div[contenteditable="true"]', -1)
+
+    def test_all_candidates_parse(self):
+        """Test that every built-in candidate splits into CSS without '>>'."""
+        for candidates in FIELD_CANDIDATES.values():
+            for c in candidates:
+                assert ">>" not in split_selector(c)[0]
+
+
+class TestSpaceCache:
+    """Tests for SpaceCache class."""
+
+    def test_roundtrip_and_forget(self, tmp_path):
+        """Test that values persist per space and can be forgotten."""
+        path = tmp_path / "cache.json"
+        cache = SpaceCache(path)
+        cache.set("nwsldata", "selectors", {"title": "a"})
+        assert SpaceCache(path).get("nwsldata", "selectors") == {"title": "a"}
+        assert SpaceCache(path).get("other", "selectors") is None
+        cache.forget("nwsldata", "selectors")
+        assert SpaceCache(path).get("nwsldata", "selectors") is None
+
+
+class TestEditorCandidates:
+    """Tests for _editor_candidates function."""
+
+    def test_default_order(self):
+        """Test that /p/new is tried first without a cached URL."""
+        urls = _editor_candidates("nwsldata")
+        assert urls[0] == "https://nwsldata.substack.com/p/new"
+        assert len(urls) == 4
+
+    def test_preferred_first(self):
+        """Test that the cached URL moves to the front and foreign URLs are ignored."""
+        urls = _editor_candidates("nwsldata", "https://nwsldata.substack.com/write")
+        assert urls[0] == "https://nwsldata.substack.com/write"
+        assert len(urls) == 4
+        assert _editor_candidates("nwsldata", "https://evil.example/p/new") == _editor_candidates("nwsldata")
+
+    def test_base_url_override(self, monkeypatch):
+        """Test that SUBSTACK_BASE_URL points the editor at another origin."""
+        monkeypatch.setenv("SUBSTACK_BASE_URL", "http://127.0.0.1:8765/")
+        assert _editor_candidates("nwsldata")[0] == "http://127.0.0.1:8765/p/new"
+        monkeypatch.setenv("SUBSTACK_BASE_URL", "http://{space}.localhost:8765")
+        assert _editor_candidates("nwsldata")[1] == "http://nwsldata.localhost:8765/publish/post/new"
@@ -0,0 +1,118 @@
+"""Tests for images module."""
+
+from pathlib import Path
+
+import pytest
+
+from tools.substack.images import ImageSettings, optimize_image, optimize_images, resolve_figure
+
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture
+def wide_chart(tmp_path: Path) -> Path:
+    """Create a wide, noisy RGB PNG similar to a 300-DPI chart."""
+    noise = Image.effect_noise((1600, 800), 64)
+    img = Image.merge("RGB", (noise, noise.rotate(180), noise.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    path = tmp_path / "chart.png"
+    img.save(path)
+    return path
+
+
+class TestOptimizeImage:
+    """Tests for optimize_image function."""
+
+    def test_downscale_and_shrink(self, wide_chart, tmp_path):
+        """Test that wide images are resized and made smaller."""
+        settings = ImageSettings(max_width=800, byte_budget=200_000)
+        result = optimize_image(wide_chart, settings, tmp_path / "cache")
+        assert result.path != wide_chart
+        assert result.bytes < result.source_bytes
+        with Image.open(result.path) as out:
+            assert out.width == 800
+
+    def test_cache_reuse(self, wide_chart, tmp_path):
+        """Test that a second run reuses the cached derivative."""
+        settings = ImageSettings(max_width=800)
+        first = optimize_image(wide_chart, settings, tmp_path / "cache")
+        second = optimize_image(wide_chart, settings, tmp_path / "cache")
+        assert not first.cached and second.cached
+        assert second.path == first.path
+
+    def test_partial_write_is_not_a_hit(self, wide_chart, tmp_path):
+        """Test that a temp file left by an interrupted write is not served from the cache."""
+        settings = ImageSettings(max_width=800)
+        first = optimize_image(wide_chart, settings, tmp_path / "cache")
+        first.path.unlink()
+        (first.path.parent / ".abc.tmp").write_bytes(b"trunc")
+        again = optimize_image(wide_chart, settings, tmp_path / "cache")
+        assert not again.cached and again.path == first.path
+
+    def test_settings_change_key(self, wide_chart, tmp_path):
+        """Test that different settings produce a different derivative."""
+        a = optimize_image(wide_chart, ImageSettings(max_width=800), tmp_path / "cache")
+        b = optimize_image(wide_chart, ImageSettings(max_width=600), tmp_path / "cache")
+        assert a.path != b.path
+
+    def test_small_image_kept(self, sample_image, tmp_path):
+        """Test that a tiny image is not made larger."""
+        result = optimize_image(sample_image, ImageSettings(), tmp_path / "cache")
+        assert result.bytes <= result.source_bytes
+
+    def test_disabled(self, wide_chart, tmp_path):
+        """Test that optimization can be switched off."""
+        result = optimize_image(wide_chart, ImageSettings(enabled=False), tmp_path / "cache")
+        assert result.path == wide_chart
+
+    def test_webp_preference(self, wide_chart, tmp_path):
+        """Test that the preferred format is used when within budget."""
+        settings = ImageSettings(max_width=800, formats=("webp",), byte_budget=10_000_000)
+        assert optimize_image(wide_chart, settings, tmp_path / "cache").path.suffix == ".webp"
+
+    def test_photo_tries_lossy_first(self, wide_chart, tmp_path):
+        """Test that a photo is encoded lossily while a flat chart stays PNG."""
+        photo = tmp_path / "photo.jpg"
+        with Image.open(wide_chart) as img:
+            img.save(photo, quality=95)
+        settings = ImageSettings(max_width=800, byte_budget=10_000_000)
+        assert optimize_image(photo, settings, tmp_path / "cache").path.suffix == ".webp"
+        flat = tmp_path / "flat.png"
+        Image.new("RGB", (1600, 800), "white").save(flat)
+        assert optimize_image(flat, settings, tmp_path / "cache").path.suffix == ".png"
+
+    def test_batch_order(self, wide_chart, sample_image, tmp_path):
+        """Test that optimize_images keeps asset order."""
+        results = optimize_images([wide_chart, sample_image], ImageSettings(), tmp_path / "cache")
+        assert [r.source for r in results] == [wide_chart, sample_image]
+
+
+class TestImageSettings:
+    """Tests for ImageSettings.from_env."""
+
+    def test_from_env(self, monkeypatch):
+        """Test that every SUBSTACK_IMAGE_* variable is read."""
+        monkeypatch.setenv("SUBSTACK_IMAGE_MAX_WIDTH", "1000")
+        monkeypatch.setenv("SUBSTACK_IMAGE_BUDGET_KB", "250")
+        monkeypatch.setenv("SUBSTACK_IMAGE_FORMATS", "WebP, jpeg")
+        monkeypatch.setenv("SUBSTACK_IMAGE_QUALITY", "90")
+        monkeypatch.setenv("SUBSTACK_IMAGE_MIN_QUALITY", "60")
+        monkeypatch.setenv("SUBSTACK_OPTIMIZE_IMAGES", "0")
+        assert ImageSettings.from_env() == ImageSettings(1000, 250_000, ("webp", "jpeg"), 90, 60)
+        assert not ImageSettings.from_env().enabled
+
+
+class TestResolveFigure:
+    """Tests for resolve_figure function."""
+
+    def test_manifest_redirects(self, tmp_path):
+        """Test that a declared figure name resolves to the exported format."""
+        (tmp_path / "chart.svg").write_text("<svg/>")
+        (tmp_path / ".figures.json").write_text('{"chart.png": {"file": "chart.svg", "format": "svg"}}')
+        assert resolve_figure(tmp_path / "chart.png") == tmp_path / "chart.svg"
+
+    def test_passthrough(self, tmp_path):
+        """Test that unknown names, missing exports and no manifest leave the path alone."""
+        assert resolve_figure(tmp_path / "photo.png") == tmp_path / "photo.png"
+        (tmp_path / ".figures.json").write_text('{"chart.png": {"file": "chart.webp"}}')
+        assert resolve_figure(tmp_path / "chart.png") == tmp_path / "chart.png"
+        assert resolve_figure(tmp_path / "photo.png") == tmp_path / "photo.png"
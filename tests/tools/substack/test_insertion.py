@@ -0,0 +1,88 @@
+"""Tests for insertion module."""
+
+import pytest
+
+from tools.substack.insertion import InsertSettings, split_blocks, split_chunks
+
+SECTION = "<h2>Section {n}</h2>\n" + "<p>Paragraph with <strong>bold</strong> text.</p>\n" * 5
+
+
+class TestSplitBlocks:
+    """Tests for split_blocks function."""
+
+    def test_top_level_only(self):
+        """Test that nested elements stay inside their top-level block."""
+        html = "<h2>A</h2>\n<blockquote>\n<h2>quoted</h2>\n<p>x</p>\n</blockquote>\n<p>y<br>z</p>\n<hr>\n"
+        blocks = split_blocks(html)
+        assert blocks == ["<h2>A</h2>\n", "<blockquote>\n<h2>quoted</h2>\n<p>x</p>\n</blockquote>\n",
+                          "<p>y<br>z</p>\n", "<hr>\n"]
+
+    def test_roundtrip_with_crlf_and_unicode(self):
+        """Test that offsets survive multi-line blocks, \\r\\n and non-ASCII text."""
+        html = "<p>café\r\nline two</p>\r\n<table>\n<tr><td>1</td></tr>\n</table>\n<p>end</p>"
+        blocks = split_blocks(html)
+        assert "".join(blocks) == html
+        assert len(blocks) == 3
+        assert blocks[1].startswith("<table>")
+
+    def test_empty(self):
+        """Test that empty input gives no blocks."""
+        assert split_blocks("") == []
+
+
+class TestSplitChunks:
+    """Tests for split_chunks function."""
+
+    def test_small_body_is_one_chunk(self):
+        """Test that a body under the limit is not split."""
+        html = SECTION.format(n=1)
+        assert split_chunks(html, 10_000) == [html]
+
+    def test_splits_at_sections(self):
+        """Test that chunks start at headings and join back to the source."""
+        html = "".join(SECTION.format(n=n) for n in range(10))
+        chunks = split_chunks(html, len(SECTION) * 3)
+        assert "".join(chunks) == html
+        assert len(chunks) == 4
+        assert all(c.startswith("<h2>") for c in chunks)
+        assert all(len(c) <= len(SECTION) * 3 for c in chunks)
+
+    def test_oversized_section_splits_between_blocks(self):
+        """Test that a section larger than the limit is split at block boundaries."""
+        html = SECTION.format(n=1)
+        chunks = split_chunks(html, 60)
+        assert "".join(chunks) == html
+        assert len(chunks) > 1
+        assert all(c.startswith("<") and c.endswith(">\n") for c in chunks)
+
+    def test_oversized_block_kept_whole(self):
+        """Test that one block larger than the limit is never cut."""
+        table = "<table>\n" + "<tr><td>cell</td></tr>\n" * 50 + "</table>\n"
+        chunks = split_chunks("<p>a</p>\n" + table + "<p>b</p>\n", 100)
+        assert table in chunks
+
+
+class TestInsertSettings:
+    """Tests for InsertSettings.from_env."""
+
+    def test_defaults(self, monkeypatch):
+        """Test that unset env vars give the defaults."""
+        for var in ("SUBSTACK_INSERT_MODE", "SUBSTACK_INSERT_CHUNK_KB", "SUBSTACK_INSERT_VERIFY"):
+            monkeypatch.delenv(var, raising=False)
+        assert InsertSettings.from_env() == InsertSettings()
+        assert InsertSettings().uses_clipboard
+
+    def test_env_overrides(self, monkeypatch):
+        """Test that env vars select event mode, chunk size and verification."""
+        monkeypatch.setenv("SUBSTACK_INSERT_MODE", "Event")
+        monkeypatch.setenv("SUBSTACK_INSERT_CHUNK_KB", "16")
+        monkeypatch.setenv("SUBSTACK_INSERT_VERIFY", "0")
+        settings = InsertSettings.from_env()
+        assert settings == InsertSettings(mode="event", chunk_chars=16_000, verify=False)
+        assert not settings.uses_clipboard
+
+    def test_bad_mode(self, monkeypatch):
+        """Test that an unknown mode is rejected."""
+        monkeypatch.setenv("SUBSTACK_INSERT_MODE", "typing")
+        with pytest.raises(ValueError, match="SUBSTACK_INSERT_MODE"):
+            InsertSettings.from_env()
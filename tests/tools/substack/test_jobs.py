@@ -0,0 +1,206 @@
+"""Tests for jobs module."""
+
+import asyncio
+import time
+from pathlib import Path
+
+import pytest
+
+from tools.substack.jobs import Job, JobQueue, TokenBucket, WorkerSettings, parse_when, run_worker
+from tools.substack.retry import RetryPolicy
+from tools.substack.session import SessionExpired
+
+
+@pytest.fixture
+def queue(tmp_path: Path, monkeypatch):
+    """A job queue in a temporary working directory."""
+    monkeypatch.chdir(tmp_path)
+    with JobQueue(tmp_path / "jobs.sqlite") as q:
+        yield q
+
+
+def fast(**kwargs) -> WorkerSettings:
+    """Worker settings without rate limiting or backoff, unless overridden."""
+    defaults = {"concurrency": 2, "rate_per_min": 6000, "burst": 10, "poll_s": 0.05,
+                "retry": RetryPolicy(base_s=0.0, jitter=0.0)}
+    return WorkerSettings(**{**defaults, **kwargs})
+
+
+class TestParseWhen:
+    """Tests for parse_when function."""
+
+    def test_relative_and_absolute(self):
+        """Test offsets from now and ISO date-times with and without an offset."""
+        assert parse_when("+30m", now=1000.0) == 2800.0
+        assert parse_when("2025-06-01T09:00:00Z") == 1748768400.0
+        assert parse_when("2025-06-01T11:00:00+02:00") == 1748768400.0
+        with pytest.raises(ValueError):
+            parse_when("tomorrow")
+
+
+class TestJobQueue:
+    """Tests for JobQueue class."""
+
+    def test_claim_order_and_schedule(self, queue: JobQueue):
+        """Test that due jobs are claimed earliest first and future jobs wait."""
+        later = queue.enqueue(Path("b.md"), "nwsldata", True, run_at=time.time() + 3600)
+        first = queue.enqueue(Path("a.md"), "nwsldata", False)
+        claimed = queue.claim("w1")
+        assert claimed.id == first.id and claimed.state == "running" and claimed.attempts == 1
+        assert queue.claim("w1") is None
+        assert queue.next_run_at() == later.run_at
+        assert queue.claim("w1", now=later.run_at).path == "b.md"
+
+    def test_rate_limited_space_does_not_block(self, queue: JobQueue):
+        """Test that a space without tokens is skipped in favour of another space's jobs."""
+        for name in ("a.md", "b.md"):
+            queue.enqueue(Path(name), "one", False)
+        queue.enqueue(Path("c.md"), "two", False)
+        limit = {"now": time.time() + 1, "rate_per_min": 1, "burst": 1}
+        assert [queue.claim("w1", **limit).path for _ in range(2)] == ["a.md", "c.md"]
+        assert queue.claim("w1", **limit) is None
+        assert queue.token_wait(1, 1, now=limit["now"]) == pytest.approx(60)
+
+    def test_budget_is_shared(self, queue: JobQueue, tmp_path: Path):
+        """Test that two workers on one queue draw from the same per-space bucket."""
+        for i in range(4):
+            queue.enqueue(Path(f"{i}.md"), "nwsldata", False)
+        now = time.time() + 1
+        with JobQueue(tmp_path / "jobs.sqlite") as other:
+            claimed = [q.claim("w", now=now, rate_per_min=1, burst=2) for q in (queue, other, queue, other)]
+        assert [j is not None for j in claimed] == [True, True, False, False]
+
+    def test_same_post_not_run_twice(self, queue: JobQueue):
+        """Test that a post with a running job is not claimed again until it finishes."""
+        first = queue.enqueue(Path("a.md"), "nwsldata", False)
+        queue.enqueue(Path("a.md"), "nwsldata", True)
+        queue.enqueue(Path("b.md"), "nwsldata", False)
+        assert queue.claim("w1").id == first.id
+        assert queue.claim("w1").path == "b.md"
+        assert queue.claim("w1") is None
+        queue.complete(queue.get(first.id), 1.0)
+        assert queue.claim("w1").path == "a.md"
+
+    def test_claim_is_exclusive(self, queue: JobQueue, tmp_path: Path):
+        """Test that two connections never claim the same job."""
+        for i in range(5):
+            queue.enqueue(Path(f"{i}.md"), "nwsldata", False)
+        with JobQueue(tmp_path / "jobs.sqlite") as other:
+            claimed = [q.claim(f"w{n}") for n in range(3) for q in (queue, other)]
+        ids = [j.id for j in claimed if j]
+        assert len(ids) == 5 and len(set(ids)) == 5
+
+    def test_fail_retry_and_cancel(self, queue: JobQueue):
+        """Test requeue with a retry time, permanent failure, cancellation and counts."""
+        job = queue.enqueue(Path("a.md"), "nwsldata", False)
+        queue.fail(queue.claim("w1"), "boom", 1.0, retry_at=job.run_at + 60)
+        retried = queue.get(job.id)
+        assert (retried.state, retried.run_at, retried.error) == ("queued", job.run_at + 60, "boom")
+        queue.fail(queue.claim("w1", now=job.run_at + 60), "boom again", 1.0)
+        assert queue.get(job.id).state == "failed"
+        other = queue.enqueue(Path("b.md"), "nwsldata", False)
+        assert queue.cancel(other.id) and not queue.cancel(job.id)
+        assert queue.counts() == {"queued": 0, "running": 0, "done": 0, "failed": 1, "cancelled": 1}
+        assert [j.state for j in queue.jobs(["failed"])] == ["failed"]
+
+    def test_requeue_stale(self, queue: JobQueue):
+        """Test that jobs left running by a dead worker go back to the queue."""
+        job = queue.enqueue(Path("a.md"), "nwsldata", False, run_at=time.time() - 7200)
+        queue.claim("w1", now=job.run_at)
+        assert queue.requeue_stale() == 1
+        assert queue.get(job.id).state == "queued"
+
+
+class TestTokenBucket:
+    """Tests for TokenBucket class."""
+
+    def test_burst_then_rate(self):
+        """Test that a full bucket allows a burst and then refills at the rate."""
+        bucket = TokenBucket(rate_per_min=60, burst=2, tokens=2, at=0.0)
+        assert bucket.take(0.0) and bucket.take(0.0) and not bucket.take(0.0)
+        assert bucket.wait_s(0.0) == pytest.approx(1.0)
+        assert bucket.take(1.0) and not bucket.ready(1.0)
+
+
+class TestRunWorker:
+    """Tests for run_worker function."""
+
+    async def test_drains_with_concurrency(self, queue: JobQueue):
+        """Test that jobs run up to the concurrency limit and are marked done."""
+        for i in range(4):
+            queue.enqueue(Path(f"{i}.md"), "nwsldata", False)
+        active, peak = 0, 0
+
+        async def run_job(job: Job) -> None:
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.05)
+            active -= 1
+
+        report = await run_worker(queue, fast(concurrency=2), drain=True, run_job=run_job)
+        assert sorted(report.done) == [1, 2, 3, 4] and peak == 2
+        assert all(j.state == "done" and j.seconds is not None for j in queue.jobs())
+
+    async def test_rate_limit_per_space(self, queue: JobQueue):
+        """Test that one space's starts are spaced by its bucket while another runs freely."""
+        for i in range(3):
+            queue.enqueue(Path(f"slow{i}.md"), "slow", False)
+        queue.enqueue(Path("other.md"), "other", False)
+        starts: dict[str, list[float]] = {"slow": [], "other": []}
+
+        async def run_job(job: Job) -> None:
+            starts[job.space].append(time.monotonic())
+
+        await run_worker(queue, fast(concurrency=4, rate_per_min=600, burst=1), drain=True, run_job=run_job)
+        slow = starts["slow"]
+        assert len(slow) == 3 and slow[2] - slow[0] >= 0.18
+        assert starts["other"][0] - slow[0] < 0.05
+
+    async def test_retry_then_fail(self, queue: JobQueue):
+        """Test that errors are retried up to max_attempts and expired sessions are not."""
+        flaky = queue.enqueue(Path("flaky.md"), "nwsldata", False, max_attempts=2)
+        broken = queue.enqueue(Path("broken.md"), "nwsldata", False, max_attempts=2)
+        expired = queue.enqueue(Path("expired.md"), "nwsldata", False, max_attempts=3)
+        calls: dict[str, int] = {}
+
+        async def run_job(job: Job) -> None:
+            calls[job.path] = calls.get(job.path, 0) + 1
+            if job.path == "expired.md":
+                raise SessionExpired(job.space, "HTTP 401")
+            if job.path == "broken.md" or calls[job.path] == 1:
+                raise RuntimeError("editor timeout")
+
+        report = await run_worker(queue, fast(), drain=True, run_job=run_job)
+        assert report.done == [flaky.id] and sorted(report.failed) == [broken.id, expired.id]
+        assert calls == {"flaky.md": 2, "broken.md": 2, "expired.md": 1}
+        assert queue.get(broken.id).error == "RuntimeError: editor timeout"
+
+    async def test_drain_leaves_future_jobs(self, queue: JobQueue):
+        """Test that --drain returns without waiting for jobs scheduled later."""
+        job = queue.enqueue(Path("a.md"), "nwsldata", False, run_at=time.time() + 3600)
+
+        async def run_job(job: Job) -> None:
+            raise AssertionError("not due")
+
+        report = await run_worker(queue, fast(), drain=True, run_job=run_job)
+        assert report.done == [] and queue.get(job.id).state == "queued"
+
+    async def test_stop(self, queue: JobQueue):
+        """Test that setting stop ends an idle worker."""
+        stop = asyncio.Event()
+        asyncio.get_running_loop().call_later(0.1, stop.set)
+        report = await asyncio.wait_for(run_worker(queue, fast(), stop=stop), 2)
+        assert report.done == []
+
+
+class TestWorkerSettings:
+    """Tests for WorkerSettings.from_env."""
+
+    def test_from_env(self, monkeypatch):
+        """Test that concurrency and the rate limit are configurable."""
+        monkeypatch.setenv("SUBSTACK_WORKERS", "4")
+        monkeypatch.setenv("SUBSTACK_RATE_PER_MIN", "2.5")
+        monkeypatch.setenv("SUBSTACK_JOB_RETRY_BASE_S", "5")
+        settings = WorkerSettings.from_env()
+        assert (settings.concurrency, settings.rate_per_min, settings.retry.base_s) == (4, 2.5, 5.0)
@@ -0,0 +1,67 @@
+"""Tests for manifest module."""
+
+from tools.substack.manifest import PublishManifest, content_digest
+from tools.substack.publish_to_substack import post_digest
+
+
+class TestContentDigest:
+    """Tests for content_digest and post_digest."""
+
+    def test_stable(self, sample_markdown, sample_image):
+        """Test that an unchanged post hashes the same."""
+        assert post_digest(sample_markdown) == post_digest(sample_markdown)
+
+    def test_image_change(self, sample_markdown, sample_image):
+        """Test that editing a referenced image changes the digest."""
+        before = post_digest(sample_markdown)
+        sample_image.write_bytes(sample_image.read_bytes() + b"\0")
+        assert post_digest(sample_markdown) != before
+
+    def test_front_matter_change(self, tmp_path):
+        """Test that front-matter outside title/tags still counts."""
+        assert content_digest({"subtitle": "a"}, "<p>x</p>", []) != content_digest(
+            {"subtitle": "b"}, "<p>x</p>", []
+        )
+
+
+class TestPublishManifest:
+    """Tests for PublishManifest class."""
+
+    def test_roundtrip(self, tmp_path, monkeypatch):
+        """Test that recorded entries survive a save and reload."""
+        monkeypatch.chdir(tmp_path)
+        path = tmp_path / "manifest.json"
+        m = PublishManifest(path)
+        m.record(tmp_path / "post.md", "abc", "nwsldata", publish=False)
+        m.save()
+        reloaded = PublishManifest(path)
+        assert reloaded.get(tmp_path / "post.md")["digest"] == "abc"
+        assert PublishManifest.key(tmp_path / "post.md") == "post.md"
+
+    def test_concurrent_saves_merge(self, tmp_path):
+        """Test that two instances saving in turn keep each other's records."""
+        path = tmp_path / "manifest.json"
+        a, b = PublishManifest(path), PublishManifest(path)
+        a.record(tmp_path / "a.md", "aaa", "nwsldata", publish=False)
+        b.record(tmp_path / "b.md", "bbb", "nwsldata", publish=False)
+        a.save()
+        b.save()
+        reloaded = PublishManifest(path)
+        assert reloaded.get(tmp_path / "a.md")["digest"] == "aaa"
+        assert reloaded.get(tmp_path / "b.md")["digest"] == "bbb"
+
+    def test_is_current(self, tmp_path):
+        """Test that drafts do not satisfy a live publish."""
+        m = PublishManifest(tmp_path / "manifest.json")
+        post = tmp_path / "post.md"
+        m.record(post, "abc", "nwsldata", publish=False)
+        assert m.is_current(post, "abc", "nwsldata", publish=False)
+        assert not m.is_current(post, "abc", "nwsldata", publish=True)
+        assert not m.is_current(post, "def", "nwsldata", publish=False)
+        assert not m.is_current(post, "abc", "other", publish=False)
+
+    def test_unreadable_manifest(self, tmp_path):
+        """Test that a corrupt manifest is treated as empty."""
+        path = tmp_path / "manifest.json"
+        path.write_text("{not json")
+        assert PublishManifest(path).entries == {}
@@ -0,0 +1,192 @@
+"""Tests for the offline mock Substack editor and an end-to-end publish against it."""
+
+import json
+import os
+from pathlib import Path
+from urllib.request import Request, urlopen
+
+import pytest
+
+from benchmarks.mock_substack.server import PIXEL, Latency, MockSubstack
+
+
+def _chromium_installed() -> bool:
+    """Return True if Playwright and its Chromium build are available."""
+    try:
+        from playwright.sync_api import sync_playwright
+
+        with sync_playwright() as p:
+            return Path(p.chromium.executable_path).exists()
+    except Exception:
+        return False
+
+
+@pytest.fixture
+def mock():
+    """Serve the mock editor on a free port."""
+    with MockSubstack(latency=Latency(mount_ms=50, paste_ms=20)) as server:
+        yield server
+
+
+def _fetch(url: str, data: bytes | None = None, method: str = "GET") -> tuple[int, bytes]:
+    req = Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+    with urlopen(req, timeout=5) as resp:
+        return resp.status, resp.read()
+
+
+class TestMockServer:
+    """Tests for the mock editor's HTTP endpoints."""
+
+    def test_editor_page(self, mock):
+        """Test that the editor page is served with the latency config injected."""
+        status, body = _fetch(f"{mock.base_url}/p/new")
+        assert status == 200
+        assert b'"mount_ms": 50' in body
+        assert b"__MOCK_CONFIG__" not in body
+        assert _fetch(f"{mock.base_url}/editor.js")[0] == 200
+
+    def test_unknown_editor_url(self, mock):
+        """Test that the other candidate URLs 404 so fallback is exercised."""
+        with pytest.raises(Exception, match="404"):
+            _fetch(f"{mock.base_url}/write")
+
+    def test_upload_and_drafts(self, mock):
+        """Test that uploads and draft saves are recorded."""
+        status, body = _fetch(f"{mock.base_url}/api/v1/image", b"x" * 100, "POST")
+        assert status == 200
+        assert json.loads(body)["url"] == "/images/1.png"
+        draft = json.loads(_fetch(f"{mock.base_url}/api/v1/drafts", b'{"draft_title": "A"}', "POST")[1])
+        _fetch(f"{mock.base_url}/api/v1/drafts/{draft['id']}", b'{"draft_title": "B"}', "PUT")
+        _fetch(f"{mock.base_url}/api/v1/drafts/{draft['id']}/publish", b"", "POST")
+        assert mock.stats.uploads == 1
+        assert mock.stats.upload_bytes == 100
+        assert mock.stats.drafts == {1: {"draft_title": "B"}}
+        assert mock.stats.published == {1}
+        assert json.loads(_fetch(f"{mock.base_url}/api/v1/drafts/1")[1]) == {"draft_title": "B"}
+
+    def test_failed_uploads(self, mock):
+        """Test that injected upload failures answer 500 and are not counted."""
+        mock.fail_uploads = 1
+        with pytest.raises(Exception, match="500"):
+            _fetch(f"{mock.base_url}/api/v1/image", b"x", "POST")
+        assert _fetch(f"{mock.base_url}/api/v1/image", b"x", "POST")[0] == 200
+        assert mock.stats.uploads == 1
+
+
+@pytest.mark.skipif(not _chromium_installed(), reason="Playwright Chromium is not installed")
+class TestPublishEndToEnd:
+    """Run the real publish path against the mock editor."""
+
+    async def test_draft_with_image(self, mock, sample_markdown, sample_image, monkeypatch):
+        """Test that title, body, image and save all reach the mock editor."""
+        from tools.substack.publish_to_substack import create_or_update_draft
+
+        monkeypatch.chdir(sample_markdown.parent)
+        monkeypatch.setenv("SUBSTACK_BASE_URL", mock.base_url)
+        mock.write_storage_state(Path(".playwright/storage_state.json"))
+        await create_or_update_draft("bench", sample_markdown, publish=False, login=False, force=True)
+        (draft,) = mock.stats.drafts.values()
+        assert draft["draft_title"] == "Sample Post"
+        assert "Sample Content" in draft["draft_body"]
+        assert mock.stats.uploads == 1
+        assert draft["tags"] == ["test", "sample"]
+        assert os.path.exists(".playwright/publish_manifest.json")
+
+    async def test_publish_is_confirmed(self, mock, tmp_path, monkeypatch):
+        """Test that a live publish waits for the publish call and fails if it errors."""
+        from tools.substack.publish_to_substack import create_or_update_draft
+
+        md = tmp_path / "post.md"
+        md.write_text('---\ntitle: "Live"\n---\n\nIntro.\n')
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("SUBSTACK_BASE_URL", mock.base_url)
+        monkeypatch.setenv("SUBSTACK_CHECKPOINTS", "0")
+        mock.write_storage_state(Path(".playwright/storage_state.json"))
+        mock.fail_publishes = 1
+        with pytest.raises(RuntimeError, match="HTTP 500"):
+            await create_or_update_draft("bench", md, publish=True, login=False, force=True)
+        assert not mock.stats.published
+        await create_or_update_draft("bench", md, publish=True, login=False, force=True)
+        assert len(mock.stats.published) == 1
+
+    async def test_chunked_event_paste(self, mock, tmp_path, monkeypatch):
+        """Test that a long body pasted as synthetic events in chunks arrives whole."""
+        from tools.substack.publish_to_substack import create_or_update_draft
+
+        sections = "\n".join(f"## Part {n}\n\n" + "A line of match notes.\n\n" * 40 for n in range(30))
+        md = tmp_path / "long.md"
+        md.write_text(f'---\ntitle: "Long"\n---\n\n{sections}')
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("SUBSTACK_BASE_URL", mock.base_url)
+        mock.write_storage_state(Path(".playwright/storage_state.json"))
+        monkeypatch.setenv("SUBSTACK_INSERT_MODE", "event")
+        monkeypatch.setenv("SUBSTACK_INSERT_CHUNK_KB", "4")
+        await create_or_update_draft("bench", md, publish=False, login=False, force=True)
+        (draft,) = mock.stats.drafts.values()
+        assert draft["draft_body"].count("<h2>") == 30
+
+    async def test_resume_after_failed_upload(self, mock, tmp_path, monkeypatch):
+        """Test that a rerun reopens the saved draft instead of pasting into a new one."""
+        from tools.substack.publish_to_substack import create_or_update_draft
+
+        (tmp_path / "images").mkdir()
+        for name in ("a.png", "b.png"):
+            (tmp_path / "images" / name).write_bytes(PIXEL)
+        md = tmp_path / "post.md"
+        md.write_text('---\ntitle: "Two charts"\n---\n\nIntro.\n\n![a](images/a.png)\n\n![b](images/b.png)\n')
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("SUBSTACK_BASE_URL", mock.base_url)
+        mock.write_storage_state(Path(".playwright/storage_state.json"))
+        monkeypatch.setenv("SUBSTACK_OPTIMIZE_IMAGES", "0")
+        monkeypatch.setenv("SUBSTACK_RETRY_ATTEMPTS", "1")
+        mock.fail_uploads = 1
+        with pytest.raises(RuntimeError, match="HTTP 500"):
+            await create_or_update_draft("bench", md, publish=False, login=False, force=True)
+        assert len(list(Path(".playwright/checkpoints").glob("*.json"))) == 1
+
+        await create_or_update_draft("bench", md, publish=False, login=False, force=True)
+        (draft,) = mock.stats.drafts.values()
+        assert draft["draft_body"].count("Intro.") == 1
+        assert draft["draft_body"].count("<img") == 2
+        assert mock.stats.uploads == 2
+        assert not list(Path(".playwright/checkpoints").glob("*.json"))
+
+    async def test_steps_without_draft_are_redone(self, mock, tmp_path, monkeypatch):
+        """Test that steps recorded without a reopenable draft are not skipped in a new one."""
+        from tools.substack.checkpoint import PublishJournal
+        from tools.substack.publish_to_substack import create_or_update_draft, post_digest
+
+        md = tmp_path / "post.md"
+        md.write_text('---\ntitle: "Chart"\n---\n\nIntro.\n')
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("SUBSTACK_BASE_URL", mock.base_url)
+        mock.write_storage_state(Path(".playwright/storage_state.json"))
+        journal = PublishJournal(md, "bench", post_digest(md))
+        journal.steps = ["title", "body", "tags"]
+        journal.save()
+        await create_or_update_draft("bench", md, publish=False, login=False, force=True)
+        (draft,) = mock.stats.drafts.values()
+        assert draft["draft_title"] == "Chart"
+        assert "Intro." in draft["draft_body"]
+
+    async def test_trace_kept_only_on_failure(self, mock, tmp_path, monkeypatch):
+        """Test that a failed post leaves its trace chunk in a run directory and a clean one leaves nothing."""
+        from tools.substack.publish_to_substack import create_or_update_draft
+
+        (tmp_path / "a.png").write_bytes(PIXEL)
+        md = tmp_path / "post.md"
+        md.write_text('---\ntitle: "Chart"\n---\n\nIntro.\n\n![a](a.png)\n')
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("SUBSTACK_BASE_URL", mock.base_url)
+        mock.write_storage_state(Path(".playwright/storage_state.json"))
+        monkeypatch.setenv("SUBSTACK_TRACE", "1")
+        monkeypatch.setenv("SUBSTACK_RETRY_ATTEMPTS", "1")
+        monkeypatch.setenv("SUBSTACK_CHECKPOINTS", "0")
+        await create_or_update_draft("bench", md, publish=False, login=False, force=True)
+        assert not Path(".playwright/runs").exists()
+
+        mock.fail_uploads = 1
+        with pytest.raises(RuntimeError, match="HTTP 500"):
+            await create_or_update_draft("bench", md, publish=False, login=False, force=True)
+        (run,) = Path(".playwright/runs").iterdir()
+        assert {p.name for p in run.iterdir()} >= {"post.md.trace.zip", "post.md.png", "post.md.events.json"}
@@ -0,0 +1,72 @@
+"""Tests for profiling module."""
+
+import asyncio
+import json
+import logging
+
+from tools.substack.logger import log_record
+from tools.substack.profiling import lane, profile, span
+from tools.substack.publish_to_substack import read_post
+
+
+class TestSpans:
+    """Tests for span recording and reports."""
+
+    def test_inactive_is_noop(self):
+        """Test that spans outside a profile record nothing and still run the body."""
+        ran = []
+        with span("noop"):
+            ran.append(1)
+        assert ran == [1]
+
+    def test_breakdown(self):
+        """Test that repeated phases are aggregated."""
+        with profile() as prof:
+            for _ in range(3):
+                with span("image"):
+                    pass
+            with span("paste"):
+                pass
+        rows = {name: count for name, count, _, _ in prof.breakdown()}
+        assert rows == {"image": 3, "paste": 1}
+        assert "image" in prof.format_report()
+
+    def test_lanes_in_tasks(self, tmp_path):
+        """Test that concurrent tasks keep their own lane in the Chrome trace."""
+
+        async def post(name):
+            with lane(name), span("post"):
+                await asyncio.sleep(0)
+
+        async def run():
+            await asyncio.gather(post("a.md"), post("b.md"))
+
+        with profile() as prof:
+            asyncio.run(run())
+        out = tmp_path / "trace.json"
+        prof.write_chrome_trace(out)
+        events = json.loads(out.read_text())["traceEvents"]
+        complete = [e for e in events if e["ph"] == "X"]
+        assert len({e["tid"] for e in complete}) == 2
+        names = {e["args"]["name"] for e in events if e["ph"] == "M"}
+        assert names == {"a.md", "b.md"}
+
+    def test_read_post_span(self, sample_markdown):
+        """Test that read_post is instrumented."""
+        with profile() as prof:
+            read_post(sample_markdown)
+        assert [s.name for s in prof.spans] == ["read_post"]
+
+
+class TestLogRecord:
+    """Tests for log_record helper."""
+
+    def test_structured_fields(self, caplog):
+        """Test that fields are attached to the record and rendered as JSON."""
+        log = logging.getLogger("test.structured")
+        with caplog.at_level(logging.DEBUG, logger="test.structured"):
+            log_record(log, "span", name="paste", ms=1.5)
+        rec = caplog.records[-1]
+        assert rec.event == "span"
+        assert rec.fields == {"name": "paste", "ms": 1.5}
+        assert rec.getMessage() == 'span {"ms": 1.5, "name": "paste"}'
@@ -0,0 +1,78 @@
+"""Tests for prosemirror module."""
+
+from pathlib import Path
+
+from tools.substack.prosemirror import html_to_doc
+from tools.substack.render import render_markdown
+
+
+def render(text: str) -> str:
+    """Render markdown the way read_post does."""
+    return render_markdown(text, Path(".")).html
+
+
+def text(value: str, *marks: dict) -> dict:
+    """Build a text node with optional marks."""
+    node = {"type": "text", "text": value}
+    if marks:
+        node["marks"] = list(marks)
+    return node
+
+
+class TestHtmlToDoc:
+    """Tests for html_to_doc function."""
+
+    def test_inline_marks_and_breaks(self):
+        """Test that marks nest, links keep their href and line breaks become hard breaks."""
+        doc = html_to_doc(render("**Bold [link](https://x.org)**\nnext `code`\n"))
+        assert doc["content"] == [{"type": "paragraph", "content": [
+            text("Bold ", {"type": "strong"}),
+            text("link", {"type": "strong"}, {"type": "link", "attrs": {"href": "https://x.org"}}),
+            {"type": "hard_break"},
+            text("next "),
+            text("code", {"type": "code"}),
+        ]}]
+
+    def test_blocks(self):
+        """Test headings, tight and loose lists, quotes, code blocks and rules."""
+        html = render("## Goals\n\n- one\n- two\n\n3. three\n\n> quoted\n\n```python\nx = 1\n```\n\n---\n")
+        doc = html_to_doc(html)
+        assert [n["type"] for n in doc["content"]] == [
+            "heading", "bullet_list", "ordered_list", "blockquote", "code_block", "horizontal_rule"
+        ]
+        heading, bullets, ordered, _, code, _ = doc["content"]
+        assert heading["attrs"] == {"level": 2}
+        assert bullets["content"][1] == {"type": "list_item", "content": [{"type": "paragraph", "content": [text("two")]}]}
+        assert ordered["attrs"] == {"start": 3}
+        assert code == {"type": "code_block", "attrs": {"language": "python"}, "content": [text("x = 1")]}
+
+    def test_images_split_paragraphs(self):
+        """Test that an inline image becomes its own block with the replacement URL."""
+        doc = html_to_doc('<p>before <img src="a.png" alt="chart" /> after</p>', {"a.png": "https://cdn/a.png"})
+        assert doc["content"] == [
+            {"type": "paragraph", "content": [text("before")]},
+            {"type": "captionedImage", "content": [
+                {"type": "image2", "attrs": {"src": "https://cdn/a.png", "alt": "chart", "title": None}}
+            ]},
+            {"type": "paragraph", "content": [text("after")]},
+        ]
+
+    def test_table_rows_become_paragraphs(self):
+        """Test that tables, which the editor lacks, keep their rows as text."""
+        doc = html_to_doc(render("| a | b |\n|---|---|\n| 1 | 2 |\n"))
+        assert doc["content"] == [
+            {"type": "paragraph", "content": [text("a", {"type": "strong"}), text(" | "), text("b", {"type": "strong"})]},
+            {"type": "paragraph", "content": [text("1"), text(" | "), text("2")]},
+        ]
+
+    def test_embeds(self):
+        """Test that embed blocks become the editor's video and tweet nodes."""
+        doc = html_to_doc(render("https://youtu.be/dQw4w9WgXcQ\n\n<https://x.com/nwsl/status/42>\n"))
+        assert doc["content"] == [
+            {"type": "youtube2", "attrs": {"videoId": "dQw4w9WgXcQ"}},
+            {"type": "twitter2", "attrs": {"url": "https://x.com/nwsl/status/42"}},
+        ]
+
+    def test_empty(self):
+        """Test that an empty body is still a valid document."""
+        assert html_to_doc("") == {"type": "doc", "content": [{"type": "paragraph"}]}
@@ -0,0 +1,64 @@
+"""Tests for render module."""
+
+import json
+from pathlib import Path
+
+from tools.substack.render import collect_assets, render_markdown, slugify
+
+
+class TestRenderMarkdown:
+    """Tests for render_markdown function."""
+
+    def test_code_language(self, tmp_path: Path):
+        """Test that a fence's language moves to data-language."""
+        html = render_markdown("```python title=x\nprint(1)\n```\n", tmp_path).html
+        assert html == '<pre><code data-language="python">print(1)\n</code></pre>\n'
+
+    def test_images(self, tmp_path: Path):
+        """Test that inline and reference-style images are found once each and code is ignored."""
+        for name in ("a.png", "b.png", "c.png"):
+            (tmp_path / name).write_bytes(b"png")
+        text = (
+            "![a](a.png) ![remote](https://x.org/r.png) ![gone](gone.png)\n\n"
+            "![b][chart] and again ![b again][chart]\n\n`![c](c.png)`\n\n    ![c](c.png)\n\n"
+            "[chart]: b.png\n"
+        )
+        rendered = render_markdown(text, tmp_path)
+        assert rendered.assets == [tmp_path / "a.png", tmp_path / "b.png"]
+        assert collect_assets(text, tmp_path) == rendered.assets
+        assert '<img src="b.png" alt="b again" />' in rendered.html
+
+    def test_generated_figure_is_rewritten(self, tmp_path: Path):
+        """Test that a figure exported as SVG is linked and collected under its real name."""
+        (tmp_path / "fig").mkdir()
+        (tmp_path / "fig" / "chart.svg").write_text("<svg/>")
+        (tmp_path / "fig" / ".figures.json").write_text(json.dumps({"chart.png": {"file": "chart.svg"}}))
+        rendered = render_markdown("![chart](fig/chart.png)\n", tmp_path)
+        assert rendered.assets == [tmp_path / "fig" / "chart.svg"]
+        assert 'src="fig/chart.svg"' in rendered.html
+
+    def test_embeds(self, tmp_path: Path):
+        """Test that only a paragraph holding just a video or tweet URL becomes an embed."""
+        html = render_markdown(
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ\n\nSee https://youtu.be/dQw4w9WgXcQ\n", tmp_path
+        ).html
+        assert html.startswith('<div class="youtube-wrap" data-embed="youtube" data-id="dQw4w9WgXcQ">')
+        assert "<p>See https://youtu.be/dQw4w9WgXcQ</p>" in html
+
+    def test_footnotes_and_anchors(self, tmp_path: Path):
+        """Test footnote references and unique heading ids."""
+        html = render_markdown("# Goals\n\n## Goals\n\nShots[^1].\n\n[^1]: Non-penalty.\n", tmp_path).html
+        assert '<h1 id="goals">' in html and '<h2 id="goals-1">' in html
+        assert '<a href="#fn1" id="fnref1">' in html
+        assert '<li id="fn1" class="footnote-item"><p>Non-penalty.' in html
+
+
+class TestSlugify:
+    """Tests for slugify function."""
+
+    def test_slugify(self):
+        """Test that punctuation is dropped and spaces become hyphens."""
+        assert slugify("xG vs. Goals: 2024") == "xg-vs-goals-2024"
+        assert slugify("?!") == "section"
+        assert slugify("Who scores ?") == "who-scores"
+        assert slugify("- Set pieces  &  corners -") == "set-pieces-corners"
@@ -0,0 +1,66 @@
+"""Tests for retry module."""
+
+import pytest
+
+from tools.substack.retry import RetryPolicy, with_retry
+
+FAST = RetryPolicy(attempts=3, base_s=0.0)
+
+
+class TestWithRetry:
+    """Tests for with_retry function."""
+
+    async def test_succeeds_after_failures(self):
+        """Test that a flaky step is retried and resets run before each retry."""
+        calls, resets = [], []
+
+        async def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise TimeoutError("slow upload")
+            return "ok"
+
+        async def reset():
+            resets.append(1)
+
+        assert await with_retry("upload", flaky, FAST, before_retry=reset) == "ok"
+        assert len(calls) == 3
+        assert len(resets) == 2
+
+    async def test_gives_up(self):
+        """Test that the last error propagates once attempts run out."""
+        calls = []
+
+        async def broken():
+            calls.append(1)
+            raise RuntimeError(f"failure {len(calls)}")
+
+        with pytest.raises(RuntimeError, match="failure 3"):
+            await with_retry("save", broken, FAST)
+
+    async def test_other_errors_not_retried(self):
+        """Test that exceptions outside retry_on fail immediately."""
+        calls = []
+
+        async def wrong():
+            calls.append(1)
+            raise ValueError("bad input")
+
+        with pytest.raises(ValueError):
+            await with_retry("save", wrong, FAST, retry_on=(TimeoutError,))
+        assert len(calls) == 1
+
+
+class TestRetryPolicy:
+    """Tests for RetryPolicy."""
+
+    def test_backoff_doubles_and_caps(self):
+        """Test exponential delays with the cap and without jitter."""
+        policy = RetryPolicy(base_s=1.0, max_s=5.0, jitter=0.0)
+        assert [policy.delay(n) for n in (1, 2, 3, 4)] == [1.0, 2.0, 4.0, 5.0]
+
+    def test_from_env(self, monkeypatch):
+        """Test that attempts and base delay come from the environment."""
+        monkeypatch.setenv("SUBSTACK_RETRY_ATTEMPTS", "5")
+        monkeypatch.setenv("SUBSTACK_RETRY_BASE_S", "0.5")
+        assert RetryPolicy.from_env() == RetryPolicy(attempts=5, base_s=0.5)
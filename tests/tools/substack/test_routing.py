@@ -0,0 +1,48 @@
+"""Tests for routing module."""
+
+from tools.substack.routing import RouteFilter, RouteStats
+
+
+class TestRouteFilter:
+    """Tests for RouteFilter.decide."""
+
+    def test_editor_api_allowed(self):
+        """Test that the editor API and uploads are never blocked."""
+        f = RouteFilter()
+        assert f.decide("https://nwsldata.substack.com/api/v1/image", "xhr") is None
+        assert f.decide("https://nwsldata.substack.com/api/v1/drafts/1", "fetch") is None
+
+    def test_blocked_types(self):
+        """Test that fonts and remote images are blocked, documents are not."""
+        f = RouteFilter()
+        assert f.decide("https://substackcdn.com/fonts/a.woff2", "font") == "type:font"
+        assert f.decide("https://example.com/chart.png", "image") == "type:image"
+        assert f.decide("https://nwsldata.substack.com/p/new", "document") is None
+
+    def test_blocked_domains(self):
+        """Test that tracker domains and subdomains are blocked but lookalikes are not."""
+        f = RouteFilter()
+        assert f.decide("https://www.google-analytics.com/g/collect", "xhr") == "domain:google-analytics.com"
+        assert f.decide("https://notgoogle-analytics.com/x.js", "script") is None
+
+    def test_from_env(self, monkeypatch):
+        """Test that env vars replace the default lists."""
+        monkeypatch.setenv("SUBSTACK_BLOCK_TYPES", "media")
+        monkeypatch.setenv("SUBSTACK_BLOCK_DOMAINS", "example.com")
+        f = RouteFilter.from_env()
+        assert f.decide("https://example.com/x.png", "image") == "domain:example.com"
+        assert f.decide("https://other.com/x.png", "image") is None
+
+
+class TestRouteStats:
+    """Tests for RouteStats counters."""
+
+    def test_summary(self):
+        """Test that the summary reports blocked and allowed totals."""
+        stats = RouteStats()
+        stats.blocked["type:font"] += 3
+        stats.allowed = 2
+        stats.allowed_bytes = 2048
+        assert stats.blocked_total == 3
+        assert "Blocked 3 requests (type:font=3)" in stats.summary()
+        assert "2 KiB" in stats.summary()
@@ -0,0 +1,105 @@
+"""Tests for session module."""
+
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from benchmarks.mock_substack.server import MockSubstack
+from tools.substack.session import (
+    SessionExpired,
+    check_session,
+    require_session,
+    session_cookies,
+)
+
+
+@pytest.fixture
+def mock(tmp_path: Path, monkeypatch):
+    """Serve the mock API and point the publisher at it from a scratch directory."""
+    monkeypatch.chdir(tmp_path)
+    with MockSubstack() as server:
+        monkeypatch.setenv("SUBSTACK_BASE_URL", server.base_url)
+        yield server
+
+
+def api_checks(mock: MockSubstack) -> int:
+    """Count requests the preflight made to the drafts API."""
+    return sum(path.startswith("/api/v1/drafts?") for _, path, _ in mock.stats.requests)
+
+
+class TestSessionCookies:
+    """Tests for session_cookies function."""
+
+    def test_domain_and_expiry(self):
+        """Test that only unexpired cookies for the host or a parent domain are sent."""
+        state = {"cookies": [
+            {"name": "substack.sid", "value": "a", "domain": ".substack.com", "expires": -1},
+            {"name": "old", "value": "b", "domain": "nwsl.substack.com", "expires": 100},
+            {"name": "other", "value": "c", "domain": "example.com", "expires": -1},
+        ]}
+        assert session_cookies(state, "nwsl.substack.com", now=1000) == {"substack.sid": "a"}
+
+
+class TestCheckSession:
+    """Tests for check_session against the mock API."""
+
+    def test_valid_then_cached(self, mock, tmp_path):
+        """Test that a valid session is confirmed once and then served from cache."""
+        state = mock.write_storage_state(tmp_path / "state.json")
+        cache = tmp_path / "verdicts.json"
+        first = check_session("nwsl", state, cache_path=cache)
+        assert first.valid is True and first.status == 200
+        assert check_session("nwsl", state, cache_path=cache).valid is True
+        assert api_checks(mock) == 1
+
+    def test_rejected_session(self, mock, tmp_path):
+        """Test that a logged-out cookie is reported invalid, and a new login busts the cache."""
+        state = mock.write_storage_state(tmp_path / "state.json", valid=False)
+        cache = tmp_path / "verdicts.json"
+        verdict = check_session("nwsl", state, cache_path=cache)
+        assert verdict.valid is False and verdict.status == 401
+        mock.write_storage_state(state)
+        os.utime(state, ns=(time.time_ns(), time.time_ns() + 10**9))
+        assert check_session("nwsl", state, cache_path=cache).valid is True
+
+    def test_expired_cookie_needs_no_request(self, mock, tmp_path):
+        """Test that an expired session cookie fails without touching the network."""
+        state = tmp_path / "state.json"
+        state.write_text(json.dumps({"cookies": [
+            {"name": "substack.sid", "value": "x", "domain": "127.0.0.1", "expires": 1}
+        ]}))
+        verdict = check_session("nwsl", state, cache_path=tmp_path / "verdicts.json")
+        assert (verdict.valid, verdict.reason) == (False, "session cookie expired")
+        assert api_checks(mock) == 0
+
+    def test_unreachable_is_inconclusive(self, tmp_path, monkeypatch):
+        """Test that a network failure is neither valid nor invalid and is not cached."""
+        with MockSubstack() as server:
+            url = server.base_url
+            state = server.write_storage_state(tmp_path / "state.json")
+        monkeypatch.setenv("SUBSTACK_BASE_URL", url)
+        cache = tmp_path / "verdicts.json"
+        assert check_session("nwsl", state, cache_path=cache).valid is None
+        assert not cache.exists()
+
+
+class TestRequireSession:
+    """Tests for the fail-fast path."""
+
+    def test_missing_state_fails_fast(self, mock):
+        """Test that publishing without a saved session stops before any browser starts."""
+        from tools.substack.publish_to_substack import create_or_update_draft
+
+        post = Path("post.md")
+        post.write_text("---\ntitle: T\n---\n\nBody.\n")
+        with pytest.raises(SessionExpired, match="not found"):
+            asyncio.run(create_or_update_draft("nwsl", post, publish=False, login=False))
+
+    def test_disabled(self, monkeypatch, tmp_path):
+        """Test that SUBSTACK_PREFLIGHT=0 skips the check."""
+        monkeypatch.setenv("SUBSTACK_PREFLIGHT", "0")
+        assert require_session("nwsl", tmp_path / "missing.json").valid is None
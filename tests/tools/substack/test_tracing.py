@@ -0,0 +1,102 @@
+"""Tests for tracing module."""
+
+import asyncio
+import json
+from pathlib import Path
+
+from tools.substack.tracing import TraceRun, TraceSettings, prune_runs
+
+
+class TestTraceSettings:
+    """Tests for TraceSettings.from_env."""
+
+    def test_from_env(self, monkeypatch):
+        """Test that tracing is off by default and the limits are configurable."""
+        for name in ("SUBSTACK_TRACE", "SUBSTACK_TRACE_EVENTS", "SUBSTACK_KEEP_RUNS", "SUBSTACK_RUNS_MAX_MB"):
+            monkeypatch.delenv(name, raising=False)
+        assert TraceSettings.from_env() == TraceSettings()
+        monkeypatch.setenv("SUBSTACK_TRACE", "1")
+        monkeypatch.setenv("SUBSTACK_KEEP_RUNS", "3")
+        assert TraceSettings.from_env() == TraceSettings(playwright=True, keep_runs=3)
+
+
+class TestPruneRuns:
+    """Tests for prune_runs function."""
+
+    def test_count_and_size_limits(self, tmp_path: Path):
+        """Test that the oldest runs go first and the newest always stays."""
+        for i in range(4):
+            (tmp_path / f"2025010{i}T000000Z-aaaaaa").mkdir()
+            (tmp_path / f"2025010{i}T000000Z-aaaaaa" / "x.png").write_bytes(b"x" * 100)
+        removed = prune_runs(tmp_path, keep=3)
+        assert [p.name[:9] for p in removed] == ["20250100T"]
+        removed = prune_runs(tmp_path, keep=3, max_bytes=150)
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["20250103T000000Z-aaaaaa"]
+        assert prune_runs(tmp_path, keep=1, max_bytes=0) == []
+
+
+class TestFlightRecorder:
+    """Tests for FlightRecorder without a browser."""
+
+    def test_clean_post_writes_nothing(self, tmp_path: Path):
+        """Test that a post without failures leaves no run directory."""
+        run = TraceRun(TraceSettings(), root=tmp_path / "runs")
+        recorder = asyncio.run(run.recorder("a.md"))
+        recorder.note("navigate", "http://x/p/new")
+        assert asyncio.run(recorder.finish()) is None
+        assert not (tmp_path / "runs").exists()
+
+    def test_swallowed_step_is_kept(self, tmp_path: Path):
+        """Test that a swallowed exception persists the bounded event ring on finish."""
+        run = TraceRun(TraceSettings(events=3), root=tmp_path / "runs", run_id="r1")
+        recorder = asyncio.run(run.recorder("a.md"))
+        for i in range(5):
+            recorder.note("console.error", f"e{i}")
+        recorder.swallow("tags", ValueError("no settings"))
+        assert asyncio.run(recorder.finish()) == tmp_path / "runs" / "r1"
+        saved = json.loads((tmp_path / "runs" / "r1" / "a.md.events.json").read_text())
+        assert saved["reason"] == "swallowed: tags"
+        assert [e["message"] for e in saved["events"]] == ["e3", "e4", "ValueError: no settings"]
+
+    def test_failures_do_not_overwrite(self, tmp_path: Path):
+        """Test that two failures of the same post in one run keep separate files."""
+        run = TraceRun(TraceSettings(), root=tmp_path / "runs", run_id="r1")
+
+        async def fail() -> None:
+            recorder = await run.recorder("a.md")
+            await recorder.fail(None, RuntimeError("boom"))
+            await recorder.finish()
+
+        asyncio.run(fail())
+        asyncio.run(fail())
+        assert sorted(p.name for p in (tmp_path / "runs" / "r1").iterdir()) == ["a.md-2.events.json", "a.md.events.json"]
+
+    def test_concurrent_failures_get_own_stems(self, tmp_path: Path):
+        """Test that failures of the same post persisting at once do not share a stem."""
+        run = TraceRun(TraceSettings(), root=tmp_path / "runs", run_id="r1")
+
+        class SlowPage:
+            """Just enough of a Page for the screenshot and HTML captures to await."""
+
+            def is_closed(self) -> bool:
+                return False
+
+            async def screenshot(self, path: str, timeout: float) -> None:
+                await asyncio.sleep(0.01)
+                Path(path).write_bytes(b"png")
+
+            async def content(self) -> str:
+                await asyncio.sleep(0.01)
+                return "<html></html>"
+
+        async def fail_both() -> None:
+            recorders = [await run.recorder("a.md") for _ in range(2)]
+            await asyncio.gather(*(r.fail(SlowPage(), RuntimeError(f"boom {i}")) for i, r in enumerate(recorders)))
+
+        asyncio.run(fail_both())
+        saved = sorted((tmp_path / "runs" / "r1").glob("*.events.json"))
+        assert [p.name for p in saved] == ["a.md-2.events.json", "a.md.events.json"]
+        assert len(list((tmp_path / "runs" / "r1").glob("*.png"))) == 2
+        assert {json.loads(p.read_text())["events"][-1]["message"] for p in saved} == {
+            "RuntimeError: boom 0", "RuntimeError: boom 1"
+        }
@@ -0,0 +1,48 @@
+"""Tests for waits module."""
+
+from tools.substack.waits import (
+    DRAFT_SAVE_URL_RE,
+    EDITOR_URL_RE,
+    PUBLISH_URL_RE,
+    SAVED_TEXT_RE,
+    UPLOAD_URL_RE,
+    WaitTimeout,
+)
+
+
+class TestSignalPatterns:
+    """Tests for the URL and text patterns the waits key on."""
+
+    def test_upload_url(self):
+        """Test that image upload endpoints match."""
+        assert UPLOAD_URL_RE.search("https://nwsldata.substack.com/api/v1/image")
+        assert not UPLOAD_URL_RE.search("https://nwsldata.substack.com/api/v1/drafts/12")
+
+    def test_draft_save_url(self):
+        """Test that draft create/update endpoints match but sub-resources do not."""
+        assert DRAFT_SAVE_URL_RE.search("https://x.substack.com/api/v1/drafts")
+        assert DRAFT_SAVE_URL_RE.search("https://x.substack.com/api/v1/drafts/123")
+        assert not DRAFT_SAVE_URL_RE.search("https://x.substack.com/api/v1/drafts/123/publish")
+
+    def test_publish_urls(self):
+        """Test the publish endpoint and the editor pages a publish navigates away from."""
+        assert PUBLISH_URL_RE.search("https://x.substack.com/api/v1/drafts/123/publish")
+        assert not PUBLISH_URL_RE.search("https://x.substack.com/api/v1/drafts/123")
+        assert EDITOR_URL_RE.search("/publish/post/123") and EDITOR_URL_RE.search("/p/new")
+        assert not EDITOR_URL_RE.search("/p/xg-explained")
+
+    def test_saved_text(self):
+        """Test that the saved indicator text matches."""
+        assert SAVED_TEXT_RE.search("Saved")
+        assert SAVED_TEXT_RE.search(" saved 2s ago")
+        assert not SAVED_TEXT_RE.search("Unsaved changes")
+
+
+class TestWaitTimeout:
+    """Tests for WaitTimeout exception."""
+
+    def test_message(self):
+        """Test that the step and limit are reported."""
+        err = WaitTimeout("paste", 10_000)
+        assert err.step == "paste"
+        assert "10000 ms" in str(err) and "paste" in str(err)
@@ -0,0 +1,263 @@
+"""Publish a post through Substack's draft API instead of driving the editor.
+
+With the session cookies saved by ``login``, a post is one round of image
+uploads (sent concurrently over a pooled connection), one draft create or
+update carrying the body as a ProseMirror document, and, when publishing,
+one publish call. Any failure raises DraftApiError so the caller can fall
+back to the browser.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import mimetypes
+import os
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+from urllib.parse import unquote, urlsplit
+
+from .images import optimize_images, resolve_figure
+from .logger import setup_logger
+from .profiling import span
+from .prosemirror import html_to_doc
+from .session import STORAGE_STATE_PATH, session_cookies
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = setup_logger(__name__)
+
+ENGINES = ("browser", "api")
+API_TIMEOUT_S = 30.0
+# Concurrent requests per client; image uploads are spread over these.
+API_CONNECTIONS = 6
+_IMG_SRC_RE = re.compile(r'<img src="([^"]*)"')
+_DRAFT_ID_RE = re.compile(r"/publish/post/(\d+)")
+
+
+class DraftApiError(RuntimeError):
+    """Raised when a draft API call fails; the browser path can take over.
+
+    Args:
+        step: The call that failed (upload, save, publish)
+        detail: What went wrong
+        status: HTTP status, if a response arrived
+    """
+
+    def __init__(self, step: str, detail: str, status: int | None = None) -> None:
+        super().__init__(f"{step}: {detail}")
+        self.step = step
+        self.status = status
+        # Set once a draft exists, so a fallback can reopen it instead of starting over.
+        self.draft_url: str | None = None
+
+
+def publish_engine(engine: str | None = None) -> str:
+    """Return the publish engine: ``engine``, else SUBSTACK_ENGINE, else 'browser'.
+
+    Raises:
+        ValueError: If the engine is not one of ENGINES
+    """
+    value = (engine or os.getenv("SUBSTACK_ENGINE") or "browser").strip().lower()
+    if value not in ENGINES:
+        raise ValueError(f"Unknown publish engine {value!r}; expected one of {', '.join(ENGINES)}")
+    return value
+
+
+def draft_id_from_url(url: str | None) -> int | None:
+    """Return the draft id in an editor URL such as ``.../publish/post/123``."""
+    m = _DRAFT_ID_RE.search(url or "")
+    return int(m.group(1)) if m else None
+
+
+def local_image_sources(html: str, base_dir: Path) -> dict[str, Path]:
+    """Map each local ``<img src>`` in ``html`` to the existing file it refers to.
+
+    Sources are resolved the way find_local_images resolves markdown
+    references, including generated figures exported in another format.
+    """
+    sources: dict[str, Path] = {}
+    for src in dict.fromkeys(_IMG_SRC_RE.findall(html)):
+        if urlsplit(src).scheme:
+            continue
+        path = resolve_figure((base_dir / unquote(src)).resolve())
+        if path.exists():
+            sources[src] = path
+    return sources
+
+
+@dataclass(frozen=True)
+class ApiPublish:
+    """Outcome of publishing one post through the API."""
+
+    draft_id: int
+    draft_url: str
+    uploads: int
+    seconds: float
+
+
+class DraftApi:
+    """Async, connection-pooled client for the draft and image endpoints.
+
+    Args:
+        origin: The space's origin, e.g. ``https://nwsldata.substack.com``
+        cookies: Session cookies sent with every request
+        connections: Maximum concurrent requests
+        transport: Optional httpx transport, e.g. for tests
+    """
+
+    def __init__(
+        self,
+        origin: str,
+        cookies: dict[str, str],
+        connections: int = API_CONNECTIONS,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        import httpx
+
+        self.origin = origin
+        self._slots = asyncio.Semaphore(connections)
+        self._client = httpx.AsyncClient(
+            base_url=origin,
+            headers={"Accept": "application/json", "Cookie": "; ".join(f"{k}={v}" for k, v in cookies.items())},
+            timeout=API_TIMEOUT_S,
+            limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+            follow_redirects=False,
+            transport=transport,
+        )
+
+    @classmethod
+    def for_space(cls, space: str, storage_path: Path = STORAGE_STATE_PATH, **kwargs: Any) -> DraftApi:
+        """Build a client for ``space`` from the saved Playwright storage state."""
+        from .publish_to_substack import _space_origin
+
+        origin = _space_origin(space)
+        try:
+            state = json.loads(storage_path.read_text())
+        except (OSError, ValueError):
+            state = {}
+        return cls(origin, session_cookies(state, (urlsplit(origin).hostname or "").lower()), **kwargs)
+
+    async def __aenter__(self) -> DraftApi:
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        await self._client.aclose()
+
+    async def _call(self, step: str, method: str, url: str, **kwargs: Any) -> dict[str, Any]:
+        """Send one request and return its JSON body, raising DraftApiError on any failure."""
+        import httpx
+
+        async with self._slots:
+            try:
+                resp = await self._client.request(method, url, **kwargs)
+            except httpx.HTTPError as e:
+                raise DraftApiError(step, f"{type(e).__name__}: {e}") from e
+        if not resp.is_success:
+            raise DraftApiError(step, f"HTTP {resp.status_code} from {method} {url}", resp.status_code)
+        try:
+            payload = resp.json()
+        except ValueError as e:
+            raise DraftApiError(step, f"non-JSON response from {method} {url}", resp.status_code) from e
+        if not isinstance(payload, dict):
+            raise DraftApiError(step, f"unexpected response from {method} {url}", resp.status_code)
+        return payload
+
+    async def upload_image(self, path: Path) -> str:
+        """Upload one image as a data URI and return the URL it is served from."""
+        ctype = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        try:
+            data = await asyncio.to_thread(path.read_bytes)
+        except OSError as e:
+            raise DraftApiError(f"upload {path.name}", f"cannot read image: {e}") from e
+        uri = f"data:{ctype};base64,{base64.b64encode(data).decode('ascii')}"
+        payload = await self._call(f"upload {path.name}", "POST", "/api/v1/image", json={"image": uri})
+        url = payload.get("url")
+        if not isinstance(url, str) or not url:
+            raise DraftApiError(f"upload {path.name}", "response has no image URL")
+        return url
+
+    async def upload_images(self, paths: list[Path]) -> list[str]:
+        """Upload images concurrently and return their URLs in the same order.
+
+        The first failure cancels the uploads still in flight before it is
+        raised, so a post that is about to fall back to the editor does not
+        keep sending images it will never reference.
+        """
+        tasks = [asyncio.ensure_future(self.upload_image(p)) for p in paths]
+        try:
+            return list(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    async def save_draft(self, title: str, doc: dict[str, Any], tags: list[str], draft_id: int | None = None) -> int:
+        """Create a draft, or overwrite ``draft_id``, and return its id."""
+        body = {"draft_title": title, "draft_body": json.dumps(doc), "tags": list(tags)}
+        if draft_id is None:
+            payload = await self._call("save", "POST", "/api/v1/drafts", json=body)
+        else:
+            payload = await self._call("save", "PUT", f"/api/v1/drafts/{draft_id}", json=body)
+        saved = payload.get("id")
+        if not isinstance(saved, int):
+            raise DraftApiError("save", "response has no draft id")
+        return saved
+
+    async def publish(self, draft_id: int) -> None:
+        """Publish a saved draft."""
+        await self._call("publish", "POST", f"/api/v1/drafts/{draft_id}/publish", json={})
+
+    async def publish_post(
+        self,
+        title: str,
+        tags: list[str],
+        html: str,
+        base_dir: Path,
+        publish: bool,
+        draft_id: int | None = None,
+    ) -> ApiPublish:
+        """Upload a post's images, save it as a draft and optionally publish it.
+
+        Args:
+            title: Post title
+            tags: Post tags
+            html: Rendered body (see read_post)
+            base_dir: Directory relative image sources are resolved against
+            publish: If True, publish after saving
+            draft_id: Existing draft to overwrite instead of creating one
+
+        Returns:
+            The saved draft and how long the calls took
+
+        Raises:
+            DraftApiError: If any call fails; ``draft_url`` is set once the draft was saved
+        """
+        started = time.perf_counter()
+        sources = local_image_sources(html, base_dir)
+        files = list(dict.fromkeys(sources.values()))
+        with span("optimize_images", count=len(files)):
+            try:
+                optimized = {o.source: o.path for o in await asyncio.to_thread(optimize_images, files)}
+            except (OSError, ValueError) as e:
+                raise DraftApiError("optimize images", f"{type(e).__name__}: {e}") from e
+        with span("api_uploads", count=len(files)):
+            urls = await self.upload_images([optimized[f] for f in files])
+        uploaded = dict(zip(files, urls, strict=True))
+        doc = html_to_doc(html, {src: uploaded[path] for src, path in sources.items()})
+        with span("api_save"):
+            draft_id = await self.save_draft(title, doc, tags, draft_id)
+        draft_url = f"{self.origin}/publish/post/{draft_id}"
+        if publish:
+            try:
+                with span("api_publish"):
+                    await self.publish(draft_id)
+            except DraftApiError as e:
+                e.draft_url = draft_url
+                raise
+        return ApiPublish(draft_id, draft_url, len(files), time.perf_counter() - started)
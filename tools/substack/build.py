@@ -0,0 +1,233 @@
+"""Render posts to HTML ahead of publishing, in parallel and incrementally.
+
+Each post becomes a JSON artifact (title, tags, HTML, local image paths)
+under the build directory. An index keyed by post path records the source
+mtime, size and hash, the renderer version and the mtimes of the images and
+figure manifests the post depends on, so only changed posts are
+re-rendered; publishing reads a fresh artifact instead of parsing the
+markdown again.
+"""
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .images import FIGURE_MANIFEST
+from .logger import setup_logger
+from .manifest import post_key
+from .render import RENDERER_VERSION
+
+logger = setup_logger(__name__)
+
+BUILD_DIR = Path("build") / "posts"
+DEFAULT_ROOTS = (Path("docs"), Path("templates") / "posts")
+# Below this many posts a process pool costs more than it saves.
+MIN_PARALLEL = 4
+
+
+@dataclass
+class BuildReport:
+    """What a build run did."""
+
+    rendered: list[Path] = field(default_factory=list)
+    reused: list[Path] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    failed: dict[Path, str] = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+def discover(roots: tuple[Path, ...] | list[Path] = DEFAULT_ROOTS) -> list[Path]:
+    """Return every markdown post under the given roots, sorted."""
+    posts: set[Path] = set()
+    for root in roots:
+        if root.is_file() and root.suffix == ".md":
+            posts.add(root)
+        elif root.is_dir():
+            posts.update(root.rglob("*.md"))
+    return sorted(posts)
+
+
+def _sha256(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _artifact_name(key: str) -> str:
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16] + ".json"
+
+
+def _mtime(path: Path) -> int | None:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _dependencies(sources: list[Path], assets: list[Path]) -> dict[str, int | None]:
+    """Return the mtime (None if missing) of every file a rendered post depends on.
+
+    That is each referenced image whether or not it exists, the file it
+    resolved to, and the directory and figure manifest around it, so an image
+    appearing or a figure being re-exported makes the artifact stale.
+    """
+    paths = {*sources, *assets}
+    for p in list(paths):
+        paths.update((p.parent, p.parent / FIGURE_MANIFEST))
+    return {str(p): _mtime(p) for p in sorted(paths)}
+
+
+def _dependencies_fresh(entry: dict[str, Any]) -> bool:
+    deps = entry.get("deps")
+    return deps is not None and all(_mtime(Path(p)) == m for p, m in deps.items())
+
+
+def _render(md_path: str) -> dict[str, Any]:
+    """Render one post (runs in a worker process)."""
+    from .publish_to_substack import render_post
+
+    try:
+        title, tags, rendered = render_post(Path(md_path))
+    except (FileNotFoundError, ValueError) as e:
+        return {"error": str(e)}
+    return {
+        "title": title, "tags": list(tags), "html": rendered.html,
+        "assets": [str(a) for a in rendered.assets],
+        "deps": _dependencies(rendered.sources, rendered.assets),
+    }
+
+
+def _load_index(out_dir: Path) -> dict[str, dict[str, Any]]:
+    try:
+        index = json.loads((out_dir / "index.json").read_text())
+    except (OSError, ValueError):
+        return {}
+    return index if isinstance(index, dict) else {}
+
+
+def _in_roots(key: str, roots: tuple[Path, ...] | list[Path]) -> bool:
+    """Return True if an index key lies under one of the scanned roots."""
+    return any(key == post_key(r) or key.startswith(post_key(r) + "/") for r in roots)
+
+
+def build(
+    roots: tuple[Path, ...] | list[Path] = DEFAULT_ROOTS,
+    out_dir: Path = BUILD_DIR,
+    workers: int | None = None,
+    force: bool = False,
+) -> BuildReport:
+    """Render every post under ``roots`` whose source changed since the last build.
+
+    Args:
+        roots: Directories (or single files) to scan for ``*.md``
+        out_dir: Where artifacts and ``index.json`` are written
+        workers: Process pool size (default: CPU count)
+        force: Re-render everything
+
+    Returns:
+        A BuildReport listing rendered, reused, removed and failed posts
+    """
+    started = time.perf_counter()
+    report = BuildReport()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    index = _load_index(out_dir)
+    posts = discover(roots)
+
+    todo: list[tuple[Path, str, os.stat_result, str]] = []
+    for md_path in posts:
+        key = post_key(md_path)
+        st = md_path.stat()
+        entry = index.get(key)
+        fresh = (
+            entry is not None
+            and not force
+            and (out_dir / entry["artifact"]).exists()
+            and entry.get("renderer") == RENDERER_VERSION
+            and entry["mtime_ns"] == st.st_mtime_ns
+            and entry["size"] == st.st_size
+            and _dependencies_fresh(entry)
+        )
+        if fresh:
+            report.reused.append(md_path)
+            continue
+        digest = _sha256(md_path)
+        if (
+            entry is not None
+            and not force
+            and entry["sha256"] == digest
+            and entry.get("renderer") == RENDERER_VERSION
+            and (out_dir / entry["artifact"]).exists()
+            and _dependencies_fresh(entry)
+        ):
+            # touched but not edited
+            entry.update(mtime_ns=st.st_mtime_ns, size=st.st_size)
+            report.reused.append(md_path)
+            continue
+        todo.append((md_path, key, st, digest))
+
+    paths = [str(t[0]) for t in todo]
+    if len(todo) >= MIN_PARALLEL and workers != 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rendered = list(pool.map(_render, paths, chunksize=max(1, len(paths) // 32)))
+    else:
+        rendered = [_render(p) for p in paths]
+
+    for (md_path, key, st, digest), result in zip(todo, rendered, strict=True):
+        if "error" in result:
+            report.failed[md_path] = result["error"]
+            index.pop(key, None)
+            continue
+        artifact = _artifact_name(key)
+        deps = result.pop("deps")
+        (out_dir / artifact).write_text(json.dumps(result))
+        index[key] = {
+            "mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": digest, "artifact": artifact,
+            "renderer": RENDERER_VERSION, "deps": deps,
+        }
+        report.rendered.append(md_path)
+
+    live = {post_key(p) for p in posts}
+    for key in [k for k in index if k not in live and _in_roots(k, roots)]:
+        (out_dir / index.pop(key)["artifact"]).unlink(missing_ok=True)
+        report.removed.append(key)
+
+    tmp = out_dir / "index.json.tmp"
+    tmp.write_text(json.dumps(index, indent=2, sort_keys=True))
+    tmp.replace(out_dir / "index.json")
+    report.seconds = time.perf_counter() - started
+    logger.info(
+        f"Build: {len(report.rendered)} rendered, {len(report.reused)} reused, "
+        f"{len(report.removed)} removed, {len(report.failed)} failed in {report.seconds:.2f}s"
+    )
+    return report
+
+
+def load_built(md_path: Path, out_dir: Path = BUILD_DIR) -> tuple[str, list[str], str, list[Path]] | None:
+    """Return the prebuilt ``read_post`` result for a post if it is still fresh.
+
+    Freshness is checked against the source file's mtime and size, the
+    renderer version and the mtimes of the images and figure manifests the
+    post depends on; a stale or missing artifact returns None so the caller
+    can render directly.
+
+    Args:
+        md_path: Path to the markdown file
+        out_dir: Build directory
+
+    Returns:
+        (title, tags, html, local_image_paths), or None
+    """
+    entry = _load_index(out_dir).get(post_key(md_path))
+    if entry is None or entry.get("renderer") != RENDERER_VERSION or not _dependencies_fresh(entry):
+        return None
+    try:
+        st = md_path.stat()
+        if entry["mtime_ns"] != st.st_mtime_ns or entry["size"] != st.st_size:
+            return None
+        data = json.loads((out_dir / entry["artifact"]).read_text())
+    except (OSError, ValueError, KeyError):
+        return None
+    return data["title"], data["tags"], data["html"], [Path(a) for a in data["assets"]]
@@ -0,0 +1,313 @@
+"""SQLite catalog of every post for fast metadata and full-text queries.
+
+Each markdown file under docs/, templates/posts/ and archive/ gets a row
+with its title, date, tags and image references, plus an FTS5 row with the
+title, tags and body. Refreshing is incremental: files whose mtime and size
+match the catalog are not read, touched-but-identical files are recognized
+by hash, and only edited files are parsed again.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .build import DEFAULT_ROOTS as BUILD_ROOTS
+from .build import discover
+from .logger import setup_logger
+from .manifest import post_key
+
+logger = setup_logger(__name__)
+
+CATALOG_PATH = Path("build") / "catalog.sqlite"
+DEFAULT_ROOTS = (*BUILD_ROOTS, Path("archive"))
+# Bump when the schema or the parsed fields change; the catalog is rebuilt.
+SCHEMA_VERSION = 1
+
+DATE_RE = re.compile(r"(\d{4}-\d{2}-\d{2})")
+# "**Date**: 2025-10-26" style headers in notes without front-matter
+DATE_LINE_RE = re.compile(r"^\W*date\W+(\d{4}-\d{2}-\d{2})", re.IGNORECASE | re.MULTILINE)
+H1_RE = re.compile(r"^#\s+(.+?)\s*#*\s*$", re.MULTILINE)
+IMG_RE = re.compile(r"!\[[^\]]*\]\(([^)\s]+)[^)]*\)")
+# Marks matched terms in search snippets.
+HIGHLIGHT = ("«", "»")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    title TEXT NOT NULL,
+    date TEXT,
+    tags TEXT NOT NULL,
+    images TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS post_tags (path TEXT NOT NULL, tag TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS post_tags_tag ON post_tags (tag, path);
+CREATE TABLE IF NOT EXISTS post_images (path TEXT NOT NULL, image TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS post_images_path ON post_images (path);
+CREATE INDEX IF NOT EXISTS posts_date ON posts (date);
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+    path UNINDEXED, title, tags, body, tokenize = 'porter unicode61'
+);
+"""
+
+
+@dataclass
+class CatalogEntry:
+    """One post as stored in the catalog."""
+
+    path: str
+    title: str
+    date: str | None
+    tags: list[str]
+    images: list[str]
+    snippet: str = ""
+
+
+@dataclass
+class RefreshReport:
+    """What a catalog refresh did."""
+
+    indexed: list[str] = field(default_factory=list)
+    unchanged: int = 0
+    removed: list[str] = field(default_factory=list)
+    failed: dict[str, str] = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+def parse_post(md_path: Path, text: str) -> dict[str, Any]:
+    """Extract the catalog fields from a post's source.
+
+    Title and tags come from front-matter; without front-matter the first
+    ``# heading`` (else the file name) is the title. The date is the
+    front-matter ``date``, a ``YYYY-MM-DD`` file-name prefix, or a
+    ``Date: YYYY-MM-DD`` line near the top, in that order.
+    """
+    import frontmatter
+
+    post = frontmatter.loads(text)
+    body = post.content
+    heading = H1_RE.search(body)
+    title = post.get("title") or (heading.group(1) if heading else md_path.stem.replace("-", " ").title())
+    tags = post.get("tags") or []
+    if isinstance(tags, str):
+        tags = [t.strip() for t in tags.split(",") if t.strip()]
+    date = post.get("date")
+    if date is None:
+        match = DATE_RE.match(md_path.name) or DATE_LINE_RE.search(body[:2000])
+        date = match.group(1) if match else None
+    return {
+        "title": str(title),
+        "date": str(date)[:10] if date is not None else None,
+        "tags": [str(t) for t in tags],
+        "images": [m.group(1) for m in IMG_RE.finditer(body)],
+        "body": body,
+    }
+
+
+def _fts_query(text: str) -> str:
+    """Quote each term so user input cannot break FTS5 syntax; a trailing * keeps prefix search."""
+    terms = []
+    for term in text.split():
+        prefix = term.endswith("*")
+        term = term.rstrip("*").replace('"', '""')
+        if term:
+            terms.append(f'"{term}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+class Catalog:
+    """Persistent post catalog backed by SQLite FTS5.
+
+    Args:
+        path: Database file (created on first use)
+    """
+
+    def __init__(self, path: Path = CATALOG_PATH) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode = WAL")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.db.executescript(
+                "DROP TABLE IF EXISTS posts; DROP TABLE IF EXISTS post_tags;"
+                "DROP TABLE IF EXISTS post_images; DROP TABLE IF EXISTS posts_fts;"
+            )
+            self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.db.executescript(SCHEMA)
+
+    def __enter__(self) -> Catalog:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self.db.close()
+
+    def _delete(self, key: str) -> None:
+        for table in ("posts", "post_tags", "post_images", "posts_fts"):
+            self.db.execute(f"DELETE FROM {table} WHERE path = ?", (key,))
+
+    def refresh(self, roots: Iterable[Path] = DEFAULT_ROOTS, force: bool = False) -> RefreshReport:
+        """Bring the catalog up to date with the posts under ``roots``.
+
+        Posts that no longer exist under the scanned roots are removed.
+
+        Args:
+            roots: Directories (or single files) to scan for ``*.md``
+            force: Re-parse every post
+
+        Returns:
+            A RefreshReport listing indexed, removed and failed posts
+        """
+        started = time.perf_counter()
+        roots = list(roots)
+        report = RefreshReport()
+        known = {
+            row["path"]: row for row in self.db.execute("SELECT path, mtime_ns, size, sha256 FROM posts")
+        }
+        seen: set[str] = set()
+        with self.db:
+            for md_path in discover(roots):
+                key = post_key(md_path)
+                seen.add(key)
+                st = md_path.stat()
+                row = known.get(key)
+                if not force and row and row["mtime_ns"] == st.st_mtime_ns and row["size"] == st.st_size:
+                    report.unchanged += 1
+                    continue
+                data = md_path.read_bytes()
+                digest = hashlib.sha256(data).hexdigest()
+                if not force and row and row["sha256"] == digest:
+                    # touched but not edited
+                    self.db.execute(
+                        "UPDATE posts SET mtime_ns = ?, size = ? WHERE path = ?", (st.st_mtime_ns, st.st_size, key)
+                    )
+                    report.unchanged += 1
+                    continue
+                try:
+                    fields = parse_post(md_path, data.decode("utf-8"))
+                except Exception as e:
+                    report.failed[key] = f"{type(e).__name__}: {e}"
+                    logger.warning(f"Cannot catalog {md_path}: {e}")
+                    self._delete(key)
+                    continue
+                self._delete(key)
+                self.db.execute(
+                    "INSERT INTO posts VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, st.st_mtime_ns, st.st_size, digest, fields["title"], fields["date"],
+                     json.dumps(fields["tags"]), json.dumps(fields["images"])),
+                )
+                self.db.executemany(
+                    "INSERT INTO post_tags VALUES (?, ?)", [(key, t.lower()) for t in fields["tags"]]
+                )
+                self.db.executemany("INSERT INTO post_images VALUES (?, ?)", [(key, i) for i in fields["images"]])
+                self.db.execute(
+                    "INSERT INTO posts_fts (path, title, tags, body) VALUES (?, ?, ?, ?)",
+                    (key, fields["title"], " ".join(fields["tags"]), fields["body"]),
+                )
+                report.indexed.append(key)
+            for key in known.keys() - seen:
+                if any(key == post_key(r) or key.startswith(post_key(r) + "/") for r in roots):
+                    self._delete(key)
+                    report.removed.append(key)
+        report.seconds = time.perf_counter() - started
+        return report
+
+    def _filters(
+        self, tags: Iterable[str], image: str | None, since: str | None, until: str | None
+    ) -> tuple[list[str], list[Any]]:
+        where: list[str] = []
+        params: list[Any] = []
+        for tag in tags:
+            where.append("p.path IN (SELECT path FROM post_tags WHERE tag = ?)")
+            params.append(tag.lower())
+        if image:
+            where.append("p.path IN (SELECT path FROM post_images WHERE image LIKE ?)")
+            params.append(f"%{image}%")
+        if since:
+            where.append("p.date >= ?")
+            params.append(since)
+        if until:
+            where.append("p.date <= ?")
+            params.append(until)
+        return where, params
+
+    @staticmethod
+    def _entry(row: sqlite3.Row) -> CatalogEntry:
+        return CatalogEntry(
+            path=row["path"],
+            title=row["title"],
+            date=row["date"],
+            tags=json.loads(row["tags"]),
+            images=json.loads(row["images"]),
+            snippet=row["snippet"] if "snippet" in row.keys() else "",
+        )
+
+    def list_posts(
+        self,
+        tags: Iterable[str] = (),
+        image: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        limit: int | None = None,
+    ) -> list[CatalogEntry]:
+        """Return posts matching every filter, newest first.
+
+        Args:
+            tags: Tags the post must all carry (case-insensitive)
+            image: Substring of an image reference, e.g. "vaep"
+            since: Earliest date, ``YYYY-MM-DD``
+            until: Latest date, ``YYYY-MM-DD``
+            limit: Maximum number of posts
+        """
+        where, params = self._filters(tags, image, since, until)
+        sql = "SELECT p.* FROM posts p"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY p.date IS NULL, p.date DESC, p.path"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [self._entry(r) for r in self.db.execute(sql, params)]
+
+    def search(
+        self,
+        query: str,
+        tags: Iterable[str] = (),
+        image: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        limit: int | None = 20,
+    ) -> list[CatalogEntry]:
+        """Full-text search over title, tags and body, best match first.
+
+        Every word must match (stemmed); end a word with ``*`` for a prefix match.
+        Accepts the same filters as list_posts().
+        """
+        match = _fts_query(query)
+        if not match:
+            return []
+        where, params = self._filters(tags, image, since, until)
+        sql = (
+            "SELECT p.*, snippet(posts_fts, 3, ?, ?, ' … ', 12) AS snippet "
+            "FROM posts_fts JOIN posts p ON p.path = posts_fts.path WHERE posts_fts MATCH ?"
+        )
+        for clause in where:
+            sql += " AND " + clause
+        sql += " ORDER BY bm25(posts_fts, 0, 10, 5, 1)"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [self._entry(r) for r in self.db.execute(sql, [*HIGHLIGHT, match, *params])]
@@ -0,0 +1,209 @@
+"""Work out which posts a commit range affects.
+
+A post depends on its own file, the local images it references, the chart
+script that generates each of those images (plus the shared figure runner),
+and the notebook it was exported from. Given the files a commit range
+touched, the plan lists the posts to rebuild and republish, the figure
+scripts to re-run and the notebooks to re-export, and nothing else.
+"""
+from __future__ import annotations
+
+import ast
+import json
+import os
+import subprocess
+import sys
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .build import DEFAULT_ROOTS, discover
+from .images import resolve_figure
+from .logger import setup_logger
+from .render import collect_sources
+
+# stderr, so a plan printed as JSON on stdout stays parseable
+logger = setup_logger(__name__, stream=sys.stderr)
+
+SCRIPTS_DIR = Path("scripts")
+FIGURE_OUT_DIR = Path("docs") / "images"
+# Changing the runner changes every figure it exports.
+FIGURE_RUNNER = SCRIPTS_DIR / "figures.py"
+NOTEBOOK_INDEX = ".notebooks.json"
+
+
+def _rel(path: Path, repo: Path) -> str:
+    return Path(os.path.relpath(path.resolve(), repo.resolve())).as_posix()
+
+
+def changed_files(rev_range: str, repo: Path = Path(".")) -> list[str]:
+    """Return the files changed in ``rev_range`` (e.g. ``HEAD^..HEAD``), repo-relative.
+
+    Renames are listed under both their old and new names.
+
+    Raises:
+        RuntimeError: If git cannot resolve the range
+    """
+    result = subprocess.run(
+        ["git", "diff", "--name-only", "--no-renames", rev_range, "--"],
+        cwd=repo,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"git diff {rev_range} failed: {result.stderr.strip()}")
+    return [line for line in result.stdout.splitlines() if line]
+
+
+def figure_scripts(scripts_dir: Path = SCRIPTS_DIR) -> dict[str, Path]:
+    """Map each registered figure name to the script that declares it.
+
+    Scripts are parsed, not imported, so this works without matplotlib.
+    Only ``@figure("name.png", ...)`` decorators with a literal name count.
+    """
+    owners: dict[str, Path] = {}
+    for script in sorted(scripts_dir.glob("*.py")):
+        try:
+            tree = ast.parse(script.read_text(encoding="utf-8"), str(script))
+        except (OSError, SyntaxError, UnicodeDecodeError) as e:
+            logger.warning(f"Skipping {script}: {e}")
+            continue
+        for node in ast.walk(tree):
+            if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                continue
+            for deco in node.decorator_list:
+                if (
+                    isinstance(deco, ast.Call)
+                    and getattr(deco.func, "id", getattr(deco.func, "attr", None)) == "figure"
+                    and deco.args
+                    and isinstance(deco.args[0], ast.Constant)
+                    and isinstance(deco.args[0].value, str)
+                ):
+                    owners[deco.args[0].value] = script
+    return owners
+
+
+def notebook_sources(roots: Iterable[Path], repo: Path = Path(".")) -> dict[str, str]:
+    """Map exported posts to their notebooks using each ``.notebooks.json`` index."""
+    sources: dict[str, str] = {}
+    for root in roots:
+        if not root.is_dir():
+            continue
+        for index_path in root.rglob(NOTEBOOK_INDEX):
+            try:
+                index: dict[str, Any] = json.loads(index_path.read_text())
+            except (OSError, ValueError):
+                continue
+            for entry in index.values():
+                if isinstance(entry, dict) and entry.get("md") and entry.get("source"):
+                    md = _rel(index_path.parent / entry["md"], repo)
+                    sources[md] = _rel(index_path.parent / entry["source"], repo)
+    return sources
+
+
+@dataclass
+class ChangePlan:
+    """What a commit range requires."""
+
+    posts: list[str] = field(default_factory=list)
+    figure_scripts: list[str] = field(default_factory=list)
+    notebooks: dict[str, str] = field(default_factory=dict)
+    reasons: dict[str, list[str]] = field(default_factory=dict)
+
+    def to_json(self) -> dict[str, Any]:
+        """Serializable form for CI."""
+        return {"posts": self.posts, "figure_scripts": self.figure_scripts, "notebooks": self.notebooks}
+
+
+@dataclass
+class DependencyGraph:
+    """Posts and the repo-relative files each one is built from.
+
+    Args:
+        deps: Post path -> files that change what gets published
+        scripts: File under the figure directory -> generating script
+        notebooks: Post path -> source notebook
+    """
+
+    deps: dict[str, set[str]] = field(default_factory=dict)
+    scripts: dict[str, str] = field(default_factory=dict)
+    notebooks: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def scan(
+        cls,
+        roots: Iterable[Path] = DEFAULT_ROOTS,
+        scripts_dir: Path = SCRIPTS_DIR,
+        figure_dir: Path = FIGURE_OUT_DIR,
+        repo: Path = Path("."),
+    ) -> DependencyGraph:
+        """Build the graph from the working tree.
+
+        Image edges come from the paths posts reference, not the files on
+        disk, so a figure that has not been generated yet still ties its
+        script to the posts that use it.
+        """
+        roots = list(roots)
+        owners = {
+            _rel(figure_dir / Path(name).stem, repo): script
+            for name, script in figure_scripts(scripts_dir).items()
+        }
+        graph = cls(notebooks=notebook_sources(roots, repo))
+        runner = _rel(scripts_dir / FIGURE_RUNNER.name, repo)
+        for post in discover(roots):
+            key = _rel(post, repo)
+            deps = {key}
+            try:
+                text = post.read_text(encoding="utf-8")
+            except (OSError, UnicodeDecodeError) as e:
+                logger.warning(f"Skipping images of {post}: {e}")
+                text = ""
+            for source in collect_sources(text, post.parent):
+                for image in dict.fromkeys((source, resolve_figure(source))):
+                    rel = _rel(image, repo)
+                    deps.add(rel)
+                    script = owners.get(rel.rsplit(".", 1)[0])
+                    if script is not None:
+                        graph.scripts[rel] = _rel(script, repo)
+                        deps.update((graph.scripts[rel], runner))
+            if key in graph.notebooks:
+                deps.add(graph.notebooks[key])
+            graph.deps[key] = deps
+        return graph
+
+    def plan(self, changed: Iterable[str]) -> ChangePlan:
+        """Return the posts, figure scripts and notebooks touched by ``changed``."""
+        changed = set(changed)
+        plan = ChangePlan()
+        scripts: set[str] = set()
+        for post, deps in sorted(self.deps.items()):
+            hits = sorted(deps & changed)
+            if not hits:
+                continue
+            plan.posts.append(post)
+            plan.reasons[post] = hits
+            for dep in deps:
+                script = self.scripts.get(dep)
+                if script and {script, _runner(script)} & changed:
+                    scripts.add(script)
+            notebook = self.notebooks.get(post)
+            if notebook in changed:
+                plan.notebooks[notebook] = post
+        plan.figure_scripts = sorted(scripts)
+        return plan
+
+
+def _runner(script: str) -> str:
+    return (Path(script).parent / FIGURE_RUNNER.name).as_posix()
+
+
+def plan_changes(
+    rev_range: str, roots: Iterable[Path] = DEFAULT_ROOTS, repo: Path = Path(".")
+) -> ChangePlan:
+    """Diff ``rev_range`` and return the minimal rebuild plan for the current tree."""
+    changed = changed_files(rev_range, repo)
+    plan = DependencyGraph.scan(roots, repo=repo).plan(changed)
+    logger.debug(f"{len(changed)} changed files -> {len(plan.posts)} posts, "
+                f"{len(plan.figure_scripts)} figure scripts, {len(plan.notebooks)} notebooks")
+    return plan
@@ -0,0 +1,111 @@
+"""Per-post checkpoint journal so a failed publish resumes where it stopped.
+
+While a post is being filled in, the journal records the draft's URL as
+soon as the first save gives it one, and each step that finished (title,
+body, every image, tags). A rerun reopens that draft and skips the
+finished steps instead of starting a new draft. The journal is deleted
+once the post is saved or published.
+"""
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from .logger import setup_logger
+from .manifest import post_key
+
+logger = setup_logger(__name__)
+
+CHECKPOINT_DIR = Path(".playwright") / "checkpoints"
+# Substack (and the mock editor) move a saved draft to /publish/post/<id>.
+DRAFT_URL_RE = re.compile(r"/publish/post/\d+")
+
+
+def checkpoints_enabled() -> bool:
+    """Return False when SUBSTACK_CHECKPOINTS is set to 0/false/no."""
+    return os.getenv("SUBSTACK_CHECKPOINTS", "1").lower() not in ("0", "false", "no")
+
+
+class PublishJournal:
+    """Checkpoints of one post's publish run, written through on every change.
+
+    A journal left by a run for a different space is ignored. If the post
+    changed since, the finished steps are dropped but the draft URL is
+    kept, so the rerun rewrites the same draft instead of creating another.
+
+    Args:
+        md_path: The post being published
+        space: Normalized Substack subdomain
+        digest: Content hash of the post (see post_digest)
+        directory: Where journals are kept
+    """
+
+    def __init__(self, md_path: Path, space: str, digest: str, directory: Path = CHECKPOINT_DIR) -> None:
+        self.key = post_key(md_path)
+        self.space = space
+        self.digest = digest
+        self.path = directory / (hashlib.sha1(self.key.encode("utf-8")).hexdigest()[:16] + ".json")
+        data: dict[str, Any] = {}
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text())
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable checkpoint {self.path}: {e}")
+        if data.get("space") != space:
+            data = {}
+        elif data.get("digest") != digest:
+            logger.info(f"{self.key} changed since the interrupted run; rewriting draft {data.get('draft_url')}")
+            data = {"draft_url": data.get("draft_url")}
+        self.draft_url: str | None = data.get("draft_url")
+        self.steps: list[str] = list(data.get("steps", []))
+        if self.draft_url or self.steps:
+            logger.info(f"Resuming {self.key}: draft {self.draft_url}, done: {', '.join(self.steps) or 'nothing'}")
+
+    @property
+    def resuming(self) -> bool:
+        """True if an earlier run already created the draft."""
+        return self.draft_url is not None
+
+    def done(self, step: str) -> bool:
+        """Return True if ``step`` finished in this or an earlier run."""
+        return step in self.steps
+
+    def complete(self, step: str, url: str | None = None) -> None:
+        """Record a finished step and, if ``url`` is a saved draft's, the draft URL."""
+        if url and DRAFT_URL_RE.search(url):
+            self.draft_url = url
+        if step not in self.steps:
+            self.steps.append(step)
+        self.save()
+
+    def reset(self, keep: tuple[str, ...] = ()) -> None:
+        """Forget finished steps other than ``keep`` (the draft URL stays)."""
+        self.steps = [s for s in self.steps if s in keep]
+        self.save()
+
+    def abandon_draft(self) -> None:
+        """Forget the draft and every step, e.g. when the draft no longer opens."""
+        self.draft_url = None
+        self.steps = []
+        self.save()
+
+    def save(self) -> None:
+        """Atomically write the journal to disk."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "post": self.key,
+            "space": self.space,
+            "digest": self.digest,
+            "draft_url": self.draft_url,
+            "steps": self.steps,
+            "updated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }, indent=2))
+        tmp.replace(self.path)
+
+    def clear(self) -> None:
+        """Delete the journal after the post went through."""
+        self.path.unlink(missing_ok=True)
@@ -1,14 +1,22 @@
 # tools/substack/cli.py
+import glob
 import os
 import re
 import subprocess
 import sys
+import time
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import typer
 from rich import print as rprint
 
+if TYPE_CHECKING:
+    from .profiling import Profiler
+
 app = typer.Typer(help="NWSL Notes utilities for Substack")
+daemon_app = typer.Typer(help="Keep a warm headless Chromium that publish runs attach to.")
+app.add_typer(daemon_app, name="daemon")
 
 # --- .env loading with inline-comment handling ---
 ENV_LINE = re.compile(r"""^\s*([A-Za-z_][A-Za-z0-9_]*)\s*=\s*(.+?)\s*$""")
@@ -61,6 +69,52 @@ def normalize_space(space: str | None) -> str:
         )
     return s
 
+def expand_paths(patterns: list[str]) -> list[Path]:
+    """Expand file paths and glob patterns into a de-duplicated file list.
+
+    Args:
+        patterns: File paths or glob patterns (``**`` is recursive)
+
+    Returns:
+        Matching files in first-seen order
+
+    Raises:
+        typer.BadParameter: If a plain path does not exist or a pattern matches nothing
+    """
+    seen: dict[Path, None] = {}
+    for pat in patterns:
+        if glob.has_magic(pat):
+            matches = sorted(Path(m) for m in glob.glob(pat, recursive=True) if Path(m).is_file())
+            if not matches:
+                raise typer.BadParameter(f"No files match {pat!r}")
+        else:
+            if not Path(pat).is_file():
+                raise typer.BadParameter(f"File not found: {pat}")
+            matches = [Path(pat)]
+        for m in matches:
+            seen.setdefault(m, None)
+    return list(seen)
+
+def check_engine(engine: str | None) -> None:
+    """Exit with an error unless ``engine`` is empty or a known publish engine."""
+    from .api import ENGINES
+
+    if engine and engine.lower() not in ENGINES:
+        rprint(f"[red]Unknown engine {engine!r}; use one of: {', '.join(ENGINES)}[/red]")
+        raise typer.Exit(1)
+
+def print_profile(prof: "Profiler", trace_out: Path | None) -> None:
+    """Print a per-phase timing table and optionally write a Chrome trace."""
+    from rich.table import Table
+
+    table = Table("phase", "count", "total ms", "share", title="Publish profile")
+    for name, count, total_ms, share in prof.breakdown():
+        table.add_row(name, str(count), f"{total_ms:.1f}", f"{share:.0%}")
+    rprint(table)
+    if trace_out:
+        prof.write_chrome_trace(trace_out)
+        rprint(f"[cyan]Trace written:[/cyan] {trace_out} (open in chrome://tracing or ui.perfetto.dev)")
+
 # --- commands ---
 @app.command(help="Interactive login to capture a Substack session (storage_state.json).")
 def login(space: str | None = typer.Option(None, "--space", "-s", help="Substack subdomain, e.g., nwsldata")) -> None:
@@ -69,16 +123,44 @@ def login(space: str | None = typer.Option(None, "--space", "-s", help="Substack
     if not space:
         rprint("[red]Set SUBSTACK_SPACE in .env or pass --space[/red]")
         raise typer.Exit(1)
-    pub = Path(__file__).parent / "publish_to_substack.py"
-    cmd = [sys.executable, str(pub), "--space", space, "--login"]
-    rprint(f"[cyan]Running:[/cyan] {' '.join(cmd)}")
-    subprocess.check_call(cmd)
+    import asyncio
+
+    from .publish_to_substack import create_or_update_draft
+
+    asyncio.run(create_or_update_draft(space, None, publish=False, login=True))
+
+@app.command("check-session", help="Check the saved session over HTTP, without a browser.")
+def check_session(
+    space: str | None = typer.Option(None, "--space", "-s", help="Substack subdomain, e.g., nwsldata"),
+    fresh: bool = typer.Option(False, "--fresh", help="Ignore the cached verdict"),
+) -> None:
+    load_env()
+    space = normalize_space(space or os.getenv("SUBSTACK_SPACE"))
+    if not space:
+        rprint("[red]Set SUBSTACK_SPACE in .env or pass --space[/red]")
+        raise typer.Exit(1)
+    from .session import check_session as run_check
+
+    verdict = run_check(space, force=fresh)
+    color = {True: "green", False: "red", None: "yellow"}[verdict.valid]
+    label = {True: "valid", False: "expired", None: "unknown"}[verdict.valid]
+    rprint(f"[{color}]Session {label}[/{color}]: {verdict.reason}")
+    if verdict.valid is False:
+        raise typer.Exit(2)
 
 @app.command(help="Publish a Markdown file as a Substack draft (or live with --publish).")
 def publish(
     path: Path = typer.Argument(..., help="Path to the Markdown file"),
     space: str | None = typer.Option(None, "--space", "-s", help="Substack subdomain, e.g., nwsldata"),
     live: bool = typer.Option(False, "--publish", help="Publish live (default: create/update draft)"),
+    force: bool = typer.Option(False, "--force", help="Publish even if unchanged since the last run"),
+    block: bool = typer.Option(False, "--block-resources", envvar="SUBSTACK_BLOCK_RESOURCES",
+                               help="Skip fonts, media, remote images and trackers"),
+    relogin: bool = typer.Option(False, "--relogin", help="Log in interactively if the saved session expired"),
+    engine: str | None = typer.Option(None, "--engine", envvar="SUBSTACK_ENGINE",
+                                      help="browser (default) or api: use the draft API, falling back to the editor"),
+    show_profile: bool = typer.Option(False, "--profile", help="Print a per-phase timing breakdown"),
+    trace_out: Path | None = typer.Option(None, "--trace-out", help="Write a Chrome trace JSON here"),
 ) -> None:
     load_env()
     space = normalize_space(space or os.getenv("SUBSTACK_SPACE"))
@@ -88,12 +170,362 @@ def publish(
     if not path.exists():
         rprint(f"[red]File not found:[/red] {path}")
         raise typer.Exit(1)
-    pub = Path(__file__).parent / "publish_to_substack.py"
-    cmd = [sys.executable, str(pub), "--space", space, "--file", str(path)]
-    if live is True:
-        cmd.append("--publish")
-    rprint(f"[cyan]Running:[/cyan] {' '.join(cmd)}")
-    subprocess.check_call(cmd)
+    check_engine(engine)
+    import asyncio
+
+    from .profiling import profile
+    from .publish_to_substack import create_or_update_draft
+    from .session import SessionExpired
+
+    with profile() as prof:
+        try:
+            asyncio.run(create_or_update_draft(
+                space, path, live, login=False, force=force, block_resources=block, relogin=relogin,
+                engine=engine,
+            ))
+        except SessionExpired as e:
+            rprint(f"[red]{e}[/red]")
+            raise typer.Exit(2) from e
+        finally:
+            if show_profile or trace_out:
+                print_profile(prof, trace_out)
+
+@app.command("publish-batch", help="Publish many Markdown files with a single browser.")
+def publish_batch(
+    paths: list[str] = typer.Argument(..., help="Markdown files or glob patterns, e.g. 'docs/*.md'"),
+    space: str | None = typer.Option(None, "--space", "-s", help="Substack subdomain, e.g., nwsldata"),
+    live: bool = typer.Option(False, "--publish", help="Publish live (default: create/update drafts)"),
+    concurrency: int = typer.Option(3, "--concurrency", "-j", min=1, help="Editor pages open at once"),
+    force: bool = typer.Option(False, "--force", help="Publish even posts unchanged since the last run"),
+    block: bool = typer.Option(False, "--block-resources", envvar="SUBSTACK_BLOCK_RESOURCES",
+                               help="Skip fonts, media, remote images and trackers"),
+    relogin: bool = typer.Option(False, "--relogin", help="Log in interactively if the saved session expired"),
+    engine: str | None = typer.Option(None, "--engine", envvar="SUBSTACK_ENGINE",
+                                      help="browser (default) or api: use the draft API, falling back to the editor"),
+    show_profile: bool = typer.Option(False, "--profile", help="Print a per-phase timing breakdown"),
+    trace_out: Path | None = typer.Option(None, "--trace-out", help="Write a Chrome trace JSON here"),
+) -> None:
+    load_env()
+    space = normalize_space(space or os.getenv("SUBSTACK_SPACE"))
+    if not space:
+        rprint("[red]Set SUBSTACK_SPACE in .env or pass --space[/red]")
+        raise typer.Exit(1)
+    files = expand_paths(paths)
+    check_engine(engine)
+    import asyncio
+
+    from rich.table import Table
+
+    from .profiling import profile
+    from .publish_to_substack import publish_batch as run_batch
+    from .session import SessionExpired
+
+    rprint(f"[cyan]Publishing {len(files)} files with concurrency {concurrency}[/cyan]")
+    with profile() as prof:
+        try:
+            results = asyncio.run(run_batch(space, files, live, concurrency, force, block, relogin, engine))
+        except SessionExpired as e:
+            rprint(f"[red]{e}[/red]")
+            raise typer.Exit(2) from e
+        finally:
+            if show_profile or trace_out:
+                print_profile(prof, trace_out)
+    table = Table("result", "post", "time", "error")
+    for r in results:
+        state = "[dim]skipped[/dim]" if r.skipped else "[green]ok[/green]" if r.ok else "[red]failed[/red]"
+        table.add_row(state, str(r.path), f"{r.seconds:.1f}s", r.error or "")
+    rprint(table)
+    failed = sum(not r.ok for r in results)
+    rprint(f"{len(results) - failed}/{len(results)} posts succeeded")
+    if failed:
+        raise typer.Exit(1)
+
+@app.command(help="Queue posts for a worker to publish, optionally at a later time.")
+def enqueue(
+    paths: list[str] = typer.Argument(..., help="Markdown files or glob patterns, e.g. 'docs/*.md'"),
+    space: str | None = typer.Option(None, "--space", "-s", help="Substack subdomain, e.g., nwsldata"),
+    live: bool = typer.Option(False, "--publish", help="Publish live (default: create/update drafts)"),
+    at: str | None = typer.Option(None, "--at", help="Not before this time: ISO date-time (local) or +30m, +2h, +1d"),
+    force: bool = typer.Option(False, "--force", help="Publish even if unchanged since the last run"),
+    engine: str | None = typer.Option(None, "--engine", help="browser or api (default: the worker's SUBSTACK_ENGINE)"),
+    attempts: int = typer.Option(3, "--attempts", min=1, help="Tries before a job is marked failed"),
+    db: Path = typer.Option(Path(".playwright/jobs.sqlite"), "--db", help="Job queue database"),
+) -> None:
+    load_env()
+    space = normalize_space(space or os.getenv("SUBSTACK_SPACE"))
+    if not space:
+        rprint("[red]Set SUBSTACK_SPACE in .env or pass --space[/red]")
+        raise typer.Exit(1)
+    files = expand_paths(paths)
+    check_engine(engine)
+    from .jobs import JobQueue, format_time, parse_when
+
+    try:
+        run_at = parse_when(at) if at else None
+    except ValueError as e:
+        rprint(f"[red]Cannot parse --at {at!r}:[/red] {e}")
+        raise typer.Exit(1) from e
+    with JobQueue(db) as queue:
+        for f in files:
+            job = queue.enqueue(f, space, live, run_at, force, engine, attempts)
+            rprint(f"Queued job {job.id}: {job.path} -> {space} at {format_time(job.run_at)}")
+
+@app.command(help="Run queued publish jobs as they come due, rate-limited per space.")
+def worker(
+    concurrency: int | None = typer.Option(None, "--concurrency", "-j", min=1,
+                                           help="Jobs running at once (default: SUBSTACK_WORKERS or 2)"),
+    rate: float | None = typer.Option(None, "--rate", min=0.01,
+                                      help="Job starts per minute and space, across all workers (default: SUBSTACK_RATE_PER_MIN or 6)"),
+    burst: int | None = typer.Option(None, "--burst", min=1,
+                                     help="Starts a space may make at once (default: SUBSTACK_RATE_BURST or 2)"),
+    drain: bool = typer.Option(False, "--drain", help="Exit once no job is due instead of waiting for scheduled ones"),
+    db: Path = typer.Option(Path(".playwright/jobs.sqlite"), "--db", help="Job queue database"),
+) -> None:
+    load_env()
+    import asyncio
+
+    from .jobs import JobQueue, WorkerSettings, run_worker
+
+    env = WorkerSettings.from_env()
+    settings = WorkerSettings(
+        concurrency=env.concurrency if concurrency is None else concurrency,
+        rate_per_min=env.rate_per_min if rate is None else rate,
+        burst=env.burst if burst is None else burst,
+        poll_s=env.poll_s,
+        retry=env.retry,
+    )
+    rprint(f"[cyan]Worker: {settings.concurrency} at once, {settings.rate_per_min:g}/min per space "
+           f"(burst {settings.burst})[/cyan]")
+    with JobQueue(db) as queue:
+        try:
+            report = asyncio.run(run_worker(queue, settings, drain=drain))
+        except KeyboardInterrupt:
+            rprint("[yellow]Stopped; running jobs are requeued by the next worker[/yellow]")
+            raise typer.Exit(130) from None
+    rprint(f"{len(report.done)} done, {len(report.retried)} retrying, {len(report.failed)} failed "
+           f"in {report.seconds:.1f}s")
+    if report.failed:
+        raise typer.Exit(1)
+
+@app.command(help="Show queued, running and finished publish jobs.")
+def jobs(
+    states: list[str] = typer.Option(None, "--state", help="Only jobs in this state (repeatable)"),
+    space: str | None = typer.Option(None, "--space", "-s", help="Only jobs for this Substack subdomain"),
+    limit: int = typer.Option(50, "--limit", "-n", min=1, help="Show at most this many jobs"),
+    cancel: list[int] = typer.Option(None, "--cancel", help="Cancel this queued job first (repeatable)"),
+    db: Path = typer.Option(Path(".playwright/jobs.sqlite"), "--db", help="Job queue database"),
+) -> None:
+    from rich.markup import escape
+    from rich.table import Table
+
+    from .jobs import STATES, JobQueue, format_time
+
+    unknown = set(states or []) - set(STATES)
+    if unknown:
+        rprint(f"[red]Unknown state {', '.join(sorted(unknown))}; choose from {', '.join(STATES)}[/red]")
+        raise typer.Exit(1)
+    colors = {"queued": "cyan", "running": "yellow", "done": "green", "failed": "red", "cancelled": "dim"}
+    with JobQueue(db) as queue:
+        for job_id in cancel or []:
+            if queue.cancel(job_id):
+                rprint(f"Cancelled job {job_id}")
+            else:
+                rprint(f"[yellow]Job {job_id} is not queued[/yellow]")
+        entries = queue.jobs(states or [], normalize_space(space) if space else None, limit)
+        counts = queue.counts()
+    table = Table("id", "state", "post", "space", "run at", "tries", "started", "time", "error")
+    for j in entries:
+        table.add_row(
+            str(j.id), f"[{colors[j.state]}]{j.state}[/{colors[j.state]}]", j.path, j.space,
+            format_time(j.run_at), f"{j.attempts}/{j.max_attempts}", format_time(j.started_at),
+            f"{j.seconds:.1f}s" if j.seconds is not None else "", escape(j.error or ""),
+        )
+    rprint(table)
+    rprint(", ".join(f"{n} {state}" for state, n in counts.items() if n) or "No jobs")
+
+@app.command(help="List posts as dirty (changed since last publish) or clean.")
+def status(
+    paths: list[str] = typer.Argument(None, help="Markdown files or glob patterns (default: docs/*.md)"),
+) -> None:
+    from rich.table import Table
+
+    from .manifest import PublishManifest
+    from .publish_to_substack import post_digest
+
+    files = expand_paths(paths or ["docs/*.md"])
+    manifest = PublishManifest()
+    table = Table("state", "post", "space", "last run")
+    dirty = 0
+    errors = 0
+    for f in files:
+        entry = manifest.get(f)
+        try:
+            digest = post_digest(f)
+        except (FileNotFoundError, ValueError) as e:
+            table.add_row("[red]error[/red]", str(f), (entry or {}).get("space", ""), str(e))
+            errors += 1
+            continue
+        if entry and entry.get("digest") == digest:
+            state = "[green]clean[/green]"
+        else:
+            state = "[yellow]dirty[/yellow]"
+            dirty += 1
+        last = ""
+        if entry:
+            last = f"{'published' if entry.get('published') else 'draft'} {entry.get('updated_at', '')}"
+        table.add_row(state, str(f), (entry or {}).get("space", ""), last)
+    rprint(table)
+    rprint(f"{dirty} dirty, {len(files) - dirty - errors} clean" + (f", {errors} unreadable" if errors else ""))
+
+@app.command(help="Render posts to HTML ahead of publishing (only changed posts are re-rendered).")
+def build(
+    roots: list[Path] = typer.Argument(None, help="Directories or files to scan (default: docs/ templates/posts/)"),
+    out: Path = typer.Option(Path("build/posts"), "--out", "-o", help="Build directory"),
+    workers: int | None = typer.Option(None, "--workers", "-j", min=1, help="Worker processes (default: CPU count)"),
+    force: bool = typer.Option(False, "--force", help="Re-render every post"),
+) -> None:
+    from .build import DEFAULT_ROOTS
+    from .build import build as run_build
+
+    report = run_build(roots or list(DEFAULT_ROOTS), out, workers, force)
+    for path, err in report.failed.items():
+        rprint(f"[red]failed[/red] {path}: {err}")
+    rprint(f"[green]{len(report.rendered)} rendered[/green], {len(report.reused)} up to date, "
+           f"{len(report.removed)} removed in {report.seconds:.2f}s -> {out}")
+    if report.failed:
+        raise typer.Exit(1)
+
+def _catalog_query(
+    db: Path, refresh: bool, search_text: str | None, tags: list[str] | None,
+    image: str | None, since: str | None, until: str | None, limit: int | None,
+) -> None:
+    """Refresh the catalog if asked, run one query and print the matches."""
+    from rich.markup import escape
+    from rich.table import Table
+
+    from .catalog import HIGHLIGHT, Catalog
+
+    started = time.perf_counter()
+    with Catalog(db) as catalog:
+        if refresh:
+            report = catalog.refresh()
+            for path, err in report.failed.items():
+                rprint(f"[red]cannot index[/red] {path}: {err}")
+        if search_text is None:
+            entries = catalog.list_posts(tags=tags or [], image=image, since=since, until=until, limit=limit)
+        else:
+            entries = catalog.search(
+                search_text, tags=tags or [], image=image, since=since, until=until, limit=limit
+            )
+    table = Table("date", "post", "title", "tags", *(["match"] if search_text else []))
+    for e in entries:
+        row = [e.date or "", e.path, escape(e.title), escape(", ".join(e.tags))]
+        if search_text:
+            snippet = escape(" ".join(e.snippet.split()))
+            row.append(snippet.replace(HIGHLIGHT[0], "[bold yellow]").replace(HIGHLIGHT[1], "[/bold yellow]"))
+        table.add_row(*row)
+    rprint(table)
+    rprint(f"{len(entries)} posts in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+@app.command("list", help="List posts in docs/, templates/posts/ and archive/ by tag, image or date.")
+def list_posts(
+    tags: list[str] = typer.Option(None, "--tag", "-t", help="Only posts with this tag (repeatable)"),
+    image: str | None = typer.Option(None, "--image", help="Only posts referencing an image path containing this"),
+    since: str | None = typer.Option(None, "--since", help="Earliest date, YYYY-MM-DD"),
+    until: str | None = typer.Option(None, "--until", help="Latest date, YYYY-MM-DD"),
+    limit: int | None = typer.Option(None, "--limit", "-n", min=1, help="Show at most this many posts"),
+    refresh: bool = typer.Option(True, "--refresh/--no-refresh", help="Re-index changed files first"),
+    db: Path = typer.Option(Path("build/catalog.sqlite"), "--db", help="Catalog database"),
+) -> None:
+    _catalog_query(db, refresh, None, tags, image, since, until, limit)
+
+@app.command(help="Full-text search over post titles, tags and bodies (end a word with * for prefixes).")
+def search(
+    query: str = typer.Argument(..., help="Words that must all appear, e.g. 'vaep chart'"),
+    tags: list[str] = typer.Option(None, "--tag", "-t", help="Only posts with this tag (repeatable)"),
+    image: str | None = typer.Option(None, "--image", help="Only posts referencing an image path containing this"),
+    since: str | None = typer.Option(None, "--since", help="Earliest date, YYYY-MM-DD"),
+    until: str | None = typer.Option(None, "--until", help="Latest date, YYYY-MM-DD"),
+    limit: int = typer.Option(20, "--limit", "-n", min=1, help="Show at most this many posts"),
+    refresh: bool = typer.Option(True, "--refresh/--no-refresh", help="Re-index changed files first"),
+    db: Path = typer.Option(Path("build/catalog.sqlite"), "--db", help="Catalog database"),
+) -> None:
+    _catalog_query(db, refresh, query, tags, image, since, until, limit)
+
+@app.command(help="List the posts a commit range requires rebuilding and republishing.")
+def changed(
+    rev_range: str = typer.Argument("HEAD^..HEAD", help="Git revision range to diff"),
+    roots: list[Path] = typer.Option(None, "--root", help="Post directories (default: docs/ templates/posts/)"),
+    as_json: bool = typer.Option(False, "--json", help="Print the full plan (posts, figure scripts, notebooks) as JSON"),
+    why: bool = typer.Option(False, "--why", help="Show which changed files pulled each post in"),
+) -> None:
+    import json
+
+    from .build import DEFAULT_ROOTS
+    from .changes import plan_changes
+
+    try:
+        plan = plan_changes(rev_range, roots or list(DEFAULT_ROOTS))
+    except RuntimeError as e:
+        rprint(f"[red]{e}[/red]")
+        raise typer.Exit(1) from e
+    if as_json:
+        print(json.dumps(plan.to_json(), indent=2))
+        return
+    for post in plan.posts:
+        print(post)
+        if why:
+            print("    <- " + ", ".join(plan.reasons[post]), file=sys.stderr)
+
+@daemon_app.command("start", help="Start the browser daemon in the background.")
+def daemon_start(
+    port: int = typer.Option(9333, "--port", help="Local remote-debugging port"),
+    idle_timeout: float = typer.Option(1800, "--idle-timeout", help="Seconds without open pages before exiting"),
+    foreground: bool = typer.Option(False, "--foreground", help="Run in this terminal instead of detaching"),
+) -> None:
+    from . import daemon
+
+    if daemon.endpoint():
+        rprint(f"[yellow]Daemon already running:[/yellow] {daemon.endpoint()}")
+        return
+    cmd = [sys.executable, "-m", "tools.substack.daemon", "--port", str(port), "--idle-timeout", str(idle_timeout)]
+    if foreground:
+        subprocess.check_call(cmd)
+        return
+    log_path = daemon.DAEMON_STATE_PATH.with_suffix(".log")
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with log_path.open("ab") as log:
+        subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if daemon.endpoint():
+            rprint(f"[green]Daemon ready:[/green] {daemon.endpoint()} (log: {log_path})")
+            return
+        time.sleep(0.2)
+    rprint(f"[red]Daemon did not come up; see {log_path}[/red]")
+    raise typer.Exit(1)
+
+@daemon_app.command("stop", help="Stop the browser daemon.")
+def daemon_stop() -> None:
+    from . import daemon
+
+    if daemon.stop_daemon():
+        rprint("[green]Daemon stopping[/green]")
+    else:
+        rprint("[yellow]No daemon running[/yellow]")
+
+@daemon_app.command("status", help="Health-check the browser daemon.")
+def daemon_status() -> None:
+    from . import daemon
+
+    state = daemon.read_state()
+    info = daemon.health(state)
+    if state is None or info is None:
+        rprint("[yellow]Daemon not running; publish will launch Chromium itself[/yellow]")
+        raise typer.Exit(1)
+    uptime = time.time() - float(state.get("started_at", time.time()))
+    rprint(f"[green]Daemon healthy[/green] pid={state['pid']} port={state['port']} "
+           f"uptime={uptime:.0f}s browser={info.get('Browser', '?')}")
 
 if __name__ == "__main__":
     app()
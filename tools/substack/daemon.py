@@ -0,0 +1,148 @@
+"""Warm Chromium daemon that publishing runs attach to over CDP.
+
+``python -m tools.substack.daemon`` launches one headless Chromium with a
+local remote-debugging port and records it in ``.playwright/daemon.json``.
+Publishing runs connect to it with ``connect_over_cdp`` and open their own
+context (loaded from the saved session) instead of cold-starting a browser.
+The daemon exits after a period with no open pages or on SIGTERM/SIGINT.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+from pathlib import Path
+from typing import Any
+
+from .logger import setup_logger
+
+logger = setup_logger(__name__)
+
+DAEMON_STATE_PATH = Path(".playwright") / "daemon.json"
+DEFAULT_PORT = 9333
+DEFAULT_IDLE_TIMEOUT = 30 * 60.0
+
+
+def _get_json(url: str, timeout: float) -> Any:
+    import urllib.request
+
+    with urllib.request.urlopen(url, timeout=timeout) as resp:
+        return json.load(resp)
+
+
+def read_state(path: Path = DAEMON_STATE_PATH) -> dict[str, Any] | None:
+    """Return the recorded daemon state, or None if no daemon was started."""
+    try:
+        state = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    return state if isinstance(state, dict) else None
+
+
+def health(state: dict[str, Any] | None, timeout: float = 0.5) -> dict[str, Any] | None:
+    """Ask the daemon's browser for its version info; None if it is not answering."""
+    if not state:
+        return None
+    try:
+        info = _get_json(f"http://127.0.0.1:{state['port']}/json/version", timeout)
+    except (OSError, ValueError, KeyError):
+        return None
+    return info if isinstance(info, dict) else None
+
+
+def endpoint(path: Path = DAEMON_STATE_PATH) -> str | None:
+    """Return the CDP endpoint of a healthy daemon, or None if none is running."""
+    state = read_state(path)
+    if state is None or health(state) is None:
+        return None
+    return f"http://127.0.0.1:{state['port']}"
+
+
+def _open_pages(port: int) -> int:
+    try:
+        targets = _get_json(f"http://127.0.0.1:{port}/json/list", timeout=2.0)
+    except (OSError, ValueError):
+        return 0
+    return sum(1 for t in targets if t.get("type") == "page")
+
+
+async def serve(
+    port: int = DEFAULT_PORT,
+    idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    poll_interval: float = 5.0,
+    state_path: Path = DAEMON_STATE_PATH,
+) -> None:
+    """Run the browser daemon until it is idle for ``idle_timeout`` seconds or signalled.
+
+    Args:
+        port: Local remote-debugging port to listen on
+        idle_timeout: Seconds without any open page before shutting down
+        poll_interval: Seconds between idle checks
+        state_path: Where to record pid and port for clients
+    """
+    from playwright.async_api import async_playwright
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(
+            headless=True,
+            args=[f"--remote-debugging-port={port}", "--remote-debugging-address=127.0.0.1"],
+        )
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+        state_path.write_text(json.dumps({"pid": os.getpid(), "port": port, "started_at": time.time()}))
+        logger.info(f"Browser daemon listening on 127.0.0.1:{port} (idle timeout {idle_timeout:.0f}s)")
+        idle_since = time.monotonic()
+        try:
+            while not stop.is_set():
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                if _open_pages(port):
+                    idle_since = time.monotonic()
+                elif time.monotonic() - idle_since >= idle_timeout:
+                    logger.info("Browser daemon idle; shutting down")
+                    break
+        finally:
+            state_path.unlink(missing_ok=True)
+            await browser.close()
+
+
+def stop_daemon(path: Path = DAEMON_STATE_PATH) -> bool:
+    """Signal a running daemon to shut down; returns False if none was running.
+
+    The recorded pid is only signalled while the daemon's browser answers on
+    the recorded port. After a crash the pid may belong to an unrelated
+    process, so a state file without a healthy browser is removed instead.
+    """
+    state = read_state(path)
+    if not state:
+        return False
+    if health(state) is None:
+        logger.info(f"Daemon recorded in {path} is not answering; removing stale state")
+        path.unlink(missing_ok=True)
+        return False
+    try:
+        os.kill(int(state["pid"]), signal.SIGTERM)
+    except (ProcessLookupError, PermissionError, KeyError, ValueError):
+        path.unlink(missing_ok=True)
+        return False
+    return True
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Keep a warm Chromium for publishing runs")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT, help="Local remote-debugging port")
+    ap.add_argument("--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT,
+                    help="Seconds without open pages before exiting")
+    args = ap.parse_args()
+    asyncio.run(serve(args.port, args.idle_timeout))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Resolve editor selector candidates in a single page round trip."""
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING
+
+from .logger import setup_logger
+from .space_cache import SpaceCache
+
+if TYPE_CHECKING:
+    from playwright.async_api import Page
+
+logger = setup_logger(__name__)
+
+# Any of these being present suggests editor is mounted.
+EDITOR_PROBES = [
+    '[data-testid="post-title"]',
+    '[data-testid="post-body"]',
+    'div[contenteditable="true"]',
+    'textarea[placeholder*="Title"]',
+    '[placeholder*="Title"]',
+    '[role="textbox"]',
+]
+
+FIELD_CANDIDATES: dict[str, list[str]] = {
+    "title": [
+        '[data-testid="post-title"]',
+        'textarea[placeholder*="Title"]',
+        '[placeholder*="Title"]',
+        # some editors use the first contenteditable as Title
+        'div[contenteditable="true"] >> nth=0',
+        # generic textbox (first)
+        '[role="textbox"] >> nth=0',
+    ],
+    "body": [
+        '[data-testid="post-body"]',
+        # second contenteditable often is body
+        'div[contenteditable="true"] >> nth=1',
+        # fallback: last contenteditable
+        'div[contenteditable="true"] >> nth=-1',
+        # generic textbox (second)
+        '[role="textbox"] >> nth=1',
+    ],
+}
+
+NTH_RE = re.compile(r"^(?P<css>.*?)\s*>>\s*nth=(?P<nth>-?\d+)\s*$")
+
+# Takes [[css, nth|null], ...] and reports which entries match.
+_RESOLVE_JS = """specs => specs.map(([css, nth]) => {
+    let n;
+    try { n = document.querySelectorAll(css).length; } catch (e) { return false; }
+    if (nth === null) return n > 0;
+    return nth >= 0 ? n > nth : n >= -nth;
+})"""
+
+
+def split_selector(selector: str) -> tuple[str, int | None]:
+    """Split a ``css >> nth=K`` selector into its CSS part and index."""
+    m = NTH_RE.match(selector)
+    if not m:
+        return selector, None
+    return m.group("css"), int(m.group("nth"))
+
+
+async def resolve_selectors(page: Page, candidates: list[str]) -> list[str]:
+    """Return the candidates that match on the page, in candidate order.
+
+    All candidates are checked by one in-page evaluation instead of one
+    ``locator.count()`` round trip each. Candidates may use Playwright's
+    ``>> nth=K`` suffix; other Playwright-only syntax never matches.
+
+    Args:
+        page: Playwright page object
+        candidates: Selectors to check
+
+    Returns:
+        The matching subset of candidates
+    """
+    specs = [list(split_selector(c)) for c in candidates]
+    matched = await page.evaluate(_RESOLVE_JS, specs)
+    return [c for c, ok in zip(candidates, matched, strict=True) if ok]
+
+
+async def resolve_fields(
+    page: Page,
+    space: str | None = None,
+    cache: SpaceCache | None = None,
+) -> dict[str, str | None]:
+    """Pick a selector for each editor field (title, body) in one round trip.
+
+    Selectors that won last time for this space are tried first. A cached
+    selector that no longer matches is dropped and the full candidate list
+    decides instead; the new winners are written back to the cache.
+
+    Args:
+        page: Playwright page object on the editor
+        space: Substack subdomain used as the cache key
+        cache: Selector cache; caching is skipped when None
+
+    Returns:
+        Mapping of field name to winning selector (None if nothing matched)
+    """
+    cached: dict[str, str] = {}
+    if cache is not None and space:
+        cached = cache.get(space, "selectors") or {}
+
+    ordered: dict[str, list[str]] = {}
+    for field, candidates in FIELD_CANDIDATES.items():
+        hint = cached.get(field)
+        ordered[field] = ([hint] if hint else []) + [c for c in candidates if c != hint]
+    everything = list(dict.fromkeys(c for cands in ordered.values() for c in cands))
+    matched = set(await resolve_selectors(page, everything))
+
+    result: dict[str, str | None] = {}
+    for field, candidates in ordered.items():
+        hint = cached.get(field)
+        if hint and hint not in matched:
+            logger.info(f"Cached {field} selector no longer matches, re-probing: {hint}")
+        result[field] = next((c for c in candidates if c in matched), None)
+
+    if cache is not None and space:
+        winners = {f: sel for f, sel in result.items() if sel}
+        if winners:
+            cache.set(space, "selectors", winners)
+        else:
+            cache.forget(space, "selectors")
+    return result
@@ -0,0 +1,265 @@
+"""Pre-upload image optimization with a content-addressed derivative cache.
+
+Images wider than Substack ever displays are downscaled and re-encoded to
+fit a byte budget. Results are stored under a key derived from the source
+bytes and the settings, so republishing an unchanged post reuses them.
+Pillow is optional; without it images are uploaded as-is.
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .logger import setup_logger
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = setup_logger(__name__)
+
+IMAGE_CACHE_DIR = Path(".playwright") / "image_cache"
+# Written next to generated figures by scripts/figures.py.
+FIGURE_MANIFEST = ".figures.json"
+RASTER_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".bmp", ".tif", ".tiff"}
+_EXTENSIONS = {"png": ".png", "webp": ".webp", "jpeg": ".jpg"}
+_LOSSY = ("webp", "jpeg")
+# A thumbnail of a chart has far fewer distinct colours than one of a photo.
+_PHOTO_COLORS = 4096
+
+
+@dataclass(frozen=True)
+class ImageSettings:
+    """How images are prepared for upload.
+
+    Args:
+        max_width: Images wider than this (in pixels) are downscaled
+        byte_budget: Target maximum size of each uploaded file
+        formats: Output formats to try, in order of preference (png, webp, jpeg);
+            photographic sources try the lossy ones first
+        quality: Starting quality for lossy formats
+        min_quality: Lowest quality tried before giving up on the budget
+    """
+
+    max_width: int = 1456
+    byte_budget: int = 400_000
+    formats: tuple[str, ...] = ("png", "webp")
+    quality: int = 85
+    min_quality: int = 50
+    enabled: bool = field(default=True, compare=False)
+
+    @classmethod
+    def from_env(cls) -> "ImageSettings":
+        """Build settings from SUBSTACK_IMAGE_* env vars, falling back to defaults."""
+        d = cls()
+        formats = os.getenv("SUBSTACK_IMAGE_FORMATS")
+        return cls(
+            max_width=int(os.getenv("SUBSTACK_IMAGE_MAX_WIDTH", d.max_width)),
+            byte_budget=int(os.getenv("SUBSTACK_IMAGE_BUDGET_KB", d.byte_budget // 1000)) * 1000,
+            formats=tuple(f.strip().lower() for f in formats.split(",") if f.strip()) if formats else d.formats,
+            quality=int(os.getenv("SUBSTACK_IMAGE_QUALITY", d.quality)),
+            min_quality=int(os.getenv("SUBSTACK_IMAGE_MIN_QUALITY", d.min_quality)),
+            enabled=os.getenv("SUBSTACK_OPTIMIZE_IMAGES", "1").lower() not in ("0", "false", "no"),
+        )
+
+    def cache_key(self, source_digest: str) -> str:
+        """Return the derivative cache key for a source file digest."""
+        payload = json.dumps({"src": source_digest, **asdict(self)}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+
+
+@dataclass
+class OptimizedImage:
+    """A file ready to upload and how it compares with its source."""
+
+    source: Path
+    path: Path
+    source_bytes: int
+    bytes: int
+    cached: bool = False
+
+    @property
+    def saved_ratio(self) -> float:
+        """Fraction of the source size that was saved."""
+        return 1 - self.bytes / self.source_bytes if self.source_bytes else 0.0
+
+
+def resolve_figure(path: Path) -> Path:
+    """Return the file actually exported for a generated figure reference.
+
+    The figure exporter keeps the name a post references (``chart.png``) but
+    may write the figure as ``chart.svg`` or ``chart.webp``; its manifest in
+    the same directory records which. Paths without an entry come back as-is.
+    """
+    try:
+        entry = json.loads((path.parent / FIGURE_MANIFEST).read_text()).get(path.name)
+    except (OSError, ValueError):
+        return path
+    if isinstance(entry, dict) and entry.get("file"):
+        chosen = path.parent / str(entry["file"])
+        if chosen.exists():
+            return chosen
+    return path
+
+
+def _file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _is_photographic(img: "Image.Image", source_format: str | None) -> bool:
+    """Guess whether ``img`` is a photo, which PNG quantization would posterize."""
+    if source_format == "JPEG":
+        return True
+    thumb = img.convert("RGB")
+    thumb.thumbnail((256, 256))
+    return thumb.getcolors(maxcolors=_PHOTO_COLORS) is None
+
+
+def _encode(img: "Image.Image", fmt: str, settings: ImageSettings) -> bytes:
+    """Encode ``img`` as ``fmt``, lowering quality until it fits the budget."""
+    from PIL import Image
+
+    if fmt == "png":
+        buf = io.BytesIO()
+        quantized = img.convert("RGBA").quantize(colors=256, method=Image.Quantize.FASTOCTREE)
+        quantized.save(buf, format="PNG", optimize=True)
+        return buf.getvalue()
+
+    if fmt == "jpeg" and img.mode in ("RGBA", "LA", "P"):
+        rgba = img.convert("RGBA")
+        flat = Image.new("RGB", rgba.size, "white")
+        flat.paste(rgba, mask=rgba.getchannel("A"))
+        img = flat
+    data = b""
+    for quality in range(settings.quality, settings.min_quality - 1, -10):
+        buf = io.BytesIO()
+        img.save(buf, format=fmt.upper(), quality=quality, optimize=True)
+        data = buf.getvalue()
+        if len(data) <= settings.byte_budget:
+            break
+    return data
+
+
+def optimize_image(
+    src: Path,
+    settings: ImageSettings | None = None,
+    cache_dir: Path = IMAGE_CACHE_DIR,
+) -> OptimizedImage:
+    """Return an upload-ready version of ``src``, reusing a cached derivative.
+
+    Formats are tried in preference order, lossy ones first for photographs,
+    and the first encoding within the byte budget wins; if none fits, the
+    smallest one is used. The source is kept when it is already narrow
+    enough and smaller than every candidate.
+
+    Args:
+        src: Local image file
+        settings: Optimization settings (defaults from the environment)
+        cache_dir: Directory holding optimized derivatives
+
+    Returns:
+        The file to upload together with before/after sizes
+    """
+    settings = settings or ImageSettings.from_env()
+    source_bytes = src.stat().st_size
+    unchanged = OptimizedImage(src, src, source_bytes, source_bytes)
+    if not settings.enabled or src.suffix.lower() not in RASTER_SUFFIXES:
+        return unchanged
+    try:
+        from PIL import Image
+    except ImportError:
+        logger.warning("Pillow is not installed; uploading images without optimization")
+        return unchanged
+
+    key_dir = cache_dir / settings.cache_key(_file_digest(src))
+    if key_dir.is_dir():
+        # Files only get their final name once fully written (see _write_atomic).
+        for hit in key_dir.iterdir():
+            if not hit.name.startswith("."):
+                return OptimizedImage(src, hit, source_bytes, hit.stat().st_size, cached=True)
+
+    with Image.open(src) as opened:
+        if getattr(opened, "is_animated", False):
+            return unchanged
+        img = opened.copy()
+        source_format = opened.format
+    source_width = img.width
+    formats = settings.formats
+    if _is_photographic(img, source_format):
+        formats = tuple(sorted(formats, key=lambda f: f not in _LOSSY))
+    if img.width > settings.max_width:
+        height = round(img.height * settings.max_width / img.width)
+        img = img.resize((settings.max_width, height), Image.Resampling.LANCZOS)
+
+    best: tuple[str, bytes] | None = None
+    for fmt in formats:
+        if fmt not in _EXTENSIONS:
+            logger.warning(f"Unsupported image format {fmt!r}; skipping")
+            continue
+        data = _encode(img, fmt, settings)
+        if best is None or len(data) < len(best[1]):
+            best = (fmt, data)
+        if len(data) <= settings.byte_budget:
+            best = (fmt, data)
+            break
+
+    if best is None or (img.width == source_width and len(best[1]) >= source_bytes):
+        out = _write_atomic(key_dir / src.name, src.read_bytes())
+    else:
+        out = _write_atomic(key_dir / (src.stem + _EXTENSIONS[best[0]]), best[1])
+    return OptimizedImage(src, out, source_bytes, out.stat().st_size)
+
+
+def _write_atomic(path: Path, data: bytes) -> Path:
+    """Write ``data`` to a hidden temp file beside ``path`` and move it into place.
+
+    An interrupted or concurrent write never leaves a truncated file under
+    the final name, so a cache lookup only ever finds complete images.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return path
+
+
+def optimize_images(
+    assets: list[Path],
+    settings: ImageSettings | None = None,
+    cache_dir: Path = IMAGE_CACHE_DIR,
+) -> list[OptimizedImage]:
+    """Optimize every image of a post and log before/after sizes.
+
+    Args:
+        assets: Local image files, in upload order
+        settings: Optimization settings (defaults from the environment)
+        cache_dir: Directory holding optimized derivatives
+
+    Returns:
+        One OptimizedImage per asset, in the same order
+    """
+    settings = settings or ImageSettings.from_env()
+    results = [optimize_image(a, settings, cache_dir) for a in assets]
+    for r in results:
+        if r.path != r.source:
+            logger.info(
+                f"Image {r.source.name}: {r.source_bytes / 1024:.0f} KiB -> {r.bytes / 1024:.0f} KiB "
+                f"({r.path.suffix.lstrip('.')}{', cached' if r.cached else ''})"
+            )
+    if results:
+        before = sum(r.source_bytes for r in results)
+        after = sum(r.bytes for r in results)
+        logger.info(f"Images: {before / 1024:.0f} KiB -> {after / 1024:.0f} KiB to upload")
+    return results
@@ -0,0 +1,258 @@
+"""Chunked, verified insertion of rendered HTML into the editor body.
+
+The HTML is handed to the page as an evaluate argument rather than spliced
+into script source. Large bodies are split at section boundaries into
+chunks that are pasted one after another, and the editor's text length and
+block count are checked against the source once every chunk has landed.
+"""
+from __future__ import annotations
+
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from itertools import pairwise
+from typing import TYPE_CHECKING
+
+from .logger import setup_logger
+from .profiling import span
+from .waits import expect_mutation
+
+if TYPE_CHECKING:
+    from playwright.async_api import Locator, Page
+
+logger = setup_logger(__name__)
+
+INSERT_MODES = ("clipboard", "event")
+_VOID_TAGS = frozenset({"area", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"})
+_SECTION_RE = re.compile(r"\s*<h[1-3][\s>]", re.IGNORECASE)
+
+# Non-whitespace character count and top-level block count of the editor
+# and, when given, of the source HTML as the browser parses it.
+_MEASURE_JS = r"""(el, html) => {
+    const count = root => ({ text: root.textContent.replace(/\s+/g, "").length, blocks: root.children.length });
+    const source = html === null ? null : count(new DOMParser().parseFromString(html, "text/html").body);
+    return { editor: count(el), source };
+}"""
+_SETTLED_JS = r"""([el, text, blocks]) =>
+    el.textContent.replace(/\s+/g, "").length >= text && el.children.length >= blocks"""
+_CARET_END_JS = """el => {
+    el.focus();
+    const range = document.createRange();
+    range.selectNodeContents(el);
+    range.collapse(false);
+    const sel = getSelection();
+    sel.removeAllRanges();
+    sel.addRange(range);
+}"""
+# A synthetic paste: the editor's own paste handler converts the HTML, but
+# the system clipboard is never touched.
+_PASTE_EVENT_JS = """(el, html) => {
+    const data = new DataTransfer();
+    data.setData("text/html", html);
+    data.setData("text/plain", new DOMParser().parseFromString(html, "text/html").body.textContent);
+    el.dispatchEvent(new ClipboardEvent("paste", { clipboardData: data, bubbles: true, cancelable: true }));
+}"""
+_CLIPBOARD_WRITE_JS = """async html => {
+    const text = new DOMParser().parseFromString(html, "text/html").body.textContent;
+    await navigator.clipboard.write([new ClipboardItem({
+        "text/html": new Blob([html], { type: "text/html" }),
+        "text/plain": new Blob([text], { type: "text/plain" }),
+    })]);
+}"""
+
+
+@dataclass(frozen=True)
+class InsertSettings:
+    """How the post body is put into the editor.
+
+    Args:
+        mode: "clipboard" writes each chunk to the clipboard and presses paste;
+            "event" dispatches a synthetic paste event and needs no clipboard
+        chunk_chars: Bodies longer than this are inserted in section-sized chunks
+        verify: Check text length and block count after insertion
+        tolerance: Fraction by which the editor may fall short of the source
+    """
+
+    mode: str = "clipboard"
+    chunk_chars: int = 64_000
+    verify: bool = True
+    tolerance: float = 0.02
+
+    @classmethod
+    def from_env(cls) -> InsertSettings:
+        """Build settings from SUBSTACK_INSERT_* env vars, falling back to defaults."""
+        d = cls()
+        mode = os.getenv("SUBSTACK_INSERT_MODE", d.mode).strip().lower()
+        if mode not in INSERT_MODES:
+            raise ValueError(f"SUBSTACK_INSERT_MODE must be one of {', '.join(INSERT_MODES)}, got {mode!r}")
+        return cls(
+            mode=mode,
+            chunk_chars=int(os.getenv("SUBSTACK_INSERT_CHUNK_KB", d.chunk_chars // 1000)) * 1000,
+            verify=os.getenv("SUBSTACK_INSERT_VERIFY", "1").lower() not in ("0", "false", "no"),
+        )
+
+    @property
+    def uses_clipboard(self) -> bool:
+        """Whether insertion goes through the browser-wide clipboard."""
+        return self.mode == "clipboard"
+
+
+class InsertionMismatch(RuntimeError):
+    """Raised when the editor holds less of the body than was inserted."""
+
+    def __init__(self, expected: dict[str, int], actual: dict[str, int]) -> None:
+        super().__init__(
+            f"Editor body does not match the source: {actual['text']} of {expected['text']} characters, "
+            f"{actual['blocks']} of {expected['blocks']} blocks"
+        )
+        self.expected = expected
+        self.actual = actual
+
+
+class _BlockStarts(HTMLParser):
+    """Collect the offsets at which top-level elements start."""
+
+    def __init__(self, html: str) -> None:
+        super().__init__(convert_charrefs=False)
+        self.depth = 0
+        self.starts: list[int] = []
+        # getpos() counts lines by "\n" only, so map them back the same way.
+        self._line_offsets = [0, *(m.end() for m in re.finditer("\n", html))]
+        self.feed(html)
+        self.close()
+
+    def _offset(self) -> int:
+        line, col = self.getpos()
+        return self._line_offsets[line - 1] + col
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if self.depth == 0:
+            self.starts.append(self._offset())
+        if tag not in _VOID_TAGS:
+            self.depth += 1
+
+    def handle_startendtag(self, tag: str, attrs: list) -> None:
+        if self.depth == 0:
+            self.starts.append(self._offset())
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag not in _VOID_TAGS:
+            self.depth = max(0, self.depth - 1)
+
+
+def split_blocks(html: str) -> list[str]:
+    """Split HTML into its top-level elements; joining them gives back ``html``."""
+    starts = _BlockStarts(html).starts
+    if not starts:
+        return [html] if html else []
+    bounds = [0, *starts[1:], len(html)]
+    return [html[a:b] for a, b in pairwise(bounds)]
+
+
+def split_chunks(html: str, max_chars: int) -> list[str]:
+    """Split HTML into chunks of at most ``max_chars``, preferring section breaks.
+
+    Sections start at top-level ``h1``-``h3`` headings. A section that does
+    not fit is split between its blocks; a single block larger than
+    ``max_chars`` (a huge table) is kept whole. Joining the chunks gives back
+    ``html``.
+    """
+    if len(html) <= max_chars:
+        return [html]
+    sections: list[list[str]] = []
+    for block in split_blocks(html):
+        if not sections or _SECTION_RE.match(block):
+            sections.append([])
+        sections[-1].append(block)
+    pieces: list[str] = []
+    for blocks in sections:
+        section = "".join(blocks)
+        pieces.extend([section] if len(section) <= max_chars else blocks)
+    chunks: list[str] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) > max_chars:
+            chunks.append(current)
+            current = ""
+        current += piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def _paste_chunk(page: Page, body: Locator, chunk: str, settings: InsertSettings) -> None:
+    if settings.uses_clipboard:
+        await page.evaluate(_CLIPBOARD_WRITE_JS, chunk)
+        await body.evaluate(_CARET_END_JS)
+        await page.keyboard.press(f"{'Meta' if sys.platform == 'darwin' else 'Control'}+V")
+    else:
+        await body.evaluate(_CARET_END_JS)
+        await body.evaluate(_PASTE_EVENT_JS, chunk)
+
+
+async def insert_body(
+    page: Page,
+    body: Locator,
+    html: str,
+    settings: InsertSettings,
+    timeout_ms: float,
+) -> int:
+    """Paste ``html`` at the end of the editor body, chunk by chunk, and verify it.
+
+    Args:
+        page: Playwright page object
+        body: The editor body element
+        html: Rendered post HTML
+        settings: Insertion mode, chunk size and verification settings
+        timeout_ms: Time allowed for each chunk to show up, and for the
+            body to settle before verification fails
+
+    Returns:
+        Number of chunks inserted
+
+    Raises:
+        WaitTimeout: If the editor does not react to a chunk in time
+        InsertionMismatch: If the editor ends up with less text or fewer blocks than the source
+    """
+    from playwright.async_api import TimeoutError as PWTimeout
+
+    chunks = split_chunks(html, settings.chunk_chars)
+    before = await body.evaluate(_MEASURE_JS, html if settings.verify else None)
+    total = len(html)
+    done = 0
+    started = time.perf_counter()
+    for i, chunk in enumerate(chunks, 1):
+        with span("paste_chunk", index=i, chars=len(chunk)):
+            async with expect_mutation(page, body, f"paste chunk {i}/{len(chunks)}", timeout_ms):
+                await _paste_chunk(page, body, chunk, settings)
+        done += len(chunk)
+        if len(chunks) > 1:
+            logger.info(f"Inserted chunk {i}/{len(chunks)}: {done / 1000:.0f}/{total / 1000:.0f} KB "
+                        f"({done / total:.0%}) in {time.perf_counter() - started:.1f}s")
+    if not settings.verify:
+        return len(chunks)
+
+    # An editor without text may hold an empty placeholder paragraph that the
+    # paste replaces, so it does not count towards the expected blocks.
+    base = before["editor"] if before["editor"]["text"] else {"text": 0, "blocks": 0}
+    keep = 1 - settings.tolerance
+    expected = {
+        "text": base["text"] + int(before["source"]["text"] * keep),
+        "blocks": base["blocks"] + int(before["source"]["blocks"] * keep),
+    }
+    with span("verify_body", **expected):
+        handle = await body.element_handle()
+        try:
+            await page.wait_for_function(
+                _SETTLED_JS, arg=[handle, expected["text"], expected["blocks"]], polling="raf", timeout=timeout_ms
+            )
+        except PWTimeout as e:
+            after = (await body.evaluate(_MEASURE_JS, None))["editor"]
+            raise InsertionMismatch(expected, after) from e
+        finally:
+            await handle.dispose()
+    logger.info(f"Verified body: >= {expected['text']} characters and {expected['blocks']} blocks")
+    return len(chunks)
@@ -0,0 +1,506 @@
+"""Persistent publish queue with scheduled releases and rate-limited workers.
+
+``enqueue`` adds posts to a SQLite queue in ``.playwright/jobs.sqlite``,
+optionally not before a given time. A worker claims due jobs atomically,
+runs up to ``concurrency`` of them at once and takes a token from the
+space's bucket with each claim, so a burst of posts stays under Substack's
+throttling. The buckets live in the same database and are updated in the
+claim's transaction, so several worker processes sharing one queue also
+share each space's budget; a post with a job already running is not
+claimed again until it finishes. A
+failed job goes back to the queue with exponential backoff until its
+attempts run out. Every job keeps its state, attempts, last error and
+timings for ``jobs`` to show.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+import socket
+import sqlite3
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from .logger import setup_logger
+from .manifest import post_key
+from .retry import RetryPolicy
+from .session import SessionExpired
+
+logger = setup_logger(__name__)
+
+JOBS_PATH = Path(".playwright") / "jobs.sqlite"
+# Bump when the schema changes; the queue is recreated.
+SCHEMA_VERSION = 1
+STATES = ("queued", "running", "done", "failed", "cancelled")
+# A job still "running" after this long belonged to a worker that died.
+STALE_AFTER_S = 3600.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    space TEXT NOT NULL,
+    publish INTEGER NOT NULL,
+    force INTEGER NOT NULL,
+    engine TEXT,
+    state TEXT NOT NULL,
+    run_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    seconds REAL,
+    error TEXT,
+    worker TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (state, run_at);
+CREATE TABLE IF NOT EXISTS buckets (
+    space TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    at REAL NOT NULL
+);
+"""
+
+_RELATIVE_RE = re.compile(r"\+(\d+(?:\.\d+)?)([smhd])")
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_when(text: str, now: float | None = None) -> float:
+    """Return the Unix time for ``--at``: an ISO date-time or an offset like ``+30m``.
+
+    Date-times without an offset are local time.
+
+    Raises:
+        ValueError: If ``text`` is neither an offset nor an ISO date-time
+    """
+    now = time.time() if now is None else now
+    if m := _RELATIVE_RE.fullmatch(text.strip()):
+        return now + float(m.group(1)) * _UNITS[m.group(2)]
+    dt = datetime.fromisoformat(text.strip().replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.astimezone()
+    return dt.timestamp()
+
+
+@dataclass
+class Job:
+    """One queued publish and its history."""
+
+    id: int
+    path: str
+    space: str
+    publish: bool
+    force: bool
+    engine: str | None
+    state: str
+    run_at: float
+    attempts: int
+    max_attempts: int
+    created_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
+    seconds: float | None = None
+    error: str | None = None
+    worker: str | None = None
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> Job:
+        data: dict[str, Any] = dict(row)
+        data["publish"], data["force"] = bool(data["publish"]), bool(data["force"])
+        return cls(**data)
+
+
+@dataclass
+class TokenBucket:
+    """Allows ``burst`` starts at once, refilled at ``rate_per_min``.
+
+    The state (``tokens`` left at Unix time ``at``) is stored per space in
+    the queue database, so every worker draws from the same budget.
+    """
+
+    rate_per_min: float
+    burst: int
+    tokens: float
+    at: float
+
+    def _refill(self, now: float) -> None:
+        if now > self.at:
+            self.tokens = min(self.burst, self.tokens + (now - self.at) * self.rate_per_min / 60)
+            self.at = now
+
+    def ready(self, now: float) -> bool:
+        """Return True if a token is available at ``now``."""
+        self._refill(now)
+        return self.tokens >= 1
+
+    def take(self, now: float) -> bool:
+        """Take a token if one is available at ``now``."""
+        if not self.ready(now):
+            return False
+        self.tokens -= 1
+        return True
+
+    def wait_s(self, now: float) -> float:
+        """Seconds from ``now`` until the next token."""
+        if self.ready(now):
+            return 0.0
+        return (1 - self.tokens) * 60 / self.rate_per_min if self.rate_per_min > 0 else float("inf")
+
+
+class JobQueue:
+    """Publish jobs stored in SQLite.
+
+    Args:
+        path: Database file (created on first use)
+    """
+
+    def __init__(self, path: Path = JOBS_PATH) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit; claims take the write lock explicitly with BEGIN IMMEDIATE.
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode = WAL")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.db.execute("DROP TABLE IF EXISTS jobs")
+            self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.db.executescript(SCHEMA)
+
+    def __enter__(self) -> JobQueue:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self.db.close()
+
+    def get(self, job_id: int) -> Job | None:
+        """Return a job by id."""
+        row = self.db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_row(row) if row else None
+
+    def enqueue(
+        self,
+        md_path: Path,
+        space: str,
+        publish: bool,
+        run_at: float | None = None,
+        force: bool = False,
+        engine: str | None = None,
+        max_attempts: int = 3,
+    ) -> Job:
+        """Add a post to the queue.
+
+        Args:
+            md_path: Post to publish (stored relative to the working directory)
+            space: Normalized Substack subdomain
+            publish: Publish live instead of saving a draft
+            run_at: Unix time before which the job is not started (default: now)
+            force: Publish even if unchanged since the last run
+            engine: Publish engine for this job (default: the worker's SUBSTACK_ENGINE)
+            max_attempts: Tries before the job is marked failed
+
+        Returns:
+            The queued job
+        """
+        now = time.time()
+        cur = self.db.execute(
+            "INSERT INTO jobs (path, space, publish, force, engine, state, run_at, max_attempts, created_at) "
+            "VALUES (?, ?, ?, ?, ?, 'queued', ?, ?, ?)",
+            (post_key(md_path), space, int(publish), int(force), engine, run_at or now, max(1, max_attempts), now),
+        )
+        job = self.get(cur.lastrowid or 0)
+        assert job is not None
+        return job
+
+    def _bucket(self, space: str, rate_per_min: float, burst: int, now: float) -> TokenBucket:
+        row = self.db.execute("SELECT tokens, at FROM buckets WHERE space = ?", (space,)).fetchone()
+        if row is None:
+            return TokenBucket(rate_per_min, burst, float(burst), now)
+        return TokenBucket(rate_per_min, burst, min(float(burst), row["tokens"]), row["at"])
+
+    def _due(self, now: float) -> list[sqlite3.Row]:
+        """Queued jobs that are due and whose post has no job running, earliest first."""
+        return self.db.execute(
+            "SELECT id, space FROM jobs WHERE state = 'queued' AND run_at <= ? "
+            "AND path NOT IN (SELECT path FROM jobs WHERE state = 'running') ORDER BY run_at, id",
+            (now,),
+        ).fetchall()
+
+    def claim(
+        self, worker: str, now: float | None = None, rate_per_min: float | None = None, burst: int = 1
+    ) -> Job | None:
+        """Atomically mark the earliest claimable job as running and return it.
+
+        A job is claimable when it is due, no job for the same post is
+        running, and (with ``rate_per_min``) its space's bucket has a token,
+        which the claim takes in the same transaction.
+
+        Args:
+            worker: Name recorded on the job
+            now: Current Unix time
+            rate_per_min: Job starts per minute and space (default: unlimited)
+            burst: Starts a space may make at once before the rate applies
+
+        Returns:
+            The claimed job, or None if nothing is claimable
+        """
+        now = time.time() if now is None else now
+        claimed: int | None = None
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            limited: set[str] = set()
+            for row in self._due(now):
+                if row["space"] in limited:
+                    continue
+                if rate_per_min is not None:
+                    bucket = self._bucket(row["space"], rate_per_min, burst, now)
+                    if not bucket.take(now):
+                        limited.add(row["space"])
+                        continue
+                    self.db.execute(
+                        "INSERT INTO buckets (space, tokens, at) VALUES (?, ?, ?) "
+                        "ON CONFLICT (space) DO UPDATE SET tokens = excluded.tokens, at = excluded.at",
+                        (row["space"], bucket.tokens, bucket.at),
+                    )
+                self.db.execute(
+                    "UPDATE jobs SET state = 'running', attempts = attempts + 1, started_at = ?, worker = ? "
+                    "WHERE id = ?",
+                    (now, worker, row["id"]),
+                )
+                claimed = row["id"]
+                break
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        return self.get(claimed) if claimed is not None else None
+
+    def token_wait(self, rate_per_min: float, burst: int, now: float | None = None) -> float | None:
+        """Seconds until a claimable job's space has a token, or None if no job is claimable."""
+        now = time.time() if now is None else now
+        spaces = {row["space"] for row in self._due(now)}
+        if not spaces:
+            return None
+        return min(self._bucket(space, rate_per_min, burst, now).wait_s(now) for space in spaces)
+
+    def complete(self, job: Job, seconds: float) -> None:
+        """Mark a running job done."""
+        self.db.execute(
+            "UPDATE jobs SET state = 'done', finished_at = ?, seconds = ?, error = NULL WHERE id = ?",
+            (time.time(), seconds, job.id),
+        )
+
+    def fail(self, job: Job, error: str, seconds: float, retry_at: float | None = None) -> None:
+        """Record a failed attempt: queue the job again at ``retry_at``, or mark it failed."""
+        if retry_at is None:
+            self.db.execute(
+                "UPDATE jobs SET state = 'failed', finished_at = ?, seconds = ?, error = ? WHERE id = ?",
+                (time.time(), seconds, error, job.id),
+            )
+        else:
+            self.db.execute(
+                "UPDATE jobs SET state = 'queued', run_at = ?, seconds = ?, error = ? WHERE id = ?",
+                (retry_at, seconds, error, job.id),
+            )
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a job that has not started; return False if there is none."""
+        cur = self.db.execute(
+            "UPDATE jobs SET state = 'cancelled', finished_at = ? WHERE id = ? AND state = 'queued'",
+            (time.time(), job_id),
+        )
+        return cur.rowcount == 1
+
+    def requeue_stale(self, older_than_s: float = STALE_AFTER_S) -> int:
+        """Put jobs left running by a worker that died back in the queue; return how many."""
+        cur = self.db.execute(
+            "UPDATE jobs SET state = 'queued', error = 'worker died' WHERE state = 'running' AND started_at < ?",
+            (time.time() - older_than_s,),
+        )
+        return cur.rowcount
+
+    def next_run_at(self) -> float | None:
+        """Return when the earliest queued job is due, or None if the queue is empty."""
+        (run_at,) = self.db.execute("SELECT MIN(run_at) FROM jobs WHERE state = 'queued'").fetchone()
+        return None if run_at is None else float(run_at)
+
+    def counts(self) -> dict[str, int]:
+        """Return the number of jobs in each state."""
+        counts = dict.fromkeys(STATES, 0)
+        counts.update(self.db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+        return counts
+
+    def jobs(self, states: Iterable[str] = (), space: str | None = None, limit: int | None = None) -> list[Job]:
+        """Return jobs, optionally filtered, soonest first for queued and newest first otherwise."""
+        where: list[str] = []
+        params: list[Any] = []
+        states = list(states)
+        if states:
+            where.append(f"state IN ({', '.join('?' * len(states))})")
+            params.extend(states)
+        if space:
+            where.append("space = ?")
+            params.append(space)
+        sql = "SELECT * FROM jobs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY state != 'running', state != 'queued', CASE WHEN state = 'queued' THEN run_at ELSE -id END"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [Job.from_row(r) for r in self.db.execute(sql, params)]
+
+
+@dataclass(frozen=True)
+class WorkerSettings:
+    """How a worker drains the queue.
+
+    Args:
+        concurrency: Jobs running at once
+        rate_per_min: Job starts per minute and space, shared by every worker on the queue
+        burst: Starts a space may make at once before the rate applies
+        poll_s: Longest sleep between looks at the queue
+        retry: Backoff between attempts of a failed job
+    """
+
+    concurrency: int = 2
+    rate_per_min: float = 6.0
+    burst: int = 2
+    poll_s: float = 10.0
+    retry: RetryPolicy = field(default_factory=lambda: RetryPolicy(base_s=60.0, max_s=3600.0, jitter=0.1))
+
+    @classmethod
+    def from_env(cls) -> WorkerSettings:
+        """Read SUBSTACK_WORKERS, SUBSTACK_RATE_PER_MIN, SUBSTACK_RATE_BURST and SUBSTACK_JOB_RETRY_BASE_S."""
+        d = cls()
+        return cls(
+            concurrency=max(1, int(os.getenv("SUBSTACK_WORKERS", d.concurrency))),
+            rate_per_min=float(os.getenv("SUBSTACK_RATE_PER_MIN", d.rate_per_min)),
+            burst=max(1, int(os.getenv("SUBSTACK_RATE_BURST", d.burst))),
+            retry=RetryPolicy(
+                base_s=float(os.getenv("SUBSTACK_JOB_RETRY_BASE_S", d.retry.base_s)),
+                max_s=d.retry.max_s,
+                jitter=d.retry.jitter,
+            ),
+        )
+
+
+@dataclass
+class WorkerReport:
+    """What a worker run did, by job id."""
+
+    done: list[int] = field(default_factory=list)
+    retried: list[int] = field(default_factory=list)
+    failed: list[int] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+async def publish_job(job: Job) -> None:
+    """Publish one job's post the way ``publish`` would."""
+    from .publish_to_substack import create_or_update_draft
+
+    await create_or_update_draft(
+        job.space, Path(job.path), job.publish, login=False, force=job.force, engine=job.engine
+    )
+
+
+async def run_worker(
+    queue: JobQueue,
+    settings: WorkerSettings | None = None,
+    drain: bool = False,
+    run_job: Callable[[Job], Awaitable[None]] = publish_job,
+    stop: asyncio.Event | None = None,
+) -> WorkerReport:
+    """Run due jobs until stopped, or with ``drain`` until nothing is due or running.
+
+    Args:
+        queue: The job queue
+        settings: Concurrency, rate limit and backoff (default: WorkerSettings.from_env())
+        drain: Return once no job is due or running instead of waiting for scheduled ones
+        run_job: Coroutine function performing one job
+        stop: Set to finish the running jobs and return
+
+    Returns:
+        The jobs this worker finished, retried or gave up on
+    """
+    settings = settings or WorkerSettings.from_env()
+    stop = stop or asyncio.Event()
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    report = WorkerReport()
+    started = time.perf_counter()
+    running: set[asyncio.Task[None]] = set()
+    if stale := queue.requeue_stale():
+        logger.warning(f"Requeued {stale} jobs left running by a stopped worker")
+
+    async def execute(job: Job) -> None:
+        t0 = time.perf_counter()
+        logger.info(f"Job {job.id}: {job.path} -> {job.space} (attempt {job.attempts}/{job.max_attempts})")
+        try:
+            await run_job(job)
+        except SessionExpired as e:
+            # Retrying cannot help until someone logs in again.
+            queue.fail(job, str(e), time.perf_counter() - t0)
+            report.failed.append(job.id)
+        except (Exception, SystemExit) as e:
+            error = f"{type(e).__name__}: {e}"
+            retry_at = time.time() + settings.retry.delay(job.attempts) if job.attempts < job.max_attempts else None
+            queue.fail(job, error, time.perf_counter() - t0, retry_at)
+            (report.retried if retry_at else report.failed).append(job.id)
+            logger.error(f"Job {job.id} failed: {error}" + (f"; retrying in {retry_at - time.time():.0f}s" if retry_at else ""))
+        else:
+            queue.complete(job, time.perf_counter() - t0)
+            report.done.append(job.id)
+            logger.info(f"Job {job.id} done in {time.perf_counter() - t0:.1f}s")
+
+    while not stop.is_set():
+        while len(running) < settings.concurrency:
+            job = queue.claim(worker, rate_per_min=settings.rate_per_min, burst=settings.burst)
+            if job is None:
+                break
+            running.add(asyncio.create_task(execute(job)))
+
+        now = time.time()
+        next_at = queue.next_run_at()
+        if drain and not running and (next_at is None or next_at > now):
+            break
+        wake = settings.poll_s
+        if next_at is not None and next_at > now:
+            wake = min(wake, next_at - now)
+        elif (token := queue.token_wait(settings.rate_per_min, settings.burst, now)) is not None and token > 0:
+            # due jobs wait for their space's next token
+            wake = min(wake, token)
+        wake = max(wake, 0.05)
+        if running:
+            done, _ = await asyncio.wait(running, timeout=wake, return_when=asyncio.FIRST_COMPLETED)
+            running -= done
+        else:
+            try:
+                await asyncio.wait_for(stop.wait(), wake)
+            except asyncio.TimeoutError:
+                pass
+    if running:
+        await asyncio.wait(running)
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def format_time(ts: float | None) -> str:
+    """Local time for job listings, with the date only when it is not today."""
+    if ts is None:
+        return ""
+    dt = datetime.fromtimestamp(ts)
+    today = datetime.now().date()
+    if dt.date() == today:
+        return dt.strftime("%H:%M:%S")
+    if dt.date() == today + timedelta(days=1):
+        return dt.strftime("tomorrow %H:%M")
+    return dt.strftime("%Y-%m-%d %H:%M")
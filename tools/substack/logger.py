@@ -1,13 +1,16 @@
 """Logging configuration for Substack tools."""
+import json
 import logging
 import sys
 from pathlib import Path
+from typing import Any, TextIO
 
 
 def setup_logger(
     name: str,
     level: int = logging.INFO,
-    log_file: Path | None = None
+    log_file: Path | None = None,
+    stream: TextIO | None = None
 ) -> logging.Logger:
     """Configure and return a logger.
 
@@ -15,6 +18,7 @@ def setup_logger(
         name: Logger name
         level: Logging level (default: INFO)
         log_file: Optional file path for logging
+        stream: Console stream (default: stdout)
 
     Returns:
         Configured logger instance
@@ -27,7 +31,7 @@ def setup_logger(
         return logger
 
     # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler = logging.StreamHandler(sys.stdout if stream is None else stream)
     console_handler.setLevel(level)
     console_formatter = logging.Formatter(
         "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -45,3 +49,30 @@ def setup_logger(
         logger.addHandler(file_handler)
 
     return logger
+
+
+def log_record(
+    logger: logging.Logger,
+    event: str,
+    level: int = logging.DEBUG,
+    **fields: Any
+) -> None:
+    """Emit a structured log record.
+
+    The fields are attached to the LogRecord as ``record.event`` and
+    ``record.fields`` for handlers that want them, and rendered as JSON
+    after the event name for plain-text handlers.
+
+    Args:
+        logger: Logger to emit through
+        event: Short record type, e.g. "span"
+        level: Logging level (default: DEBUG)
+        **fields: JSON-serializable payload
+    """
+    if not logger.isEnabledFor(level):
+        return
+    logger.log(
+        level,
+        f"{event} {json.dumps(fields, sort_keys=True, default=str)}",
+        extra={"event": event, "fields": fields},
+    )
@@ -0,0 +1,122 @@
+"""Content-hash manifest of posts that have already been sent to Substack."""
+import hashlib
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from .logger import setup_logger
+
+logger = setup_logger(__name__)
+
+MANIFEST_PATH = Path(".playwright") / "publish_manifest.json"
+
+
+def post_key(md_path: Path) -> str:
+    """Return a stable key for a post path, relative to the working directory when possible."""
+    p = md_path.resolve()
+    try:
+        return p.relative_to(Path.cwd()).as_posix()
+    except ValueError:
+        return p.as_posix()
+
+
+def content_digest(metadata: dict[str, Any], html: str, assets: list[Path]) -> str:
+    """Hash everything that ends up in a Substack post.
+
+    Args:
+        metadata: Parsed front-matter
+        html: Rendered post body
+        assets: Local image files referenced by the post
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps(metadata, sort_keys=True, default=str).encode("utf-8"))
+    h.update(b"\0")
+    h.update(html.encode("utf-8"))
+    for asset in assets:
+        h.update(b"\0")
+        h.update(asset.name.encode("utf-8"))
+        h.update(b"\0")
+        with asset.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+class PublishManifest:
+    """Persistent record of the last successful publish of each post.
+
+    Entries are keyed by post path (relative to the working directory when
+    possible) and remember the content digest, the space it went to and
+    whether it was published live or only saved as a draft.
+    """
+
+    def __init__(self, path: Path = MANIFEST_PATH) -> None:
+        self.path = path
+        self.entries: dict[str, dict[str, Any]] = self._load()
+        # Keys recorded by this instance; save() merges only these into the file.
+        self._recorded: set[str] = set()
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        if not self.path.exists():
+            return {}
+        try:
+            entries = json.loads(self.path.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable publish manifest {self.path}: {e}")
+            return {}
+        if not isinstance(entries, dict):
+            logger.warning(f"Ignoring publish manifest {self.path}: not a JSON object")
+            return {}
+        return entries
+
+    @staticmethod
+    def key(md_path: Path) -> str:
+        """Return the manifest key for a post path."""
+        return post_key(md_path)
+
+    def get(self, md_path: Path) -> dict[str, Any] | None:
+        """Return the manifest entry for a post, if any."""
+        return self.entries.get(self.key(md_path))
+
+    def is_current(self, md_path: Path, digest: str, space: str, publish: bool) -> bool:
+        """Return True if this exact content was already sent to this space.
+
+        A post saved only as a draft is not current for a live publish.
+        """
+        entry = self.get(md_path)
+        if not entry:
+            return False
+        return (
+            entry.get("digest") == digest
+            and entry.get("space") == space
+            and (bool(entry.get("published")) or not publish)
+        )
+
+    def record(self, md_path: Path, digest: str, space: str, publish: bool) -> None:
+        """Remember a successful publish (call save() to persist)."""
+        key = self.key(md_path)
+        self._recorded.add(key)
+        self.entries[key] = {
+            "digest": digest,
+            "space": space,
+            "published": publish,
+            "updated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+
+    def save(self) -> None:
+        """Atomically write the manifest to disk.
+
+        Entries recorded by other instances since this one was loaded (e.g.
+        by concurrent queue jobs) are kept; this instance's records win.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        entries = self._load()
+        entries.update({k: self.entries[k] for k in self._recorded})
+        self.entries = entries
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(entries, indent=2, sort_keys=True))
+        tmp.replace(self.path)
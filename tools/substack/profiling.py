@@ -0,0 +1,131 @@
+"""Lightweight timing spans for the publish pipeline.
+
+Wrap a phase in ``with span("paste"):``. When a Profiler is active (see
+``profile()``) the span is recorded and emitted as a structured ``span`` log
+record; otherwise it costs a context-variable lookup. A finished profile can
+be summarized per phase or written as a Chrome trace (chrome://tracing,
+Perfetto) where each post gets its own row.
+"""
+import json
+import logging
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .logger import log_record, setup_logger
+
+logger = setup_logger(__name__)
+
+_active: ContextVar["Profiler | None"] = ContextVar("profiler", default=None)
+_lane: ContextVar[str] = ContextVar("profiler_lane", default="main")
+
+
+@dataclass
+class Span:
+    """One timed phase."""
+
+    name: str
+    start_us: float
+    dur_us: float
+    lane: str
+    args: dict[str, Any] = field(default_factory=dict)
+
+
+class Profiler:
+    """Collects spans for one run."""
+
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+        self._origin = time.perf_counter()
+
+    def add(self, name: str, started: float, ended: float, args: dict[str, Any]) -> Span:
+        """Record a span from two ``perf_counter()`` readings."""
+        s = Span(
+            name=name,
+            start_us=(started - self._origin) * 1e6,
+            dur_us=(ended - started) * 1e6,
+            lane=_lane.get(),
+            args=args,
+        )
+        self.spans.append(s)
+        return s
+
+    def breakdown(self) -> list[tuple[str, int, float, float]]:
+        """Return (phase, count, total_ms, share_of_wall) rows, slowest first.
+
+        The share is relative to the wall time from the first span start to
+        the last span end, so overlapping posts in a batch can exceed 100%.
+        """
+        if not self.spans:
+            return []
+        wall_us = max(s.start_us + s.dur_us for s in self.spans) - min(s.start_us for s in self.spans)
+        totals: dict[str, list[float]] = {}
+        for s in self.spans:
+            totals.setdefault(s.name, []).append(s.dur_us)
+        rows = [
+            (name, len(durs), sum(durs) / 1000, sum(durs) / wall_us if wall_us else 0.0)
+            for name, durs in totals.items()
+        ]
+        return sorted(rows, key=lambda r: r[2], reverse=True)
+
+    def format_report(self) -> str:
+        """Return the per-phase breakdown as a plain-text table."""
+        lines = [f"{'phase':<20} {'count':>5} {'total ms':>10} {'share':>7}"]
+        for name, count, total_ms, share in self.breakdown():
+            lines.append(f"{name:<20} {count:>5} {total_ms:>10.1f} {share:>6.0%}")
+        return "\n".join(lines)
+
+    def write_chrome_trace(self, path: Path) -> None:
+        """Write spans in Chrome trace-event format, one thread row per lane."""
+        lanes: dict[str, int] = {}
+        events: list[dict[str, Any]] = []
+        for s in self.spans:
+            tid = lanes.setdefault(s.lane, len(lanes) + 1)
+            events.append({
+                "name": s.name, "cat": "publish", "ph": "X", "pid": 1, "tid": tid,
+                "ts": round(s.start_us, 1), "dur": round(s.dur_us, 1), "args": s.args,
+            })
+        for lane, tid in lanes.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": lane}})
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+
+
+@contextmanager
+def profile() -> Iterator[Profiler]:
+    """Activate a new Profiler for the enclosed block (and tasks it spawns)."""
+    prof = Profiler()
+    token = _active.set(prof)
+    try:
+        yield prof
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def lane(name: str) -> Iterator[None]:
+    """Attribute spans in the enclosed block to ``name`` (e.g. one post of a batch)."""
+    token = _lane.set(name)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+@contextmanager
+def span(name: str, **args: Any) -> Iterator[None]:
+    """Time the enclosed block as phase ``name`` if a Profiler is active."""
+    prof = _active.get()
+    if prof is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        s = prof.add(name, started, time.perf_counter(), args)
+        log_record(logger, "span", logging.INFO, name=name, lane=s.lane, ms=round(s.dur_us / 1000, 2), **args)
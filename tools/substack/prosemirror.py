@@ -0,0 +1,212 @@
+"""Convert rendered post HTML into the editor's ProseMirror document JSON.
+
+Substack's editor stores a draft body as a ProseMirror document, which is
+what the draft API expects instead of HTML. Only the markup markdown-it
+produces for our posts is mapped; unknown wrappers are unwrapped and their
+content kept. Images become block-level ``captionedImage`` nodes, so an
+image inside a paragraph splits it; the render module's embed blocks become
+the editor's YouTube and tweet nodes.
+"""
+from __future__ import annotations
+
+import re
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Any
+
+Node = dict[str, Any]
+
+VOID_TAGS = {"br", "hr", "img", "input", "meta", "link", "source", "wbr"}
+HEADINGS = {f"h{n}": n for n in range(1, 7)}
+MARKS = {"strong": "strong", "b": "strong", "em": "em", "i": "em", "code": "code", "s": "strikethrough", "del": "strikethrough"}
+BLOCK_TAGS = {
+    "p", "blockquote", "ul", "ol", "li", "pre", "hr", "table", "thead", "tbody", "tr", "div", "section", "figure",
+    *HEADINGS,
+}
+_SPACE_RE = re.compile(r"\s+")
+
+
+@dataclass
+class _Element:
+    tag: str
+    attrs: dict[str, str]
+    children: list[_Element | str] = field(default_factory=list)
+
+    def text(self) -> str:
+        return "".join(c if isinstance(c, str) else c.text() for c in self.children)
+
+
+class _TreeBuilder(HTMLParser):
+    """Parse an HTML fragment into a tree of _Element, tolerating unclosed tags."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.root = _Element("root", {})
+        self._stack = [self.root]
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        el = _Element(tag, {k: v or "" for k, v in attrs})
+        self._stack[-1].children.append(el)
+        if tag not in VOID_TAGS:
+            self._stack.append(el)
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self._stack[-1].children.append(_Element(tag, {k: v or "" for k, v in attrs}))
+
+    def handle_endtag(self, tag: str) -> None:
+        for i in range(len(self._stack) - 1, 0, -1):
+            if self._stack[i].tag == tag:
+                del self._stack[i:]
+                return
+
+    def handle_data(self, data: str) -> None:
+        self._stack[-1].children.append(data)
+
+
+def _is_block(child: _Element | str) -> bool:
+    return isinstance(child, _Element) and (child.tag in BLOCK_TAGS or child.tag == "img")
+
+
+def _image(el: _Element, images: Mapping[str, str]) -> Node:
+    src = el.attrs.get("src", "")
+    attrs = {"src": images.get(src, src), "alt": el.attrs.get("alt") or None, "title": el.attrs.get("title") or None}
+    return {"type": "captionedImage", "content": [{"type": "image2", "attrs": attrs}]}
+
+
+def _inline(children: list[_Element | str], marks: list[Node], images: Mapping[str, str], out: list[Node]) -> None:
+    """Append text, hard breaks and (block) images for inline content to ``out``."""
+    for child in children:
+        if isinstance(child, str):
+            text = _SPACE_RE.sub(" ", child)
+            if text:
+                node: Node = {"type": "text", "text": text}
+                if marks:
+                    node["marks"] = [dict(m) for m in marks]
+                out.append(node)
+        elif child.tag == "br":
+            out.append({"type": "hard_break"})
+        elif child.tag == "img":
+            out.append(_image(child, images))
+        elif child.tag == "a":
+            _inline(child.children, [*marks, {"type": "link", "attrs": {"href": child.attrs.get("href", "")}}], images, out)
+        elif child.tag in MARKS:
+            mark = {"type": MARKS[child.tag]}
+            _inline(child.children, marks if mark in marks else [*marks, mark], images, out)
+        else:
+            _inline(child.children, marks, images, out)
+
+
+def _trim(run: list[Node]) -> list[Node]:
+    """Strip whitespace at the edges of a paragraph and after hard breaks."""
+    out: list[Node] = []
+    for node in run:
+        if node["type"] == "text" and (not out or out[-1]["type"] == "hard_break"):
+            node = {**node, "text": node["text"].lstrip()}
+        if node["type"] != "text" or node["text"]:
+            out.append(node)
+    while out and out[-1]["type"] == "hard_break":
+        out.pop()
+    if out and out[-1]["type"] == "text":
+        out[-1] = {**out[-1], "text": out[-1]["text"].rstrip()}
+        if not out[-1]["text"]:
+            out.pop()
+    return out
+
+
+def _textblocks(children: list[_Element | str], images: Mapping[str, str], node: Node | None = None) -> list[Node]:
+    """Turn inline content into text blocks of ``node``'s type (paragraph by default), split at images."""
+    node = node or {"type": "paragraph"}
+    inline: list[Node] = []
+    _inline(children, [], images, inline)
+    blocks: list[Node] = []
+    run: list[Node] = []
+
+    def flush() -> None:
+        content = _trim(run)
+        if content:
+            blocks.append({**node, "content": content})
+        run.clear()
+
+    for item in inline:
+        if item["type"] == "captionedImage":
+            flush()
+            blocks.append(item)
+        else:
+            run.append(item)
+    flush()
+    return blocks
+
+
+def _blocks(children: list[_Element | str], images: Mapping[str, str]) -> list[Node]:
+    """Convert a sequence of block and loose inline children to block nodes."""
+    blocks: list[Node] = []
+    loose: list[_Element | str] = []
+    for child in [*children, None]:
+        if child is not None and not _is_block(child):
+            loose.append(child)
+            continue
+        if loose:
+            blocks.extend(_textblocks(loose, images))
+            loose = []
+        if child is not None:
+            blocks.extend(_block(child, images))  # type: ignore[arg-type]
+    return blocks
+
+
+def _block(el: _Element, images: Mapping[str, str]) -> list[Node]:
+    if el.tag == "p":
+        return _textblocks(el.children, images)
+    if el.tag in HEADINGS:
+        return _textblocks(el.children, images, {"type": "heading", "attrs": {"level": HEADINGS[el.tag]}})
+    if el.tag == "img":
+        return [_image(el, images)]
+    if el.tag == "hr":
+        return [{"type": "horizontal_rule"}]
+    if el.attrs.get("data-embed") == "youtube":
+        return [{"type": "youtube2", "attrs": {"videoId": el.attrs.get("data-id")}}]
+    if el.attrs.get("data-embed") == "twitter":
+        return [{"type": "twitter2", "attrs": {"url": el.attrs.get("data-url")}}]
+    if el.tag == "pre":
+        code = next((c for c in el.children if isinstance(c, _Element) and c.tag == "code"), None)
+        language = code.attrs.get("data-language") if code is not None else None
+        text = el.text().rstrip("\n")
+        return [{"type": "code_block", "attrs": {"language": language}, "content": [{"type": "text", "text": text}] if text else []}]
+    if el.tag == "blockquote":
+        return [{"type": "blockquote", "content": _blocks(el.children, images) or [{"type": "paragraph"}]}]
+    if el.tag in ("ul", "ol"):
+        items = [
+            {"type": "list_item", "content": _blocks(c.children, images) or [{"type": "paragraph"}]}
+            for c in el.children
+            if isinstance(c, _Element) and c.tag == "li"
+        ]
+        if el.tag == "ul":
+            return [{"type": "bullet_list", "content": items}]
+        return [{"type": "ordered_list", "attrs": {"start": int(el.attrs.get("start") or 1)}, "content": items}]
+    if el.tag == "tr":
+        # The editor has no tables: a row becomes a paragraph of cells.
+        cells = [c for c in el.children if isinstance(c, _Element) and c.tag in ("td", "th")]
+        row: list[_Element | str] = []
+        for i, cell in enumerate(cells):
+            row.extend([" | "] if i else [])
+            row.append(_Element("strong", {}, cell.children) if cell.tag == "th" else cell)
+        return _textblocks(row, images)
+    return _blocks(el.children, images)
+
+
+def html_to_doc(html: str, images: Mapping[str, str] | None = None) -> Node:
+    """Convert rendered post HTML to a ProseMirror ``doc`` node.
+
+    Args:
+        html: HTML as rendered by ``read_post``
+        images: Replacement URLs for image sources, e.g. local paths mapped
+            to their uploaded URLs; other sources are kept
+
+    Returns:
+        The document as JSON-ready dicts
+    """
+    parser = _TreeBuilder()
+    parser.feed(html)
+    parser.close()
+    return {"type": "doc", "content": _blocks(parser.root.children, images or {}) or [{"type": "paragraph"}]}
+
@@ -1,16 +1,49 @@
+from __future__ import annotations
+
 import argparse
 import asyncio
 import json
+import os
 import re
 import sys
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from pathlib import Path
-
-import frontmatter
-from markdown_it import MarkdownIt
-from playwright.async_api import Locator, Page, async_playwright
-from playwright.async_api import TimeoutError as PWTimeout
-
+from typing import TYPE_CHECKING, cast
+
+# Playwright, python-frontmatter and markdown-it are imported where they are
+# used so that argument errors and --help never pay for them.
+from . import daemon
+from .api import DraftApi, DraftApiError, draft_id_from_url, publish_engine
+from .build import load_built
+from .checkpoint import PublishJournal, checkpoints_enabled
+from .editor_selectors import EDITOR_PROBES, resolve_fields, resolve_selectors
+from .images import optimize_images
+from .insertion import InsertSettings, insert_body
 from .logger import setup_logger
+from .manifest import PublishManifest, content_digest, post_key
+from .profiling import lane, profile, span
+from .render import Rendered, collect_assets, render_markdown
+from .retry import RetryPolicy, with_retry
+from .routing import RouteFilter
+from .session import STORAGE_STATE_PATH, SessionExpired, require_session
+from .space_cache import SpaceCache
+from .tracing import FlightRecorder, TraceRun
+from .waits import (
+    DEFAULT_TIMEOUTS,
+    WaitTimeouts,
+    expect_published,
+    expect_saved,
+    expect_upload,
+    wait_for_editor,
+    wait_for_saved,
+    wait_visible,
+)
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, Locator, Page, Playwright, StorageState
 
 logger = setup_logger(__name__)
 
@@ -34,9 +67,6 @@ def _normalize_space(space: str) -> str:
         raise ValueError(f"Invalid Substack subdomain: {space!r}")
     return s
 
-md = MarkdownIt("commonmark", {"breaks": True, "linkify": True}).enable("table")
-IMG_RE = re.compile(r'!\[(?P<alt>[^\]]*)\]\((?P<fp>[^)]+)\)')
-
 def find_local_images(markdown_text: str, base_dir: Path) -> list[Path]:
     """Find all local image paths referenced in markdown text.
 
@@ -45,26 +75,21 @@ def find_local_images(markdown_text: str, base_dir: Path) -> list[Path]:
         base_dir: Base directory for resolving relative paths
 
     Returns:
-        List of Path objects for existing local images
+        List of Path objects for existing local images, each once, in order
+        of first use; reference-style images count, images in code do not.
+        Generated figures resolve to the format recorded in their
+        directory's figure manifest
     """
-    assets: list[Path] = []
-    for m in IMG_RE.finditer(markdown_text):
-        fp = m.group("fp").split()[0].strip()
-        if fp.startswith(("http://", "https://")):
-            continue
-        p = (base_dir / fp).resolve()
-        if p.exists():
-            assets.append(p)
-    return assets
+    return collect_assets(markdown_text, base_dir)
 
-def read_post(md_path: Path) -> tuple[str, list[str], str, list[Path]]:
-    """Read and parse a markdown post file.
+def render_post(md_path: Path) -> tuple[str, list[str], Rendered]:
+    """Read a markdown post file and render its body.
 
     Args:
         md_path: Path to the markdown file
 
     Returns:
-        Tuple of (title, tags, html_content, local_image_paths)
+        Tuple of (title, tags, rendered body)
 
     Raises:
         FileNotFoundError: If markdown file doesn't exist
@@ -74,249 +99,729 @@ def read_post(md_path: Path) -> tuple[str, list[str], str, list[Path]]:
         logger.error(f"Markdown file not found: {md_path}")
         raise FileNotFoundError(f"Markdown file not found: {md_path}")
 
+    import frontmatter
+
     try:
-        post = frontmatter.load(md_path)
-        title = post.get("title") or md_path.stem.replace("-", " ").title()
-        tags = post.get("tags", [])
-        html = md.render(post.content)
-        html = html.replace('<code class="language-', '<code data-language="')
-        assets = find_local_images(post.content, base_dir=md_path.parent)
-
-        logger.info(f"Parsed post: {title} with {len(tags)} tags and {len(assets)} images")
-        return title, tags, html, assets
+        with span("read_post", file=md_path.name):
+            post = frontmatter.load(md_path)
+            title = post.get("title") or md_path.stem.replace("-", " ").title()
+            tags = post.get("tags", [])
+            rendered = render_markdown(post.content, base_dir=md_path.parent)
+
+        logger.info(f"Parsed post: {title} with {len(tags)} tags and {len(rendered.assets)} images")
+        return title, tags, rendered
     except Exception as e:
         logger.error(f"Failed to parse markdown file {md_path}: {e}")
         raise ValueError(f"Failed to parse markdown file: {e}") from e
 
-async def _goto_any_editor(page: Page, space: str) -> None:
+def read_post(md_path: Path) -> tuple[str, list[str], str, list[Path]]:
+    """Read and parse a markdown post file.
+
+    Args:
+        md_path: Path to the markdown file
+
+    Returns:
+        Tuple of (title, tags, html_content, local_image_paths)
+
+    Raises:
+        FileNotFoundError: If markdown file doesn't exist
+        ValueError: If file cannot be parsed
+    """
+    title, tags, rendered = render_post(md_path)
+    return title, tags, rendered.html, rendered.assets
+
+def load_post(md_path: Path) -> tuple[str, list[str], str, list[Path]]:
+    """Return ``read_post``'s result, from the build directory when it is fresh.
+
+    Args:
+        md_path: Path to the markdown file
+
+    Returns:
+        Tuple of (title, tags, html_content, local_image_paths)
+    """
+    built = load_built(md_path)
+    if built is not None:
+        logger.debug(f"Using prebuilt artifact for {md_path}")
+        return built
+    return read_post(md_path)
+
+def post_digest(md_path: Path) -> str:
+    """Return the content hash of a post: front-matter, rendered HTML and images.
+
+    Args:
+        md_path: Path to the markdown file
+
+    Returns:
+        Hex SHA-256 digest, stable across runs while nothing changes
+    """
+    import frontmatter
+
+    _, _, html, assets = load_post(md_path)
+    metadata = frontmatter.load(md_path).metadata
+    return content_digest(metadata, html, assets)
+
+def _space_origin(space: str) -> str:
+    """Return the origin serving a space's editor.
+
+    ``SUBSTACK_BASE_URL`` overrides it, e.g. ``http://127.0.0.1:8765`` for the
+    offline mock editor; a ``{space}`` placeholder in it is filled in.
+    """
+    base = os.getenv("SUBSTACK_BASE_URL")
+    return base.rstrip("/").format(space=space) if base else f"https://{space}.substack.com"
+
+def _editor_candidates(space: str, preferred: str | None = None) -> list[str]:
+    """Return the known 'new post' URLs for a space, ``preferred`` first."""
+    origin = _space_origin(space)
+    candidates = [f"{origin}{path}" for path in ("/p/new", "/publish/post/new", "/write", "/publish")]
+    if preferred in candidates:
+        candidates.remove(preferred)
+        candidates.insert(0, preferred)
+    return candidates
+
+async def _goto_any_editor(
+    page: Page,
+    space: str,
+    timeouts: WaitTimeouts = DEFAULT_TIMEOUTS,
+    cache: SpaceCache | None = None,
+) -> None:
     """Try a few known 'new post' URLs until one loads the editor container.
 
+    The URL that worked last time for this space is tried first. Each URL is
+    first loaded up to DOMContentLoaded and then waited on until an editor
+    probe matches; only if that fails everywhere are the URLs retried with
+    ``networkidle``, which Substack's analytics connections make slow.
+
     Args:
         page: Playwright page object
         space: Substack subdomain
+        timeouts: How long to wait for the editor to mount on each URL
+        cache: Per-space cache remembering the working editor URL
 
     Raises:
         RuntimeError: If no editor URL succeeds
     """
-    candidates = [
-        f"https://{space}.substack.com/p/new",
-        f"https://{space}.substack.com/publish/post/new",
-        f"https://{space}.substack.com/write",
-        f"https://{space}.substack.com/publish",
-    ]
+    from playwright.async_api import TimeoutError as PWTimeout
+
+    hint = cache.get(space, "editor_url") if cache is not None else None
+    candidates = _editor_candidates(space, hint)
+    started = time.perf_counter()
     last_err: Exception | None = None
-    for url in candidates:
-        try:
-            logger.debug(f"Attempting to load editor at: {url}")
-            await page.goto(url, wait_until="networkidle")
-            # wait for *some* editor-ish element to appear
-            await page.wait_for_timeout(500)
-            if await _probe_editor_ready(page):
-                logger.info(f"Successfully loaded editor at: {url}")
+    for wait_until in ("domcontentloaded", "networkidle"):
+        for url in candidates:
+            try:
+                logger.debug(f"Attempting to load editor at: {url} ({wait_until})")
+                await page.goto(url, wait_until=wait_until)
+                if wait_until == "networkidle":
+                    if not await _probe_editor_ready(page):
+                        continue
+                else:
+                    # wait for *some* editor-ish element to appear
+                    await wait_for_editor(page, EDITOR_PROBES, timeouts.editor_ms)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                logger.info(f"Time to editor: {elapsed_ms:.0f} ms via {url} ({wait_until})")
+                if cache is not None:
+                    cache.set(space, "editor_url", url)
                 return
-        except PWTimeout as e:
-            logger.warning(f"Timeout loading {url}: {e}")
-            last_err = e
-        except Exception as e:
-            logger.warning(f"Error loading {url}: {e}")
-            last_err = e
+            except PWTimeout as e:
+                logger.warning(f"Timeout loading {url}: {e}")
+                last_err = e
+            except Exception as e:
+                logger.warning(f"Error loading {url}: {e}")
+                last_err = e
     # If we're here, none worked
+    if cache is not None and hint:
+        cache.forget(space, "editor_url")
     logger.error(f"Failed to load editor for space '{space}'")
     raise RuntimeError(f"Could not load Substack editor for space '{space}'. Last error: {last_err!r}")
 
 async def _probe_editor_ready(page: Page) -> bool:
     """Return True if the editor seems present."""
-    # Any of these being present suggests editor is mounted.
-    probes = [
-        '[data-testid="post-title"]',
-        '[data-testid="post-body"]',
-        'div[contenteditable="true"]',
-        'textarea[placeholder*="Title"]',
-        '[placeholder*="Title"]',
-        '[role="textbox"]',
-    ]
-    for sel in probes:
-        if await page.locator(sel).count():
-            return True
-    return False
-
-async def _find_title_locator(page: Page) -> Locator | None:
-    """Find a robust locator for the title field."""
-    candidates = [
-        '[data-testid="post-title"]',
-        'textarea[placeholder*="Title"]',
-        '[placeholder*="Title"]',
-        # some editors use the first contenteditable as Title
-        'div[contenteditable="true"] >> nth=0',
-        # generic textbox (first)
-        '[role="textbox"] >> nth=0',
-    ]
-    for sel in candidates:
-        loc = page.locator(sel)
-        if await loc.count():
-            return loc.first
-    return None
-
-async def _find_body_locator(page: Page) -> Locator | None:
-    """Find a robust locator for the body field."""
-    candidates = [
-        '[data-testid="post-body"]',
-        # second contenteditable often is body
-        'div[contenteditable="true"] >> nth=1',
-        # fallback: last contenteditable
-        'div[contenteditable="true"] >> nth=-1',
-        # generic textbox (second)
-        '[role="textbox"] >> nth=1',
-    ]
-    for sel in candidates:
-        loc = page.locator(sel)
-        if await loc.count():
-            return loc.first
-    return None
-
-async def _dump_failure_artifacts(page: Page, note: str) -> None:
-    """Save debugging artifacts (screenshot and HTML) on failure.
+    return bool(await resolve_selectors(page, EDITOR_PROBES))
+
+async def _find_field_locators(
+    page: Page,
+    space: str | None = None,
+    cache: SpaceCache | None = None,
+) -> tuple[Locator | None, Locator | None]:
+    """Find robust locators for the title and body fields in one round trip."""
+    fields = await resolve_fields(page, space, cache)
+    title, body = fields["title"], fields["body"]
+    return (
+        page.locator(title).first if title else None,
+        page.locator(body).first if body else None,
+    )
+
+async def _clear_slash_command(page: Page, command: str) -> None:
+    """Close an open slash menu and delete ``command`` if it is still before the caret.
+
+    When ``command`` was the whole block, the empty paragraph typed before it
+    is removed too, so a retry starts from where the failed attempt did.
+    """
+    await page.keyboard.press("Escape")
+    block_len = await page.evaluate(
+        """(command) => {
+            const node = getSelection().anchorNode;
+            const text = node ? node.textContent || "" : "";
+            return text.endsWith(command) ? text.length : -1;
+        }""",
+        command,
+    )
+    if block_len < 0:
+        return
+    for _ in range(len(command) + (block_len == len(command))):
+        await page.keyboard.press("Backspace")
+
+def _load_storage_state(storage_path: Path) -> StorageState | None:
+    """Return the saved Playwright storage state, or None if there is none."""
+    if not storage_path.exists():
+        return None
+    state = json.loads(storage_path.read_text())
+    if not isinstance(state, dict):
+        raise ValueError(f"{storage_path} does not contain a storage state object")
+    return cast("StorageState", state)
+
+@asynccontextmanager
+async def _open_browser(p: Playwright, headless: bool = True) -> AsyncIterator[Browser]:
+    """Attach to the warm browser daemon if one is running, else launch Chromium.
 
     Args:
-        page: Playwright page object
-        note: Description of the failure
+        p: Running Playwright instance
+        headless: Headed runs (login) always launch their own browser
+
+    Yields:
+        A browser; it is closed (or, for the daemon, disconnected) on exit
     """
-    outdir = Path(".playwright")
-    outdir.mkdir(parents=True, exist_ok=True)
-    png = outdir / "last_error.png"
-    html = outdir / "last_error.html"
+    browser: Browser | None = None
+    cdp = daemon.endpoint() if headless else None
+    if cdp:
+        started = time.perf_counter()
+        try:
+            with span("browser_attach"):
+                browser = await p.chromium.connect_over_cdp(cdp, timeout=5_000)
+            logger.info(f"Attached to browser daemon at {cdp} in {(time.perf_counter() - started) * 1000:.0f} ms")
+        except Exception as e:
+            logger.warning(f"Browser daemon at {cdp} unreachable ({e}); launching Chromium")
+    if browser is None:
+        with span("browser_launch"):
+            browser = await p.chromium.launch(headless=headless)
     try:
-        await page.screenshot(path=str(png), full_page=True)
-        html_text = await page.content()
-        html.write_text(html_text, encoding="utf-8")
-        logger.info(f"Debug artifacts saved: {png} and {html} ({note})")
-        print(f">> Debug saved: {png} and {html}  ({note})")
-    except Exception as e:
-        logger.error(f"Failed to write debug artifacts: {e}")
-        print(f">> Failed to write debug artifacts: {e}")
+        yield browser
+    finally:
+        await browser.close()
+
+async def _open_draft(page: Page, url: str, timeouts: WaitTimeouts = DEFAULT_TIMEOUTS) -> None:
+    """Reopen a saved draft and wait for its editor to mount."""
+    await page.goto(url, wait_until="domcontentloaded")
+    await wait_for_editor(page, EDITOR_PROBES, timeouts.editor_ms)
+
+async def _save_draft(page: Page, timeouts: WaitTimeouts = DEFAULT_TIMEOUTS) -> None:
+    """Click the editor's save control (or rely on autosave) and wait until it reports Saved."""
+    save = page.locator('button:has-text("Save draft"), [data-testid*="save-draft"]')
+    if not await save.count():
+        # sometimes autosave; try opening menu then saving
+        save = page.locator('button:has-text("Save"), [aria-label*="Save"]')
+    if not await save.count():
+        print(">> No save button; waiting for autosave.")
+        await wait_for_saved(page, timeouts.saved_ms)
+        return
+    async with expect_saved(page, timeouts.saved_ms):
+        await save.first.click()
+
+async def _fill_post(
+    page: Page,
+    space: str,
+    md_file: Path,
+    publish: bool,
+    paste_lock: asyncio.Lock | None = None,
+    timeouts: WaitTimeouts = DEFAULT_TIMEOUTS,
+    journal: PublishJournal | None = None,
+    retry: RetryPolicy | None = None,
+    recorder: FlightRecorder | None = None,
+    draft_url: str | None = None,
+) -> None:
+    """Drive an already-open page through the editor for a single post.
+
+    With a journal, the draft is saved after the body (which also persists
+    the title), after every image and after the tags, and a step is recorded
+    only once that save went through, so each recorded step is really on
+    Substack. A journal from an interrupted run reopens its draft and skips
+    the steps it finished; if the draft cannot be reopened, its steps are
+    dropped and the post starts over in a new draft.
+
+    Args:
+        page: Playwright page object (fresh, not yet on the editor)
+        space: Normalized Substack subdomain
+        md_file: Path to markdown file to publish
+        publish: If True, publish immediately; if False, save as draft
+        paste_lock: Lock serializing clipboard use when several pages share a browser
+        timeouts: Per-step limits for the event-driven waits
+        journal: Checkpoints to resume from and record into
+        retry: Backoff for image uploads and saves (default: RetryPolicy.from_env())
+        recorder: Notes steps that fail without failing the post (tags)
+        draft_url: Draft to overwrite instead of starting a new one, e.g. one the
+            draft API saved before failing (the journal's draft comes first)
+
+    Raises:
+        WaitTimeout: If the editor does not react to a paste or image upload in
+            time, or a publish is not confirmed
+        InsertionMismatch: If the pasted body comes up short of the rendered HTML
+    """
+    retry = retry or RetryPolicy.from_env()
+    mod = "Meta" if sys.platform == "darwin" else "Control"
+
+    def done(step: str) -> bool:
+        return journal is not None and journal.done(step)
+
+    def checkpoint(*steps: str) -> None:
+        if journal is not None:
+            for step in steps:
+                journal.complete(step, page.url)
+
+    # 1) Navigate to editor, or back to the draft an interrupted run created
+    cache = SpaceCache()
+    resumed = False
+    if journal is not None and journal.draft_url:
+        draft_url = journal.draft_url
+    with span("goto_editor"):
+        if draft_url:
+            try:
+                await _open_draft(page, draft_url, timeouts)
+                resumed = True
+            except Exception as e:
+                logger.warning(f"Could not reopen draft {draft_url} ({e}); starting a new one")
+                if journal is not None:
+                    journal.abandon_draft()
+        if not resumed:
+            # already tries every editor URL twice; retrying it would multiply that
+            await _goto_any_editor(page, space, timeouts, cache)
+    if journal is not None and not resumed and journal.steps:
+        # none of the recorded steps are in the fresh draft
+        journal.reset()
+
+    title, tags, html, assets = load_post(md_file)
+
+    # 2) Find title/body locators robustly
+    with span("locate_fields"):
+        title_loc, body_loc = await _find_field_locators(page, space, cache)
+    if not title_loc or not body_loc:
+        raise SystemExit("Could not find the Substack editor fields.")
+
+    # 3) Set title
+    if not done("title"):
+        with span("title"):
+            await title_loc.click()
+            await page.keyboard.press(f"{mod}+A")
+            await page.keyboard.insert_text(title)
+
+    # 4) Paste HTML into body (let Substack convert), in chunks, then verify
+    # The clipboard is shared by every page in the browser, so concurrent
+    # posts must not interleave the write and the paste.
+    if journal is not None and journal.done("body") and not (await body_loc.inner_text()).strip():
+        logger.warning("Reopened draft has an empty body; pasting it again")
+        journal.reset(keep=("title",))
+    if done("body"):
+        await body_loc.click()
+        await page.keyboard.press(f"{mod}+End")
+    else:
+        insert = InsertSettings.from_env()
+        async with (paste_lock if insert.uses_clipboard else None) or asyncio.Lock():
+            with span("paste", chars=len(html), mode=insert.mode):
+                await body_loc.click()
+                if resumed:
+                    # drop whatever the interrupted run left in the draft
+                    await page.keyboard.press(f"{mod}+A")
+                    await page.keyboard.press("Backspace")
+                await insert_body(page, body_loc, html, insert, timeouts.paste_ms)
+        if journal is not None:
+            await with_retry("save draft", lambda: _save_draft(page, timeouts), retry)
+            checkpoint("title", "body")
+
+    # 5) Upload local images; a missing menu or upload fails the post
+    with span("optimize_images", count=len(assets)):
+        uploads = await asyncio.to_thread(optimize_images, assets)
+    for upload in uploads:
+        step = f"image:{post_key(upload.source)}"
+        if done(step):
+            continue
+        img = upload.path
+        images_before = await body_loc.locator("img").count()
+
+        async def insert_image(img: Path = img, images_before: int = images_before) -> None:
+            if await body_loc.locator("img").count() > images_before:
+                # an earlier attempt's upload landed after it timed out
+                return
+            await page.keyboard.press("Enter")
+            await page.keyboard.type("/image")
+            image_menu = page.locator('role=menuitem[name*="Image"]')
+            await wait_visible(image_menu, "image menu", timeouts.menu_ms)
+            await image_menu.first.click()
+            file_input = page.locator('input[type="file"]').first
+            async with expect_upload(page, f"upload {img.name}", timeouts.upload_ms):
+                await file_input.set_input_files(str(img))
+
+        async def dismiss_menu() -> None:
+            await _clear_slash_command(page, "/image")
+
+        try:
+            with span("image", file=upload.source.name, bytes=upload.bytes):
+                await with_retry(f"upload {img.name}", insert_image, retry, before_retry=dismiss_menu)
+        except Exception as e:
+            logger.error(f"Image upload failed for {upload.source}: {e}")
+            raise
+        if journal is not None:
+            await with_retry("save draft", lambda: _save_draft(page, timeouts), retry)
+            checkpoint(step)
+
+    # 6) Try to add tags if settings exists (non-fatal)
+    if not done("tags"):
+        with span("tags", count=len(tags)):
+            try:
+                settings = page.locator('[data-testid="post-settings"], [aria-label*="Settings"]')
+                if await settings.count():
+                    await settings.first.click()
+                    tag_input = page.locator('input[placeholder*="Add tag"], input[aria-label*="tag"]')
+                    if await tag_input.count():
+                        for t in tags:
+                            await tag_input.fill(t)
+                            await page.keyboard.press("Enter")
+                    # close modal
+                    try:
+                        await page.keyboard.press("Escape")
+                    except Exception:
+                        close_btn = page.locator('button:has-text("Close"), [aria-label*="Close"]')
+                        if await close_btn.count():
+                            await close_btn.first.click()
+            except Exception as e:
+                if recorder is not None:
+                    recorder.swallow("tags", e)
+        if journal is not None:
+            await with_retry("save draft", lambda: _save_draft(page, timeouts), retry)
+            checkpoint("tags")
+
+    # 7) Save draft or publish
+    with span("publish" if publish else "save"):
+        if publish:
+            # Try publish buttons
+            publish_btn = page.locator('button:has-text("Publish"), [data-testid="publish-button"]')
+            if not await publish_btn.count():
+                raise SystemExit("Couldn't find Publish button.")
+            await publish_btn.first.click()
+            # Only look for the confirm button inside the dialog the click opened,
+            # never the Publish button that opened it.
+            dialog = page.locator('[role="dialog"], [role="alertdialog"]').filter(
+                has=page.locator('button:has-text("Publish")')
+            )
+            await wait_visible(dialog, "publish dialog", timeouts.menu_ms)
+            confirm = dialog.first.locator('button:has-text("Publish now"), button:has-text("Publish")')
+            async with expect_published(page, timeouts.publish_ms):
+                await confirm.first.click()
+        else:
+            await with_retry("save draft", lambda: _save_draft(page, timeouts), retry)
+
+    print(f">> {'Published' if publish else 'Draft saved'}: {md_file}")
+
+async def _publish_via_api(
+    api: DraftApi, md_file: Path, publish: bool, journal: PublishJournal | None
+) -> tuple[bool, str | None]:
+    """Publish one post through the draft API.
+
+    A draft left by an interrupted run is overwritten rather than duplicated.
+    If the API fails after the draft was saved, its URL is returned (and goes
+    into the journal) so the editor fallback reopens it.
+
+    Returns:
+        (True, None) if the post went through; (False, draft URL or None) if
+        the editor should take over
+    """
+    title, tags, html, _ = load_post(md_file)
+    draft_id = draft_id_from_url(journal.draft_url) if journal is not None else None
+    try:
+        with span("api_post", file=md_file.name):
+            result = await api.publish_post(title, tags, html, md_file.parent, publish, draft_id)
+    except DraftApiError as e:
+        logger.warning(f"Draft API failed for {md_file} ({e}); falling back to the editor")
+        if journal is not None and e.draft_url:
+            journal.draft_url = e.draft_url
+            journal.reset()
+        return False, e.draft_url
+    print(f">> {'Published' if publish else 'Draft saved'} via API: {md_file} ({result.seconds * 1000:.0f} ms)")
+    return True, None
+
+async def _ensure_session(space: str, storage_path: Path, relogin: bool) -> None:
+    """Fail fast on a logged-out session, or log in again first when ``relogin`` is set.
+
+    Raises:
+        SessionExpired: If the session is invalid and ``relogin`` is False
+    """
+    with span("session_preflight"):
+        try:
+            await asyncio.to_thread(require_session, space, storage_path)
+            return
+        except SessionExpired as e:
+            if not relogin:
+                raise
+            print(f">> {e.reason}; log in again in the browser window that opens.")
+    await create_or_update_draft(space, None, publish=False, login=True)
+    await asyncio.to_thread(require_session, space, storage_path)
 
 async def create_or_update_draft(
     space: str,
     md_file: Path | None,
     publish: bool,
-    login: bool
+    login: bool,
+    force: bool = False,
+    block_resources: bool = False,
+    relogin: bool = False,
+    engine: str | None = None,
 ) -> None:
     """Create or update a Substack draft or publish a post.
 
+    Posts whose content hash matches the publish manifest are skipped without
+    launching a browser unless ``force`` is set. Progress is checkpointed in
+    ``.playwright/checkpoints/`` (unless SUBSTACK_CHECKPOINTS=0), so a rerun
+    after a failure reopens the same draft and continues with the first
+    unfinished step.
+
+    With the ``api`` engine the post is sent straight to the draft API and
+    the browser is only launched if that fails.
+
     Args:
         space: Substack subdomain (e.g., 'nwsldata')
         md_file: Path to markdown file to publish (required unless login=True)
         publish: If True, publish immediately; if False, save as draft
         login: If True, perform interactive login and save session
+        force: If True, publish even when the post is unchanged
+        block_resources: If True, abort fonts, media, remote images and trackers
+        relogin: If the saved session is logged out, run the interactive login
+            first instead of failing
+        engine: 'browser' or 'api' (default: SUBSTACK_ENGINE, else 'browser')
+
+    Raises:
+        SessionExpired: If the saved session is logged out (checked over HTTP
+            before the browser starts) and ``relogin`` is False
     """
     space = _normalize_space(space)
-    storage_path = Path(".playwright") / "storage_state.json"
+    engine = publish_engine(engine)
+    storage_path = STORAGE_STATE_PATH
     storage_path.parent.mkdir(parents=True, exist_ok=True)
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True if not login else False)
-        context = await browser.new_context(
-            storage_state=None if login else (json.loads(storage_path.read_text()) if storage_path.exists() else None)
-        )
-        page = await context.new_page()
 
-        # 1) Navigate to editor
-        await _goto_any_editor(page, space)
+    manifest = PublishManifest()
+    digest: str | None = None
+    journal: PublishJournal | None = None
+    api_draft: str | None = None
+    if not login and md_file is not None:
+        digest = post_digest(md_file)
+        if not force and manifest.is_current(md_file, digest, space, publish):
+            print(f">> Unchanged since last run, skipping: {md_file}")
+            return
+        await _ensure_session(space, storage_path, relogin)
+        journal = PublishJournal(md_file, space, digest) if checkpoints_enabled() else None
+        if engine == "api":
+            async with DraftApi.for_space(space, storage_path) as api:
+                done, api_draft = await _publish_via_api(api, md_file, publish, journal)
+            if done:
+                if journal is not None:
+                    journal.clear()
+                manifest.record(md_file, digest, space, publish)
+                manifest.save()
+                return
+
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as p, _open_browser(p, headless=not login) as browser:
+        with span("browser_context"):
+            context = await browser.new_context(
+                storage_state=None if login else _load_storage_state(storage_path)
+            )
+            page = await context.new_page()
 
         if login:
+            await _goto_any_editor(page, space)
             print(">> Log in to Substack in the opened window, then return here and press Enter.")
             input()
             await context.storage_state(path=str(storage_path))
             print(">> Session saved:", storage_path)
-            await browser.close()
             return
 
         if md_file is None:
             raise SystemExit("--file is required unless --login is provided")
 
-        title, tags, html, assets = read_post(md_file)
+        stats = await RouteFilter.from_env().install(context) if block_resources else None
+        recorder = await TraceRun().recorder(md_file.name, context)
+        recorder.watch(page)
+        try:
+            await _fill_post(
+                page, space, md_file, publish, journal=journal, recorder=recorder, draft_url=api_draft
+            )
+        except BaseException as e:
+            if isinstance(e, (Exception, SystemExit)):
+                await recorder.fail(page, e)
+            if journal is not None and journal.draft_url:
+                print(f">> Progress kept in {journal.path}; rerun to resume draft {journal.draft_url}")
+            raise
+        await recorder.finish()
+        if journal is not None:
+            journal.clear()
+        if stats is not None:
+            logger.info(stats.summary())
+        if digest is not None:
+            manifest.record(md_file, digest, space, publish)
+            manifest.save()
+        await context.storage_state(path=str(storage_path))
+        await context.close()
+
+@dataclass
+class BatchResult:
+    """Outcome of publishing one file in a batch run."""
 
-        # 2) Find title/body locators robustly
-        title_loc = await _find_title_locator(page)
-        body_loc  = await _find_body_locator(page)
-        if not title_loc or not body_loc:
-            await _dump_failure_artifacts(page, "editor-not-found")
-            raise SystemExit("Could not find the Substack editor fields. See .playwright/last_error.* for diagnostics.")
+    path: Path
+    ok: bool
+    seconds: float
+    error: str | None = None
+    skipped: bool = False
 
-        # 3) Set title
-        await title_loc.click()
-        mod = "Meta" if sys.platform == "darwin" else "Control"
-        await page.keyboard.press(f"{mod}+A")
-        await page.keyboard.insert_text(title)
+async def publish_batch(
+    space: str,
+    md_files: list[Path],
+    publish: bool,
+    concurrency: int = 3,
+    force: bool = False,
+    block_resources: bool = False,
+    relogin: bool = False,
+    engine: str | None = None,
+) -> list[BatchResult]:
+    """Publish many posts through a single Chromium instance.
+
+    One browser and one context (loaded from the saved session) are shared by
+    every post; at most ``concurrency`` editor pages are open at a time.
+    A failure in one post is recorded and does not stop the others. Posts
+    that are unchanged according to the publish manifest are skipped, and
+    no browser is launched if nothing is left to do. With the ``api`` engine
+    posts go through the draft API first (``concurrency`` at a time) and
+    only those it fails on are opened in the editor.
 
-        # 4) Paste HTML into body (let Substack convert)
-        await body_loc.click()
-        await page.evaluate(f"navigator.clipboard.writeText({json.dumps(html)})")
-        await page.keyboard.press(f"{mod}+V")
-        await page.wait_for_timeout(900)
+    Args:
+        space: Substack subdomain (e.g., 'nwsldata')
+        md_files: Markdown files to publish, in order
+        publish: If True, publish immediately; if False, save as drafts
+        concurrency: Maximum number of editor pages open at once
+        force: If True, publish even unchanged posts
+        block_resources: If True, abort fonts, media, remote images and trackers
+        relogin: If the saved session is logged out, run the interactive login
+            first instead of failing
+        engine: 'browser' or 'api' (default: SUBSTACK_ENGINE, else 'browser')
 
-        # 5) Upload local images (best-effort)
-        for img in assets:
-            try:
-                await page.keyboard.press("Enter")
-                await page.keyboard.type("/image")
-                await page.wait_for_timeout(350)
-                image_menu = page.locator('role=menuitem[name*="Image"]')
-                if await image_menu.count():
-                    await image_menu.first.click()
-                file_input = page.locator('input[type="file"]').first
-                if await file_input.count():
-                    await file_input.set_input_files(str(img))
-                    await page.wait_for_timeout(900)
-            except Exception:
-                pass  # non-fatal
-
-        # 6) Try to add tags if settings exists (non-fatal)
+    Returns:
+        One BatchResult per input file, in input order
+
+    Raises:
+        SessionExpired: If the saved session is logged out and ``relogin`` is False
+    """
+    space = _normalize_space(space)
+    engine = publish_engine(engine)
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be at least 1, got {concurrency}")
+    storage_path = STORAGE_STATE_PATH
+    storage_path.parent.mkdir(parents=True, exist_ok=True)
+    slots = asyncio.Semaphore(concurrency)
+    paste_lock = asyncio.Lock()
+
+    manifest = PublishManifest()
+    results: dict[Path, BatchResult] = {}
+    digests: dict[Path, str] = {}
+    for md_file in md_files:
         try:
-            settings = page.locator('[data-testid="post-settings"], [aria-label*="Settings"]')
-            if await settings.count():
-                await settings.first.click()
-                tag_input = page.locator('input[placeholder*="Add tag"], input[aria-label*="tag"]')
-                if await tag_input.count():
-                    for t in tags:
-                        await tag_input.fill(t)
-                        await page.keyboard.press("Enter")
-                # close modal
+            digests[md_file] = post_digest(md_file)
+        except (FileNotFoundError, ValueError) as e:
+            results[md_file] = BatchResult(md_file, False, 0.0, str(e))
+            continue
+        if not force and manifest.is_current(md_file, digests[md_file], space, publish):
+            results[md_file] = BatchResult(md_file, True, 0.0, skipped=True)
+    pending = [f for f in md_files if f not in results]
+    if not pending:
+        logger.info("All posts unchanged; nothing to publish")
+        return [results[f] for f in md_files]
+    await _ensure_session(space, storage_path, relogin)
+
+    api_drafts: dict[Path, str] = {}
+    if engine == "api":
+        async with DraftApi.for_space(space, storage_path) as api:
+
+            async def api_one(md_file: Path) -> BatchResult | None:
+                async with slots:
+                    started = time.perf_counter()
+                    journal = PublishJournal(md_file, space, digests[md_file]) if checkpoints_enabled() else None
+                    with lane(md_file.name):
+                        done, draft_url = await _publish_via_api(api, md_file, publish, journal)
+                    if not done:
+                        if draft_url:
+                            api_drafts[md_file] = draft_url
+                        return None
+                    if journal is not None:
+                        journal.clear()
+                    manifest.record(md_file, digests[md_file], space, publish)
+                    return BatchResult(md_file, True, time.perf_counter() - started)
+
+            for r in await asyncio.gather(*(api_one(f) for f in pending)):
+                if r is not None:
+                    results[r.path] = r
+        manifest.save()
+        pending = [f for f in pending if f not in results]
+        if not pending:
+            return [results[f] for f in md_files]
+        logger.info(f"{len(pending)} posts left for the editor")
+
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as p, _open_browser(p) as browser:
+        state = _load_storage_state(storage_path)
+        with span("browser_context"):
+            context = await browser.new_context(storage_state=state)
+        route_filter = RouteFilter.from_env() if block_resources else None
+        stats = await route_filter.install(context) if route_filter is not None else None
+        traces = TraceRun()
+
+        async def run_one(md_file: Path) -> BatchResult:
+            async with slots:
+                started = time.perf_counter()
+                # A trace chunk covers its whole context, so traced posts get their own.
+                own = traces.settings.playwright
+                post_context = await browser.new_context(storage_state=state) if own else context
+                if own and route_filter is not None:
+                    await route_filter.install(post_context, stats)
+                recorder = await traces.recorder(md_file.name, post_context)
+                page = await post_context.new_page()
+                recorder.watch(page)
+                journal = PublishJournal(md_file, space, digests[md_file]) if checkpoints_enabled() else None
                 try:
-                    await page.keyboard.press("Escape")
-                except Exception:
-                    close_btn = page.locator('button:has-text("Close"), [aria-label*="Close"]')
-                    if await close_btn.count():
-                        await close_btn.first.click()
-        except Exception:
-            pass
-
-        # 7) Save draft or publish
-        if publish:
-            # Try publish buttons
-            publish_btn = page.locator('button:has-text("Publish"), [data-testid="publish-button"]')
-            if await publish_btn.count():
-                await publish_btn.first.click()
-                confirm = page.locator('button:has-text("Publish now"), button:has-text("Publish")')
-                if await confirm.count():
-                    await confirm.first.click()
-            else:
-                await _dump_failure_artifacts(page, "publish-button-missing")
-                raise SystemExit("Couldn't find Publish button. See .playwright/last_error.*")
-        else:
-            save = page.locator('button:has-text("Save draft"), [data-testid*="save-draft"]')
-            if await save.count():
-                await save.first.click()
-            else:
-                # sometimes autosave; try opening menu then saving
-                menu = page.locator('button:has-text("Save"), [aria-label*="Save"]')
-                if await menu.count():
-                    await menu.first.click()
-                else:
-                    print(">> Draft may have auto-saved; continuing.")
-
-        print(f">> {'Published' if publish else 'Draft saved'}: {md_file}")
+                    with lane(md_file.name), span("post", file=str(md_file)):
+                        await _fill_post(
+                            page, space, md_file, publish, paste_lock=paste_lock, journal=journal,
+                            recorder=recorder, draft_url=api_drafts.get(md_file),
+                        )
+                except (Exception, SystemExit) as e:
+                    logger.error(f"Batch publish failed for {md_file}: {e}")
+                    await recorder.fail(page, e)
+                    return BatchResult(md_file, False, time.perf_counter() - started, str(e))
+                finally:
+                    await recorder.finish()
+                    await page.close()
+                    if own:
+                        await post_context.close()
+                if journal is not None:
+                    journal.clear()
+                manifest.record(md_file, digests[md_file], space, publish)
+                return BatchResult(md_file, True, time.perf_counter() - started)
+
+        logger.info(f"Publishing {len(pending)} posts with concurrency {concurrency}")
+        for r in await asyncio.gather(*(run_one(f) for f in pending)):
+            results[r.path] = r
+        manifest.save()
+        if stats is not None:
+            logger.info(stats.summary())
         await context.storage_state(path=str(storage_path))
-        await browser.close()
+        await context.close()
+    return [results[f] for f in md_files]
 
 def main() -> None:
     ap = argparse.ArgumentParser()
@@ -324,9 +829,49 @@ def main() -> None:
     ap.add_argument("--file", help="Markdown file path (required unless --login)")
     ap.add_argument("--publish", action="store_true", help="Publish instead of saving draft")
     ap.add_argument("--login", action="store_true", help="Interactive login to capture session")
+    ap.add_argument("--batch", nargs="+", metavar="FILE", help="Publish several files with one browser")
+    ap.add_argument("--concurrency", type=int, default=3, help="Editor pages open at once in --batch mode")
+    ap.add_argument("--force", action="store_true", help="Publish even if unchanged since the last run")
+    ap.add_argument("--block-resources", action="store_true",
+                    default=os.getenv("SUBSTACK_BLOCK_RESOURCES", "").lower() in ("1", "true", "yes"),
+                    help="Abort fonts, media, remote images and trackers (env: SUBSTACK_BLOCK_RESOURCES)")
+    ap.add_argument("--profile", action="store_true", help="Print a per-phase timing breakdown at the end")
+    ap.add_argument("--trace-out", type=Path, help="Also write a Chrome trace JSON of the phases here")
+    ap.add_argument("--relogin", action="store_true", help="Log in interactively if the saved session expired")
+    ap.add_argument("--engine", choices=["browser", "api"],
+                    help="Publish through the editor or the draft API (env: SUBSTACK_ENGINE; default browser)")
     args = ap.parse_args()
+    with profile() as prof:
+        try:
+            _run(args)
+        except SessionExpired as e:
+            raise SystemExit(f">> {e}") from e
+        finally:
+            if args.profile or args.trace_out:
+                print(prof.format_report())
+            if args.trace_out:
+                prof.write_chrome_trace(args.trace_out)
+                print(">> Trace written:", args.trace_out)
+
+def _run(args: argparse.Namespace) -> None:
+    if args.batch:
+        results = asyncio.run(publish_batch(
+            args.space, [Path(f) for f in args.batch], args.publish, args.concurrency, args.force,
+            args.block_resources, args.relogin, args.engine,
+        ))
+        for r in results:
+            status = "skip" if r.skipped else "ok  " if r.ok else "FAIL"
+            detail = f"  {r.error}" if r.error else ""
+            print(f">> {status} {r.path} ({r.seconds:.1f}s){detail}")
+        failed = sum(not r.ok for r in results)
+        print(f">> {len(results) - failed}/{len(results)} posts succeeded")
+        if failed:
+            raise SystemExit(1)
+        return
     md_file = Path(args.file) if args.file else None
-    asyncio.run(create_or_update_draft(args.space, md_file, args.publish, args.login))
+    asyncio.run(create_or_update_draft(
+        args.space, md_file, args.publish, args.login, args.force, args.block_resources, args.relogin, args.engine
+    ))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,252 @@
+"""Render post markdown through one pass over markdown-it's token stream.
+
+Transforms that used to be string rewrites of the finished HTML or extra
+regex scans of the markdown are passes over the parsed tokens instead:
+code-block languages, image discovery (reference-style images included,
+code spans excluded) and figure rewriting, Substack embeds for bare video
+and tweet links, footnotes and heading anchors. Every pass sees every token
+in a single traversal, and the HTML and the post's local images come back
+together.
+"""
+from __future__ import annotations
+
+import os
+import re
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from functools import cache
+from pathlib import Path
+from typing import TYPE_CHECKING
+from urllib.parse import quote, unquote, urlsplit
+
+from .images import resolve_figure
+
+if TYPE_CHECKING:
+    from markdown_it import MarkdownIt
+    from markdown_it.token import Token
+
+# Bump when rendered output changes, so build artifacts are re-rendered.
+RENDERER_VERSION = 2
+
+
+@dataclass
+class RenderContext:
+    """State shared by the passes while one post is rendered.
+
+    Args:
+        base_dir: Directory relative image paths are resolved against
+    """
+
+    base_dir: Path
+    assets: list[Path] = field(default_factory=list)
+    # Every local image path referenced, whether or not it exists.
+    sources: list[Path] = field(default_factory=list)
+    anchors: dict[str, int] = field(default_factory=dict)
+    # Image source -> existing local file (None if remote or missing), resolved once per source.
+    images: dict[str, Path | None] = field(default_factory=dict)
+
+    def add_asset(self, path: Path) -> None:
+        """Record a local image once, in order of first use."""
+        if path not in self.assets:
+            self.assets.append(path)
+
+
+class Pass:
+    """A token transform: ``setup`` configures the parser once, ``visit`` sees every token.
+
+    ``visit`` gets the token list being walked (the block stream, or an
+    inline token's children) and the token's index in it, so a pass can
+    look at or hide its neighbours.
+    """
+
+    def setup(self, md: MarkdownIt) -> None:
+        """Enable parser plugins or rules this pass relies on."""
+
+    def visit(self, tokens: list[Token], i: int, ctx: RenderContext) -> None:
+        """Transform ``tokens[i]`` in place."""
+
+
+@dataclass(frozen=True)
+class CodeLanguage(Pass):
+    """Put a fenced block's language in ``data-language``, which Substack's paste keeps."""
+
+    def visit(self, tokens: list[Token], i: int, ctx: RenderContext) -> None:
+        token = tokens[i]
+        if token.type == "fence" and token.info.strip():
+            token.attrSet("data-language", token.info.split()[0])
+            token.info = ""
+
+
+@dataclass(frozen=True)
+class Images(Pass):
+    """Collect local images and point generated figures at the file actually exported."""
+
+    def visit(self, tokens: list[Token], i: int, ctx: RenderContext) -> None:
+        token = tokens[i]
+        if token.type != "image":
+            return
+        src = str(token.attrGet("src") or "")
+        if src not in ctx.images:
+            path = None
+            if src and not urlsplit(src).scheme:
+                source = (ctx.base_dir / unquote(src)).resolve()
+                ctx.sources.append(source)
+                path = resolve_figure(source)
+            ctx.images[src] = path if path is not None and path.exists() else None
+        path = ctx.images[src]
+        if path is None:
+            return
+        ctx.add_asset(path)
+        if path.name != Path(unquote(src)).name:
+            token.attrSet("src", quote(Path(os.path.relpath(path, ctx.base_dir.resolve())).as_posix()))
+
+
+YOUTUBE_RE = re.compile(r"^https?://(?:www\.)?(?:youtube\.com/watch\?(?:.*&)?v=|youtu\.be/)(?P<id>[\w-]{11})")
+TWEET_RE = re.compile(r"^https?://(?:www\.)?(?:twitter|x)\.com/\w+/status/\d+")
+
+
+@dataclass(frozen=True)
+class Embeds(Pass):
+    """Turn a paragraph holding only a YouTube or tweet URL into a Substack embed block."""
+
+    def visit(self, tokens: list[Token], i: int, ctx: RenderContext) -> None:
+        token = tokens[i]
+        if token.type != "inline" or not 0 < i < len(tokens) - 1 or tokens[i - 1].type != "paragraph_open":
+            return
+        url = _lone_url(token.children or [])
+        html = _embed_html(url) if url else None
+        if html is None:
+            return
+        from markdown_it.token import Token
+
+        tokens[i - 1].hidden = tokens[i + 1].hidden = True
+        token.children = [Token("html_inline", "", 0, content=html)]
+
+
+def _lone_url(children: list[Token]) -> str | None:
+    """Return the URL if an inline token is nothing but a bare URL or an autolink."""
+    kinds = [c.type for c in children]
+    if kinds == ["text"]:
+        text = str(children[0].content).strip()
+        return text if re.fullmatch(r"https?://\S+", text) else None
+    if kinds == ["link_open", "text", "link_close"]:
+        href = children[0].attrGet("href")
+        text = str(children[1].content)
+        return text if isinstance(href, str) and href == text else None
+    return None
+
+
+def _embed_html(url: str) -> str | None:
+    from markdown_it.common.utils import escapeHtml
+
+    if m := YOUTUBE_RE.match(url):
+        video = m.group("id")
+        return (
+            f'<div class="youtube-wrap" data-embed="youtube" data-id="{video}">'
+            f'<iframe src="https://www.youtube-nocookie.com/embed/{video}" frameborder="0" allowfullscreen></iframe></div>\n'
+        )
+    if TWEET_RE.match(url):
+        href = escapeHtml(url)
+        return f'<div class="tweet" data-embed="twitter" data-url="{href}"><a href="{href}">{href}</a></div>\n'
+    return None
+
+
+@dataclass(frozen=True)
+class Footnotes(Pass):
+    """Parse ``[^1]`` references and definitions into a numbered footnote list."""
+
+    def setup(self, md: MarkdownIt) -> None:
+        from mdit_py_plugins.footnote import footnote_plugin
+
+        md.use(footnote_plugin)
+
+
+def slugify(text: str) -> str:
+    """Return a GitHub-style anchor for a heading's text."""
+    slug = re.sub(r"[^\w\- ]", "", text.strip().lower())
+    return re.sub(r"\s+", "-", slug).strip("-") or "section"
+
+
+@dataclass(frozen=True)
+class HeadingAnchors(Pass):
+    """Give every heading a unique ``id`` so posts can link to their sections."""
+
+    def visit(self, tokens: list[Token], i: int, ctx: RenderContext) -> None:
+        token = tokens[i]
+        if token.type != "heading_open" or i + 1 >= len(tokens):
+            return
+        base = slugify("".join(c.content for c in tokens[i + 1].children or [] if c.type in ("text", "code_inline")))
+        n = ctx.anchors.get(base, 0)
+        ctx.anchors[base] = n + 1
+        token.attrSet("id", f"{base}-{n}" if n else base)
+
+
+DEFAULT_PASSES: tuple[Pass, ...] = (CodeLanguage(), Images(), Embeds(), Footnotes(), HeadingAnchors())
+
+
+@cache
+def parser(passes: tuple[Pass, ...] = DEFAULT_PASSES) -> MarkdownIt:
+    """Return the shared markdown parser for a set of passes, built on first use."""
+    from markdown_it import MarkdownIt
+
+    md = MarkdownIt("commonmark", {"breaks": True}).enable("table")
+    for p in passes:
+        p.setup(md)
+    return md
+
+
+def _walk(tokens: list[Token]) -> Iterator[tuple[list[Token], int]]:
+    for i, token in enumerate(tokens):
+        yield tokens, i
+        if token.children:
+            yield from _walk(token.children)
+
+
+@dataclass(frozen=True)
+class Rendered:
+    """A rendered post body."""
+
+    html: str
+    assets: list[Path]
+    sources: list[Path] = field(default_factory=list)
+
+
+def render_markdown(text: str, base_dir: Path, passes: tuple[Pass, ...] = DEFAULT_PASSES) -> Rendered:
+    """Parse ``text``, run every pass over its tokens in one traversal and render it.
+
+    Args:
+        text: Markdown body (without front-matter)
+        base_dir: Directory relative image paths are resolved against
+        passes: Transforms to apply, in order, to each token
+
+    Returns:
+        The HTML, the existing local images it references, in order, and
+        every local image path it references, existing or not
+    """
+    md = parser(passes)
+    env: dict = {}
+    tokens = md.parse(text, env)
+    ctx = RenderContext(base_dir)
+    for siblings, i in _walk(tokens):
+        for p in passes:
+            p.visit(siblings, i, ctx)
+    return Rendered(md.renderer.render(tokens, md.options, env), ctx.assets, ctx.sources)
+
+
+def _scan_images(text: str, base_dir: Path) -> RenderContext:
+    md = parser((Images(),))
+    ctx = RenderContext(base_dir)
+    images = Images()
+    for siblings, i in _walk(md.parse(text, {})):
+        images.visit(siblings, i, ctx)
+    return ctx
+
+
+def collect_assets(text: str, base_dir: Path) -> list[Path]:
+    """Return the existing local images ``text`` references, without rendering it."""
+    return _scan_images(text, base_dir).assets
+
+
+def collect_sources(text: str, base_dir: Path) -> list[Path]:
+    """Return every local image path ``text`` references, whether or not it exists."""
+    return _scan_images(text, base_dir).sources
@@ -0,0 +1,83 @@
+"""Retry with exponential backoff for the editor steps that fail transiently."""
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import TypeVar
+
+from .logger import setup_logger
+
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How often and how patiently a step is retried.
+
+    Args:
+        attempts: Total tries, including the first
+        base_s: Delay before the second try; doubles on every further try
+        max_s: Upper bound on a single delay
+        jitter: Fraction of each delay that is randomized, so parallel pages spread out
+    """
+
+    attempts: int = 3
+    base_s: float = 1.0
+    max_s: float = 30.0
+    jitter: float = 0.25
+
+    @classmethod
+    def from_env(cls) -> RetryPolicy:
+        """Read SUBSTACK_RETRY_ATTEMPTS and SUBSTACK_RETRY_BASE_S, falling back to defaults."""
+        defaults = cls()
+        return cls(
+            attempts=max(1, int(os.getenv("SUBSTACK_RETRY_ATTEMPTS", defaults.attempts))),
+            base_s=float(os.getenv("SUBSTACK_RETRY_BASE_S", defaults.base_s)),
+        )
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait after failed try number ``attempt`` (1-based)."""
+        delay = min(self.max_s, self.base_s * 2.0 ** (attempt - 1))
+        return delay * (1 - self.jitter * random.random())
+
+
+async def with_retry(
+    step: str,
+    action: Callable[[], Awaitable[T]],
+    policy: RetryPolicy,
+    retry_on: tuple[type[BaseException], ...] = (Exception,),
+    before_retry: Callable[[], Awaitable[None]] | None = None,
+) -> T:
+    """Run ``action`` until it succeeds or ``policy.attempts`` tries are used up.
+
+    Args:
+        step: Name used in log messages
+        action: Zero-argument coroutine function performing the step
+        policy: Attempts and backoff
+        retry_on: Exception types worth retrying; anything else propagates at once
+        before_retry: Coroutine function run before each retry to reset the page
+
+    Returns:
+        Whatever ``action`` returns
+
+    Raises:
+        The last exception once every attempt has failed
+    """
+    for attempt in range(1, policy.attempts + 1):
+        try:
+            return await action()
+        except retry_on as e:
+            if attempt == policy.attempts:
+                logger.error(f"{step} failed after {attempt} attempts: {e}")
+                raise
+            delay = policy.delay(attempt)
+            logger.warning(f"{step} failed (attempt {attempt}/{policy.attempts}): {e}; retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            if before_retry is not None:
+                await before_retry()
+    raise AssertionError("unreachable")
@@ -0,0 +1,149 @@
+"""Request filtering for headless publishing runs.
+
+The editor only needs Substack's own HTML, scripts and API; fonts, media,
+remote images, analytics and tracking are aborted before they download.
+"""
+from __future__ import annotations
+
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+from .logger import setup_logger
+
+if TYPE_CHECKING:
+    from playwright.async_api import BrowserContext, Request, Response, Route
+
+logger = setup_logger(__name__)
+
+DEFAULT_BLOCKED_TYPES = frozenset({"font", "media", "image"})
+DEFAULT_BLOCKED_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "facebook.net",
+    "facebook.com",
+    "twitter.com",
+    "ads-twitter.com",
+    "segment.io",
+    "segment.com",
+    "sentry.io",
+    "hotjar.com",
+    "intercom.io",
+    "fullstory.com",
+    "amplitude.com",
+    "mixpanel.com",
+    "quantserve.com",
+    "scorecardresearch.com",
+)
+# Never blocked: the editor's own API, which includes draft saves and image uploads.
+DEFAULT_ALLOWED_PATTERNS = (r"\.substack\.com/api/", r"^https://substack\.com/api/")
+
+
+def _env_list(name: str) -> list[str] | None:
+    raw = os.getenv(name)
+    if raw is None:
+        return None
+    return [item.strip() for item in raw.split(",") if item.strip()]
+
+
+@dataclass
+class RouteStats:
+    """Per-run request counters."""
+
+    blocked: Counter[str] = field(default_factory=Counter)
+    allowed: int = 0
+    allowed_bytes: int = 0
+
+    @property
+    def blocked_total(self) -> int:
+        """Number of aborted requests."""
+        return sum(self.blocked.values())
+
+    def summary(self) -> str:
+        """One-line human readable summary."""
+        parts = ", ".join(f"{k}={v}" for k, v in self.blocked.most_common())
+        return (
+            f"Blocked {self.blocked_total} requests ({parts or 'none'}); "
+            f"allowed {self.allowed} requests, {self.allowed_bytes / 1024:.0f} KiB"
+        )
+
+
+@dataclass(frozen=True)
+class RouteFilter:
+    """Decides which requests a publishing context may make.
+
+    Args:
+        blocked_types: Playwright resource types to abort (font, image, media, ...)
+        blocked_domains: Hosts (and their subdomains) to abort regardless of type
+        allowed_patterns: URL regexes that are always let through
+    """
+
+    blocked_types: frozenset[str] = DEFAULT_BLOCKED_TYPES
+    blocked_domains: tuple[str, ...] = DEFAULT_BLOCKED_DOMAINS
+    allowed_patterns: tuple[str, ...] = DEFAULT_ALLOWED_PATTERNS
+
+    @classmethod
+    def from_env(cls) -> RouteFilter:
+        """Build a filter, overriding defaults from comma-separated env vars.
+
+        SUBSTACK_BLOCK_TYPES, SUBSTACK_BLOCK_DOMAINS and SUBSTACK_ALLOW_PATTERNS
+        replace the corresponding default lists when set.
+        """
+        types = _env_list("SUBSTACK_BLOCK_TYPES")
+        domains = _env_list("SUBSTACK_BLOCK_DOMAINS")
+        allowed = _env_list("SUBSTACK_ALLOW_PATTERNS")
+        return cls(
+            blocked_types=frozenset(types) if types is not None else DEFAULT_BLOCKED_TYPES,
+            blocked_domains=tuple(domains) if domains is not None else DEFAULT_BLOCKED_DOMAINS,
+            allowed_patterns=tuple(allowed) if allowed is not None else DEFAULT_ALLOWED_PATTERNS,
+        )
+
+    def decide(self, url: str, resource_type: str) -> str | None:
+        """Return the reason to block a request, or None to let it through."""
+        if any(re.search(p, url) for p in self.allowed_patterns):
+            return None
+        host = (urlsplit(url).hostname or "").lower()
+        for domain in self.blocked_domains:
+            if host == domain or host.endswith("." + domain):
+                return f"domain:{domain}"
+        if resource_type in self.blocked_types:
+            return f"type:{resource_type}"
+        return None
+
+    async def install(self, context: BrowserContext, stats: RouteStats | None = None) -> RouteStats:
+        """Route every request of ``context`` through this filter.
+
+        Args:
+            context: Browser context to filter
+            stats: Counters to add to, e.g. shared by several contexts of one run
+
+        Returns:
+            Counters that fill in as the context makes requests
+        """
+        stats = stats if stats is not None else RouteStats()
+
+        async def handle(route: Route, request: Request) -> None:
+            reason = self.decide(request.url, request.resource_type)
+            if reason:
+                stats.blocked[reason] += 1
+                await route.abort("blockedbyclient")
+            else:
+                stats.allowed += 1
+                await route.continue_()
+
+        def on_response(response: Response) -> None:
+            length = response.headers.get("content-length")
+            if length and length.isdigit():
+                stats.allowed_bytes += int(length)
+
+        await context.route("**/*", handle)
+        context.on("response", on_response)
+        logger.info(
+            f"Request filter on: types={sorted(self.blocked_types)}, "
+            f"{len(self.blocked_domains)} blocked domains"
+        )
+        return stats
@@ -0,0 +1,198 @@
+"""Check the saved Substack session over plain HTTP before starting a browser.
+
+The cookies in ``.playwright/storage_state.json`` are checked locally
+first (present, not expired), then with one authenticated request to the
+space's drafts API through a shared keep-alive client. A verdict is cached
+per space for a short TTL and is invalidated whenever the storage state
+file changes, e.g. after ``login``.
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from functools import cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlsplit
+
+from .logger import setup_logger
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = setup_logger(__name__)
+
+STORAGE_STATE_PATH = Path(".playwright") / "storage_state.json"
+VERDICT_CACHE_PATH = Path(".playwright") / "session_check.json"
+# Cookies that carry a logged-in Substack session.
+SESSION_COOKIES = ("substack.sid", "connect.sid")
+DEFAULT_TTL_S = 600.0
+CHECK_TIMEOUT_S = 5.0
+
+
+class SessionExpired(RuntimeError):
+    """Raised when the saved session is known to be logged out."""
+
+    def __init__(self, space: str, reason: str) -> None:
+        super().__init__(
+            f"Substack session for '{space}' is not valid ({reason}). "
+            "Run `python -m tools.substack.cli login` to refresh .playwright/storage_state.json."
+        )
+        self.space = space
+        self.reason = reason
+
+
+@dataclass(frozen=True)
+class SessionVerdict:
+    """Outcome of a preflight check.
+
+    Args:
+        valid: True or False when the check was conclusive, None when the
+            server could not be asked (network error, unexpected status)
+        reason: Short explanation for logs and errors
+        checked_at: Unix time of the check
+        status: HTTP status of the check request, if one was made
+    """
+
+    valid: bool | None
+    reason: str
+    checked_at: float
+    status: int | None = None
+
+
+def preflight_enabled() -> bool:
+    """Return False when SUBSTACK_PREFLIGHT is set to 0/false/no."""
+    return os.getenv("SUBSTACK_PREFLIGHT", "1").lower() not in ("0", "false", "no")
+
+
+def _domain_matches(domain: str, host: str) -> bool:
+    domain = domain.lstrip(".").lower()
+    return host == domain or host.endswith("." + domain)
+
+
+def session_cookies(state: dict[str, Any], host: str, now: float | None = None) -> dict[str, str]:
+    """Return the unexpired cookies from a Playwright storage state that ``host`` receives."""
+    now = time.time() if now is None else now
+    jar: dict[str, str] = {}
+    for cookie in state.get("cookies", []):
+        expires = cookie.get("expires", -1)
+        if _domain_matches(cookie.get("domain", ""), host) and (expires is None or expires < 0 or expires > now):
+            jar[cookie["name"]] = cookie["value"]
+    return jar
+
+
+@cache
+def _client() -> httpx.Client:
+    """Keep-alive client shared by every check in this process."""
+    import httpx
+
+    return httpx.Client(timeout=CHECK_TIMEOUT_S, follow_redirects=False, headers={"Accept": "application/json"})
+
+
+def probe_session(origin: str, state: dict[str, Any]) -> SessionVerdict:
+    """Decide from the cookies and one drafts-API request whether ``state`` is logged in to ``origin``.
+
+    Args:
+        origin: The space's origin, e.g. ``https://nwsldata.substack.com``
+        state: Parsed Playwright storage state
+    """
+    import httpx
+
+    now = time.time()
+    host = (urlsplit(origin).hostname or "").lower()
+    jar = session_cookies(state, host, now)
+    if not any(name in jar for name in SESSION_COOKIES):
+        expired = [c for c in state.get("cookies", []) if c.get("name") in SESSION_COOKIES]
+        return SessionVerdict(False, "session cookie expired" if expired else "no session cookie", now)
+    cookie_header = "; ".join(f"{k}={v}" for k, v in jar.items())
+    try:
+        resp = _client().get(
+            f"{origin}/api/v1/drafts", params={"offset": 0, "limit": 1}, headers={"Cookie": cookie_header}
+        )
+    except httpx.HTTPError as e:
+        return SessionVerdict(None, f"check failed: {type(e).__name__}: {e}", now)
+    if resp.status_code == 200:
+        return SessionVerdict(True, "drafts API accepted the session", now, 200)
+    if resp.status_code in (401, 403) or resp.is_redirect:
+        return SessionVerdict(False, f"drafts API answered HTTP {resp.status_code}", now, resp.status_code)
+    return SessionVerdict(None, f"unexpected HTTP {resp.status_code}", now, resp.status_code)
+
+
+def _state_stamp(storage_path: Path) -> int | None:
+    try:
+        return storage_path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def check_session(
+    space: str,
+    storage_path: Path = STORAGE_STATE_PATH,
+    ttl_s: float | None = None,
+    cache_path: Path = VERDICT_CACHE_PATH,
+    force: bool = False,
+) -> SessionVerdict:
+    """Return the (possibly cached) verdict on the saved session for ``space``.
+
+    Args:
+        space: Normalized Substack subdomain
+        storage_path: Playwright storage state written by ``login``
+        ttl_s: How long a conclusive verdict is reused
+            (default: SUBSTACK_SESSION_TTL_S, else 600 seconds)
+        cache_path: Where verdicts are cached
+        force: Ignore any cached verdict
+    """
+    from .publish_to_substack import _space_origin
+
+    ttl_s = float(os.getenv("SUBSTACK_SESSION_TTL_S", DEFAULT_TTL_S)) if ttl_s is None else ttl_s
+    stamp = _state_stamp(storage_path)
+    if stamp is None:
+        return SessionVerdict(False, f"{storage_path} not found", time.time())
+    try:
+        cached: dict[str, Any] = json.loads(cache_path.read_text())
+    except (OSError, ValueError):
+        cached = {}
+    entry = cached.get(space)
+    if (
+        not force
+        and isinstance(entry, dict)
+        and entry.get("state_mtime_ns") == stamp
+        and time.time() - entry.get("checked_at", 0) < ttl_s
+    ):
+        logger.debug(f"Session verdict for {space} from cache: {entry['reason']}")
+        return SessionVerdict(entry["valid"], entry["reason"], entry["checked_at"], entry.get("status"))
+
+    started = time.perf_counter()
+    try:
+        state = json.loads(storage_path.read_text())
+    except (OSError, ValueError) as e:
+        return SessionVerdict(False, f"unreadable storage state: {e}", time.time())
+    verdict = probe_session(_space_origin(space), state)
+    logger.info(f"Session preflight for {space}: {verdict.reason} ({(time.perf_counter() - started) * 1000:.0f} ms)")
+    if verdict.valid is not None:
+        cached[space] = {**asdict(verdict), "state_mtime_ns": stamp}
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(cached, indent=2, sort_keys=True))
+        tmp.replace(cache_path)
+    return verdict
+
+
+def require_session(space: str, storage_path: Path = STORAGE_STATE_PATH) -> SessionVerdict:
+    """Run the preflight unless disabled and fail fast on a logged-out session.
+
+    An inconclusive check is logged and publishing goes ahead.
+
+    Raises:
+        SessionExpired: If the session is known to be invalid
+    """
+    if not preflight_enabled():
+        return SessionVerdict(None, "preflight disabled", time.time())
+    verdict = check_session(space, storage_path)
+    if verdict.valid is False:
+        raise SessionExpired(space, verdict.reason)
+    if verdict.valid is None:
+        logger.warning(f"Could not verify the Substack session ({verdict.reason}); continuing")
+    return verdict
@@ -0,0 +1,50 @@
+"""Per-space cache of what worked in the Substack editor on previous runs."""
+import json
+from pathlib import Path
+from typing import Any
+
+from .logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SPACE_CACHE_PATH = Path(".playwright") / "space_cache.json"
+
+
+class SpaceCache:
+    """Small JSON store of per-space facts, written through on every change.
+
+    Layout: ``{space: {key: value}}``. Entries are hints only; callers must
+    verify them against the live page and forget() them when they go stale.
+    """
+
+    def __init__(self, path: Path = SPACE_CACHE_PATH) -> None:
+        self.path = path
+        self.data: dict[str, dict[str, Any]] = {}
+        if path.exists():
+            try:
+                self.data = json.loads(path.read_text())
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable space cache {path}: {e}")
+
+    def get(self, space: str, key: str) -> Any:
+        """Return a cached value, or None."""
+        return self.data.get(space, {}).get(key)
+
+    def set(self, space: str, key: str, value: Any) -> None:
+        """Store a value and persist the cache."""
+        if self.get(space, key) == value:
+            return
+        self.data.setdefault(space, {})[key] = value
+        self.save()
+
+    def forget(self, space: str, key: str) -> None:
+        """Drop a stale value and persist the cache."""
+        if self.data.get(space, {}).pop(key, None) is not None:
+            self.save()
+
+    def save(self) -> None:
+        """Atomically write the cache to disk."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.data, indent=2, sort_keys=True))
+        tmp.replace(self.path)
@@ -0,0 +1,246 @@
+"""Failure artifacts for publish runs, recorded cheaply and kept only when something goes wrong.
+
+Each post gets a FlightRecorder: a bounded ring of recent page events
+(navigations, console errors, failed requests) and swallowed exceptions,
+plus, with SUBSTACK_TRACE=1, a Playwright trace chunk. When the post goes
+through, the chunk is discarded and nothing is written. When it fails, or a
+step swallowed an exception, its evidence goes to
+``.playwright/runs/<run_id>/`` under the post's name, so concurrent and
+consecutive failures keep their own files; old runs are pruned.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+import secrets
+import shutil
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from .logger import setup_logger
+
+if TYPE_CHECKING:
+    from playwright.async_api import BrowserContext, ConsoleMessage, Frame, Page
+
+logger = setup_logger(__name__)
+
+RUNS_DIR = Path(".playwright") / "runs"
+CAPTURE_TIMEOUT_MS = 5_000
+
+
+@dataclass(frozen=True)
+class TraceSettings:
+    """What is recorded per post and how much of it is kept on disk.
+
+    Args:
+        playwright: Also record a Playwright trace (actions, DOM snapshots, screenshots)
+        events: Size of each post's event ring
+        keep_runs: Number of run directories kept
+        max_mb: Total size the run directories are pruned to
+    """
+
+    playwright: bool = False
+    events: int = 200
+    keep_runs: int = 20
+    max_mb: float = 200.0
+
+    @classmethod
+    def from_env(cls) -> TraceSettings:
+        """Read SUBSTACK_TRACE, SUBSTACK_TRACE_EVENTS, SUBSTACK_KEEP_RUNS and SUBSTACK_RUNS_MAX_MB."""
+        d = cls()
+        return cls(
+            playwright=os.getenv("SUBSTACK_TRACE", "").lower() in ("1", "true", "yes"),
+            events=max(1, int(os.getenv("SUBSTACK_TRACE_EVENTS", d.events))),
+            keep_runs=max(1, int(os.getenv("SUBSTACK_KEEP_RUNS", d.keep_runs))),
+            max_mb=float(os.getenv("SUBSTACK_RUNS_MAX_MB", d.max_mb)),
+        )
+
+
+def new_run_id() -> str:
+    """Return a run ID that sorts by start time, e.g. ``20250601T101500Z-3fa9c1``."""
+    return f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{secrets.token_hex(3)}"
+
+
+def _dir_bytes(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def prune_runs(root: Path = RUNS_DIR, keep: int = 20, max_bytes: int | None = None) -> list[Path]:
+    """Delete the oldest run directories beyond ``keep`` or beyond ``max_bytes`` in total.
+
+    The newest run is always kept.
+
+    Returns:
+        The directories removed
+    """
+    if not root.is_dir():
+        return []
+    runs = sorted((d for d in root.iterdir() if d.is_dir()), key=lambda d: d.name, reverse=True)
+    removed: list[Path] = []
+    total = 0
+    for i, run in enumerate(runs):
+        total += _dir_bytes(run)
+        if i and (i >= keep or (max_bytes is not None and total > max_bytes)):
+            shutil.rmtree(run, ignore_errors=True)
+            removed.append(run)
+    if removed:
+        logger.debug(f"Pruned {len(removed)} old run directories from {root}")
+    return removed
+
+
+class TraceRun:
+    """One publish invocation; hands out a FlightRecorder per post.
+
+    The run directory is created the first time a recorder persists
+    something, so a clean run leaves no trace on disk.
+
+    Args:
+        settings: What to record (default: TraceSettings.from_env())
+        root: Parent of the run directories
+        run_id: Defaults to a fresh new_run_id()
+    """
+
+    def __init__(self, settings: TraceSettings | None = None, root: Path = RUNS_DIR, run_id: str | None = None) -> None:
+        self.settings = settings or TraceSettings.from_env()
+        self.root = root
+        self.run_id = run_id or new_run_id()
+        self.dir = root / self.run_id
+        self._traced: set[int] = set()
+
+    async def recorder(self, label: str, context: BrowserContext | None = None) -> FlightRecorder:
+        """Return a recorder for one post, starting its trace chunk on ``context`` if tracing is on.
+
+        Only one chunk can be open per context, so with tracing on every
+        post needs a context of its own.
+        """
+        if not self.settings.playwright or context is None:
+            return FlightRecorder(self, label)
+        if id(context) not in self._traced:
+            await context.tracing.start(screenshots=True, snapshots=True)
+            self._traced.add(id(context))
+        await context.tracing.start_chunk(title=label)
+        return FlightRecorder(self, label, context)
+
+    def stem(self, label: str) -> str:
+        """Reserve an unused file name stem for ``label`` in the run directory, creating the directory.
+
+        The stem's ``.events.json`` is created exclusively right away, so
+        concurrent failures of the same post never get the same stem.
+        """
+        self.dir.mkdir(parents=True, exist_ok=True)
+        base = re.sub(r"[^\w.-]+", "_", label).strip("._") or "post"
+        stem, n = base, 1
+        while True:
+            try:
+                (self.dir / f"{stem}.events.json").open("x").close()
+                return stem
+            except FileExistsError:
+                n += 1
+                stem = f"{base}-{n}"
+
+    def prune(self) -> list[Path]:
+        """Apply the retention limits to the run directories."""
+        return prune_runs(self.root, self.settings.keep_runs, int(self.settings.max_mb * 1024 * 1024))
+
+
+class FlightRecorder:
+    """Recent events of one post, persisted only if the post fails or swallowed an error.
+
+    Args:
+        run: The run this post belongs to
+        label: Post name used for the artifact files
+        context: Context with an open trace chunk, or None without Playwright tracing
+    """
+
+    def __init__(self, run: TraceRun, label: str, context: BrowserContext | None = None) -> None:
+        self.run = run
+        self.label = label
+        self.events: deque[dict[str, Any]] = deque(maxlen=run.settings.events)
+        self.swallowed: list[str] = []
+        self.saved: Path | None = None
+        self._context = context
+        self._started = time.perf_counter()
+
+    def note(self, kind: str, message: str, **fields: Any) -> None:
+        """Append an event to the ring."""
+        self.events.append({"t_ms": round((time.perf_counter() - self._started) * 1000), "kind": kind, "message": message, **fields})
+
+    def watch(self, page: Page) -> None:
+        """Record ``page``'s navigations, console errors, page errors and failed requests."""
+
+        def on_navigate(frame: Frame) -> None:
+            if frame == page.main_frame:
+                self.note("navigate", frame.url)
+
+        def on_console(msg: ConsoleMessage) -> None:
+            if msg.type in ("error", "warning"):
+                self.note(f"console.{msg.type}", msg.text)
+
+        page.on("framenavigated", on_navigate)
+        page.on("console", on_console)
+        page.on("pageerror", lambda err: self.note("pageerror", str(err)))
+        page.on("requestfailed", lambda req: self.note("requestfailed", req.url, error=req.failure))
+
+    def swallow(self, step: str, exc: BaseException) -> None:
+        """Record an exception a non-essential step caught and carried on after."""
+        self.swallowed.append(step)
+        self.note("swallowed", f"{type(exc).__name__}: {exc}", step=step)
+        logger.warning(f"{self.label}: {step} failed and was skipped ({exc})")
+
+    async def fail(self, page: Page | None, exc: BaseException) -> Path | None:
+        """Persist everything recorded for a post that failed with ``exc``."""
+        self.note("failed", f"{type(exc).__name__}: {exc}")
+        return await self._persist(page, "failed")
+
+    async def finish(self) -> Path | None:
+        """End the post: persist if a step was swallowed, else drop the trace chunk."""
+        if self.saved is not None:
+            return self.saved
+        if self.swallowed:
+            return await self._persist(None, "swallowed: " + ", ".join(self.swallowed))
+        if self._context is not None:
+            try:
+                await self._context.tracing.stop_chunk()
+            except Exception as e:
+                logger.debug(f"Could not discard trace chunk for {self.label}: {e}")
+            self._context = None
+        return None
+
+    async def _capture(self, what: str, action: Any) -> None:
+        try:
+            await action
+        except Exception as e:
+            self.note("capture_failed", f"{what}: {type(e).__name__}: {e}")
+
+    async def _persist(self, page: Page | None, reason: str) -> Path | None:
+        stem = self.run.stem(self.label)
+        out = self.run.dir
+        captures = []
+        if page is not None and not page.is_closed():
+            captures.append(self._capture("screenshot", page.screenshot(
+                path=str(out / f"{stem}.png"), timeout=CAPTURE_TIMEOUT_MS
+            )))
+
+            async def html() -> None:
+                text = await asyncio.wait_for(page.content(), CAPTURE_TIMEOUT_MS / 1000)
+                await asyncio.to_thread((out / f"{stem}.html").write_text, text, encoding="utf-8")
+
+            captures.append(self._capture("html", html()))
+        if self._context is not None:
+            captures.append(self._capture("trace", self._context.tracing.stop_chunk(path=str(out / f"{stem}.trace.zip"))))
+            self._context = None
+        await asyncio.gather(*captures)
+        (out / f"{stem}.events.json").write_text(json.dumps(
+            {"post": self.label, "run_id": self.run.run_id, "reason": reason, "events": list(self.events)},
+            indent=2, default=str,
+        ))
+        self.saved = out
+        self.run.prune()
+        print(f">> Debug saved for {self.label} ({reason}): {out / stem}.*")
+        return self.saved
@@ -0,0 +1,301 @@
+"""Event-driven waits for the Substack editor.
+
+Each helper resolves on a concrete page signal (an element appearing, a DOM
+mutation, an upload or publish response, the saved indicator) instead of a
+fixed sleep, logs how long the signal took and raises WaitTimeout when it
+never arrives.
+"""
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+from .logger import setup_logger
+
+if TYPE_CHECKING:
+    from playwright.async_api import Locator, Page, Response
+
+logger = setup_logger(__name__)
+
+UPLOAD_URL_RE = re.compile(r"/api/v1/(image|upload)")
+DRAFT_SAVE_URL_RE = re.compile(r"/api/v1/drafts(/\d+)?/?$")
+PUBLISH_URL_RE = re.compile(r"/api/v1/drafts/\d+/publish/?$")
+# The editor's own URLs; after a publish Substack navigates elsewhere.
+EDITOR_URL_RE = re.compile(r"/(p|publish/post)/(new|\d+)/?$")
+SAVED_TEXT_RE = re.compile(r"^\s*Saved\b", re.IGNORECASE)
+
+# Installed on an element before an action; flips `done` on the first mutation.
+_WATCH_JS = """el => {
+    const state = { done: false };
+    const obs = new MutationObserver(() => { state.done = true; obs.disconnect(); });
+    obs.observe(el, { childList: true, subtree: true, characterData: true });
+    return state;
+}"""
+
+
+@dataclass(frozen=True)
+class WaitTimeouts:
+    """Per-step timeouts in milliseconds."""
+
+    editor_ms: float = 15_000
+    paste_ms: float = 10_000
+    menu_ms: float = 5_000
+    upload_ms: float = 30_000
+    saved_ms: float = 10_000
+    publish_ms: float = 30_000
+
+
+DEFAULT_TIMEOUTS = WaitTimeouts()
+
+
+class WaitTimeout(RuntimeError):
+    """Raised when the signal a step waits for does not arrive in time."""
+
+    def __init__(self, step: str, timeout_ms: float) -> None:
+        super().__init__(f"Timed out after {timeout_ms:.0f} ms waiting for {step}")
+        self.step = step
+        self.timeout_ms = timeout_ms
+
+
+def _log_latency(step: str, started: float) -> float:
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(f"{step} ready in {elapsed_ms:.0f} ms")
+    return elapsed_ms
+
+
+def _is_upload_response(response: Response) -> bool:
+    return response.request.method == "POST" and bool(UPLOAD_URL_RE.search(response.url))
+
+
+def _is_draft_save_response(response: Response) -> bool:
+    return response.request.method in ("POST", "PUT") and bool(
+        DRAFT_SAVE_URL_RE.search(response.url.split("?", 1)[0])
+    )
+
+
+def _is_publish_response(response: Response) -> bool:
+    return response.request.method == "POST" and bool(PUBLISH_URL_RE.search(response.url.split("?", 1)[0]))
+
+
+def _left_editor(url: str) -> bool:
+    return not EDITOR_URL_RE.search(urlsplit(url).path)
+
+
+async def wait_for_editor(page: Page, selectors: list[str], timeout_ms: float) -> None:
+    """Wait until any of the editor selectors is attached to the page.
+
+    Args:
+        page: Playwright page object
+        selectors: Plain CSS selectors, any of which signals a mounted editor
+        timeout_ms: Maximum time to wait
+
+    Raises:
+        WaitTimeout: If no selector matches in time
+    """
+    from playwright.async_api import TimeoutError as PWTimeout
+
+    started = time.perf_counter()
+    try:
+        await page.wait_for_selector(", ".join(selectors), state="attached", timeout=timeout_ms)
+    except PWTimeout as e:
+        raise WaitTimeout("editor", timeout_ms) from e
+    _log_latency("editor", started)
+
+
+async def wait_visible(locator: Locator, step: str, timeout_ms: float) -> None:
+    """Wait until a locator's first match is visible.
+
+    Raises:
+        WaitTimeout: If it does not become visible in time
+    """
+    from playwright.async_api import TimeoutError as PWTimeout
+
+    started = time.perf_counter()
+    try:
+        await locator.first.wait_for(state="visible", timeout=timeout_ms)
+    except PWTimeout as e:
+        raise WaitTimeout(step, timeout_ms) from e
+    _log_latency(step, started)
+
+
+@asynccontextmanager
+async def expect_mutation(page: Page, target: Locator, step: str, timeout_ms: float) -> AsyncIterator[None]:
+    """Wait for the body of the ``async with`` block to mutate ``target``'s DOM.
+
+    The observer is armed before the block runs, so a fast mutation cannot be
+    missed.
+
+    Raises:
+        WaitTimeout: If the element does not change in time
+    """
+    from playwright.async_api import TimeoutError as PWTimeout
+
+    watch = await target.evaluate_handle(_WATCH_JS)
+    started = time.perf_counter()
+    try:
+        yield
+        try:
+            await page.wait_for_function("w => w.done", arg=watch, polling="raf", timeout=timeout_ms)
+        except PWTimeout as e:
+            raise WaitTimeout(step, timeout_ms) from e
+    finally:
+        await watch.dispose()
+    _log_latency(step, started)
+
+
+@asynccontextmanager
+async def expect_upload(page: Page, step: str, timeout_ms: float) -> AsyncIterator[None]:
+    """Wait for the image upload triggered inside the block to finish.
+
+    Raises:
+        WaitTimeout: If no upload response arrives in time
+        RuntimeError: If the upload endpoint answers with an error status
+    """
+    from playwright.async_api import TimeoutError as PWTimeout
+
+    started = time.perf_counter()
+    try:
+        async with page.expect_response(_is_upload_response, timeout=timeout_ms) as info:
+            yield
+        response = await info.value
+    except PWTimeout as e:
+        raise WaitTimeout(step, timeout_ms) from e
+    if not response.ok:
+        raise RuntimeError(f"{step} failed: HTTP {response.status} from {response.url}")
+    _log_latency(step, started)
+
+
+@asynccontextmanager
+async def expect_published(page: Page, timeout_ms: float) -> AsyncIterator[None]:
+    """Wait for the publish triggered inside the block to go through.
+
+    Either a response from the publish endpoint or the page navigating away
+    from the editor counts as confirmation. Both are watched before the block
+    runs, so a fast publish cannot be missed.
+
+    Raises:
+        WaitTimeout: If neither signal arrives in time
+        RuntimeError: If the publish endpoint answers with an error status
+    """
+    from playwright.async_api import TimeoutError as PWTimeout
+
+    started = time.perf_counter()
+    response = asyncio.ensure_future(
+        page.wait_for_event("response", predicate=_is_publish_response, timeout=timeout_ms)
+    )
+    navigated = asyncio.ensure_future(page.wait_for_url(_left_editor, wait_until="commit", timeout=timeout_ms))
+    signals = [response, navigated]
+    try:
+        yield
+        pending = set(signals)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for fut in done:
+                if isinstance(fut.exception(), PWTimeout):
+                    continue
+                if fut is response and not fut.result().ok:
+                    r = fut.result()
+                    raise RuntimeError(f"publish failed: HTTP {r.status} from {r.url}")
+                fut.result()
+                _log_latency("publish", started)
+                return
+        raise WaitTimeout("publish", timeout_ms)
+    finally:
+        for s in signals:
+            s.cancel()
+        await asyncio.gather(*signals, return_exceptions=True)
+
+
+async def wait_for_saved(page: Page, timeout_ms: float) -> None:
+    """Wait for the editor to confirm the draft was saved.
+
+    Either the "Saved" indicator becoming visible or a successful draft save
+    request counts as confirmation. An indicator that is already showing
+    counts too, so this suits autosave; after a click, use expect_saved.
+
+    Raises:
+        WaitTimeout: If neither signal arrives in time
+    """
+    from playwright.async_api import TimeoutError as PWTimeout
+
+    started = time.perf_counter()
+    signals = [
+        asyncio.ensure_future(
+            page.get_by_text(SAVED_TEXT_RE).first.wait_for(state="visible", timeout=timeout_ms)
+        ),
+        asyncio.ensure_future(
+            page.wait_for_event(
+                "response",
+                predicate=lambda r: _is_draft_save_response(r) and r.ok,
+                timeout=timeout_ms,
+            )
+        ),
+    ]
+    try:
+        for fut in asyncio.as_completed(signals):
+            try:
+                await fut
+            except PWTimeout:
+                continue
+            _log_latency("saved indicator", started)
+            return
+    finally:
+        for s in signals:
+            s.cancel()
+        await asyncio.gather(*signals, return_exceptions=True)
+    raise WaitTimeout("saved indicator", timeout_ms)
+
+
+async def _saved_again(page: Page, was_saved: bool, timeout_ms: float) -> None:
+    indicator = page.get_by_text(SAVED_TEXT_RE).first
+    if was_saved:
+        await indicator.wait_for(state="hidden", timeout=timeout_ms)
+    await indicator.wait_for(state="visible", timeout=timeout_ms)
+
+
+@asynccontextmanager
+async def expect_saved(page: Page, timeout_ms: float) -> AsyncIterator[None]:
+    """Wait for the save triggered inside the block to be confirmed.
+
+    A successful draft save response, or the "Saved" indicator appearing,
+    counts as confirmation. Both are watched before the block runs, and an
+    indicator left over from an earlier save only counts once it has gone
+    away and come back.
+
+    Raises:
+        WaitTimeout: If neither signal arrives in time
+    """
+    from playwright.async_api import TimeoutError as PWTimeout
+
+    started = time.perf_counter()
+    was_saved = await page.get_by_text(SAVED_TEXT_RE).first.is_visible()
+    signals = [
+        asyncio.ensure_future(_saved_again(page, was_saved, timeout_ms)),
+        asyncio.ensure_future(
+            page.wait_for_event(
+                "response",
+                predicate=lambda r: _is_draft_save_response(r) and r.ok,
+                timeout=timeout_ms,
+            )
+        ),
+    ]
+    try:
+        yield
+        for fut in asyncio.as_completed(signals):
+            try:
+                await fut
+            except PWTimeout:
+                continue
+            _log_latency("saved indicator", started)
+            return
+        raise WaitTimeout("saved indicator", timeout_ms)
+    finally:
+        for s in signals:
+            s.cancel()
+        await asyncio.gather(*signals, return_exceptions=True)